@@ -12,7 +12,13 @@ This module handles character creation, loading, and saving.
 """
 
 import os
+import sys
 import math
+import struct
+import threading
+import weakref
+import functools
+import contextlib
 from custom_exceptions import (
     InvalidCharacterClassError,
     CharacterNotFoundError,
@@ -21,10 +27,196 @@ from custom_exceptions import (
     CharacterDeadError
 )
 
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional; CharacterStore falls back to plain lists without it
+    np = None
+
+# ============================================================================
+# CONCURRENCY
+# ============================================================================
+
+# Number of locks shared out between characters (see character_lock)
+LOCK_STRIPES = 64
+
+_character_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+
+def _lock_index(character):
+    """Lock stripe for a character; dict ids are 16-byte aligned, so drop the low bits"""
+    return (id(character) >> 4) % LOCK_STRIPES
+
+def character_lock(character):
+    """
+    Get the lock that guards a character's gold, stats and inventory
+
+    Locks are striped by object identity, so different characters almost
+    always get different locks and nothing is stored in the character
+    dictionary. The lock is re-entrant, so locked functions can call each
+    other.
+
+    Returns: threading.RLock
+    """
+    return _character_locks[_lock_index(character)]
+
+@contextlib.contextmanager
+def lock_characters(characters):
+    """
+    Hold the locks for several characters at once
+
+    Locks are always taken in stripe order, so two threads locking the
+    same characters in a different order cannot deadlock.
+
+    Args:
+        characters: Iterable of character dictionaries
+    """
+    with contextlib.ExitStack() as stack:
+        for index in sorted({_lock_index(character) for character in characters}):
+            stack.enter_context(_character_locks[index])
+        yield
+
+def locks_character(function):
+    """Decorator that runs function(character, ...) while holding character_lock(character)"""
+    @functools.wraps(function)
+    def locked(character, *args, **kwargs):
+        with character_lock(character):
+            return function(character, *args, **kwargs)
+    return locked
+
+def mutates_character(function):
+    """
+    Decorator for functions that change a character
+
+    Like locks_character, and also bumps the character's version
+    afterwards (even if the function raised, since it may have changed
+    something before failing) so cached renderings are redrawn.
+    """
+    @functools.wraps(function)
+    def mutating(character, *args, **kwargs):
+        with character_lock(character):
+            try:
+                return function(character, *args, **kwargs)
+            finally:
+                touch_character(character)
+    return mutating
+
+# ============================================================================
+# CHANGE TRACKING
+# ============================================================================
+
+class Character(dict):
+    """
+    Character dictionary that can be weakly referenced
+
+    Behaves exactly like a dict (it compares equal to one and copies,
+    pickles and serializes as one). create_character, load_character,
+    CharacterStore.to_characters and combat_system.create_enemy return
+    these, so runtime state kept outside a character (see
+    get_runtime_state) is released together with the character.
+    """
+    __slots__ = ('__weakref__',)
+
+# Runtime state kept for characters outside their dictionaries (version
+# numbers, cached renderings, quest, equipment and timed-effect state),
+# keyed by object identity like the lock stripes. Each entry holds a weak
+# reference to its Character whose callback drops the entry when the
+# character is freed, before its id can be reused.
+_runtime_state = {}
+
+def _release_runtime_state(key, owner):
+    """Drop an entry once its character has been freed (weakref callback)"""
+    entry = _runtime_state.get(key)
+    if entry is not None and entry[0] is owner:
+        _runtime_state.pop(key, None)
+
+def get_runtime_state(character):
+    """
+    Get the runtime state kept for a character outside its dictionary
+
+    Nothing is added to the character dictionary, so characters still
+    compare, copy and serialize as plain data. The state lasts as long
+    as the Character does. A plain dict cannot be weakly referenced, so
+    its state is kept until forget_character is called for it.
+
+    Returns: Dictionary modules keep their per-character runtime data in
+    """
+    key = id(character)
+    entry = _runtime_state.get(key)
+    if entry is None:
+        try:
+            owner = weakref.ref(character, functools.partial(_release_runtime_state, key))
+        except TypeError:
+            owner = character
+        entry = _runtime_state.setdefault(key, (owner, {}))
+    return entry[1]
+
+def forget_character(character):
+    """
+    Drop a character's runtime state
+
+    Only needed for plain dicts (a Character's state goes when it does),
+    or to reset a character's versions and caches.
+    """
+    _runtime_state.pop(id(character), None)
+
+def touch_character(character):
+    """
+    Mark a character as changed
+
+    Every function that changes a character calls this (most through the
+    mutates_character decorator). Code that edits a character dictionary
+    directly should call it too, or cached renderings will be stale.
+
+    Returns: The character's new version number
+    """
+    state = get_runtime_state(character)
+    version = state.get("version", 0) + 1
+    state["version"] = version
+    return version
+
+def get_character_version(character):
+    """Get a character's version number (0 if it has never been changed)"""
+    entry = _runtime_state.get(id(character))
+    return 0 if entry is None else entry[1].get("version", 0)
+
+def cached_render(character, renderer, inputs, render):
+    """
+    Get a rendering of a character, redrawing only if something changed
+
+    One result is kept per renderer, together with the character's version
+    and the renderer's other inputs. It is reused while both are the same,
+    so a repeated redraw costs a dict lookup and a tuple comparison.
+
+    Args:
+        character: Character dictionary
+        renderer: Name of the renderer (e.g. "inventory")
+        inputs: Tuple of the renderer's other inputs; objects that are the
+                same ones as last time compare equal without being walked
+        render: Function with no arguments that builds the rendering
+
+    Returns: The (possibly cached) rendering
+    """
+    state = get_runtime_state(character)
+    version = state.get("version", 0)
+    cache = state.setdefault("render_cache", {})
+
+    entry = cache.get(renderer)
+    if entry is not None and entry[0] == version and entry[1] == inputs:
+        return entry[2]
+
+    rendering = render()
+    cache[renderer] = (version, inputs, rendering)
+    return rendering
+
 # ============================================================================
 # CHARACTER MANAGEMENT FUNCTIONS
 # ============================================================================
 
+# Optional integer fields holding running quest statistics (kept by quest_handler)
+QUEST_STAT_KEYS = ["quests_completed", "quest_xp_earned", "quest_gold_earned"]
+# Optional list fields, saved only when non-empty (quest objective progress)
+OPTIONAL_LIST_KEYS = ["quest_progress"]
+
 def create_character(name, character_class):
     """
     Create a new character with stats based on class
@@ -48,7 +240,7 @@ def create_character(name, character_class):
     if character_class not in BASE_STATS:
         raise InvalidCharacterClassError(character_class, valid_classes)
     stats = BASE_STATS[character_class]
-    character_data = {
+    character_data = Character({
         "name": name,
         "class": character_class,
         "level": 1,
@@ -61,7 +253,7 @@ def create_character(name, character_class):
         "inventory": [],
         "active_quests": [],
         "completed_quests": []
-    }
+    })
     return character_data
 
 def save_character(character, save_directory="data/save_games"):
@@ -83,6 +275,17 @@ def save_character(character, save_directory="data/save_games"):
     INVENTORY: item1,item2,item3
     ACTIVE_QUESTS: quest1,quest2
     COMPLETED_QUESTS: quest1,quest2
+    EQUIPPED_WEAPON: item_id (only if a weapon is equipped)
+    EQUIPPED_ARMOR: item_id (only if armor is equipped)
+    EQUIPPED_WEAPON_BONUS / EQUIPPED_ARMOR_BONUS: stat:value the equipped
+        item added (written after its slot)
+    QUESTS_COMPLETED / QUEST_XP_EARNED / QUEST_GOLD_EARNED: running quest
+        statistics (only once quest_handler has started keeping them)
+    QUEST_PROGRESS: objective progress entries (only if any are tracked)
+    
+    Stats are saved without the changes of active timed buffs (the
+    'temporary_stats' runtime state kept by inventory_system), since
+    timed effects are not saved and would otherwise become permanent.
     
     Returns: True if successful
     Raises: PermissionError, IOError (let them propagate or handle)
@@ -111,8 +314,19 @@ def save_character(character, save_directory="data/save_games"):
         "inventory", "active_quests", "completed_quests"
     ]
     
+    # Stats as they are without active timed buffs
+    saved = dict(character)
+    for stat, change in get_runtime_state(character).get("temporary_stats", {}).items():
+        if isinstance(saved.get(stat), (int, float)):
+            saved[stat] -= change
+    if isinstance(saved.get("health"), int) and isinstance(saved.get("max_health"), int):
+        saved["health"] = max(0, min(saved["health"], saved["max_health"]))
+    
     for key in KEY_ORDER:
-        value = character.get(key)
+        value = saved.get(key)
+        if hasattr(value, "to_save_list"):
+            # List-like containers (e.g. inventory_system.Inventory)
+            value = value.to_save_list()
         if isinstance(value, list):
             formatted_value = ",".join(map(str, value))
         else:
@@ -120,6 +334,29 @@ def save_character(character, save_directory="data/save_games"):
             formatted_value = str(value)
             
         save_lines.append(f"{key.upper()}: {formatted_value}")
+
+    # Equipment slots are only written when something is equipped, followed by
+    # the bonus the item gave so it can be removed exactly after loading
+    for slot in ["weapon", "armor"]:
+        key = f"equipped_{slot}"
+        if character.get(key):
+            save_lines.append(f"{key.upper()}: {character[key]}")
+            modifier = character.get("equipment", {}).get(slot)
+            if modifier is not None:
+                save_lines.append(f"{key.upper()}_BONUS: {modifier['stat']}:{modifier['value']}")
+
+    # Running quest statistics are only written once they are being kept
+    for key in QUEST_STAT_KEYS:
+        if key in character:
+            save_lines.append(f"{key.upper()}: {character[key]}")
+
+    # Optional lists (e.g. quest_handler.QuestProgress) only when non-empty
+    for key in OPTIONAL_LIST_KEYS:
+        value = character.get(key)
+        if value:
+            if hasattr(value, "to_save_list"):
+                value = value.to_save_list()
+            save_lines.append(f"{key.upper()}: {','.join(map(str, value))}")
         
     # 3. Write the data to the file
     try:
@@ -160,17 +397,18 @@ def load_character(character_name, save_directory="data/save_games"):
     if not os.path.exists(full_path):
         raise CharacterNotFoundError(character_name)
         
-    character_data = {}
+    character_data = Character()
     
     try:
         with open(full_path, 'r') as f:
             lines = f.readlines()
             
     except IOError as e:
-        raise SaveFileCorruptedError(full_path, original_error=e)
+        raise SaveFileCorruptedError(full_path)
         
-    LIST_KEYS = ["inventory", "active_quests", "completed_quests"]
-    INT_KEYS = ["level", "health", "max_health", "strength", "magic", "experience", "gold"]
+    LIST_KEYS = ["inventory", "active_quests", "completed_quests"] + OPTIONAL_LIST_KEYS
+    INT_KEYS = ["level", "health", "max_health", "strength", "magic", "experience", "gold"] + QUEST_STAT_KEYS
+    bonuses = {}  # slot -> (stat, value) from EQUIPPED_<SLOT>_BONUS lines
 
     # 3. Parse and Validate data format -> InvalidSaveDataError
     try:
@@ -179,7 +417,7 @@ def load_character(character_name, save_directory="data/save_games"):
             if not line:
                 continue
             if ":" not in line:
-                raise InvalidSaveDataError(full_path, key_error="Malformed line (missing colon)")
+                raise InvalidSaveDataError(full_path, "Malformed line (missing colon)")
 
             key_str, value_str = line.split(":", 1)
             key = key_str.strip().lower() # Normalize key to lowercase
@@ -194,19 +432,35 @@ def load_character(character_name, save_directory="data/save_games"):
                 # Convert numeric values back to integers
                 character_data[key] = int(value)
                 
+            elif key in ("equipped_weapon_bonus", "equipped_armor_bonus"):
+                # Bonus of the item in a slot; matched to the slot below
+                slot = key[len("equipped_"):-len("_bonus")]
+                stat, amount = value.rsplit(":", 1)
+                bonuses[slot] = (stat.strip(), int(amount))
+                
             else:
                 # Default: name and class are strings
                 character_data[key] = value
                 
     except (ValueError, IndexError) as e:
         # Catch errors from int() conversion or list parsing
-        raise InvalidSaveDataError(full_path, key_error=f"Type conversion or parsing error: {e}")
+        raise InvalidSaveDataError(full_path, f"Type conversion or parsing error: {e}")
+
+    # Equipment bonuses, whichever order the slot and bonus lines came in
+    for slot, (stat, amount) in bonuses.items():
+        if not character_data.get(f"equipped_{slot}"):
+            raise InvalidSaveDataError(full_path, f"{slot} bonus without an equipped {slot}")
+        character_data.setdefault("equipment", {})[slot] = {
+            "item_id": character_data[f"equipped_{slot}"],
+            "stat": stat,
+            "value": amount
+        }
 
     # Final check for required keys 
     REQUIRED_KEYS = ["name", "class", "health", "gold"] # Check a subset of critical keys
     for req_key in REQUIRED_KEYS:
         if req_key not in character_data:
-            raise InvalidSaveDataError(full_path, key_error=f"Missing required key: {req_key}")
+            raise InvalidSaveDataError(full_path, f"Missing required key: {req_key}")
 
     return character_data
     
@@ -272,6 +526,7 @@ def delete_character(character_name, save_directory="data/save_games"):
 # CHARACTER OPERATIONS
 # ============================================================================
 
+@mutates_character
 def gain_experience(character, xp_amount):
     """
     Add experience to character and handle level ups
@@ -320,6 +575,7 @@ def gain_experience(character, xp_amount):
             # XP is less than needed for the next level, stop leveling up
             break
 
+@mutates_character
 def add_gold(character, amount):
     """
     Add gold to character's inventory
@@ -350,10 +606,12 @@ def add_gold(character, amount):
             
     # 2. Update character's gold
     character["gold"] = new_gold_total
+    record_gold_change(character, amount)
     
     # Return the new total
     return new_gold_total
 
+@mutates_character
 def heal_character(character, amount):
     """
     Heal character by specified amount
@@ -397,6 +655,7 @@ def is_character_dead(character):
         return True
     return False
 
+@mutates_character
 def revive_character(character):
     """
     Revive a dead character with 50% health
@@ -419,10 +678,659 @@ def revive_character(character):
     print(f"✨ {character['name']} has been revived! Health restored to {revive_health}.")
     return True
 
+# ============================================================================
+# BATCH OPERATIONS
+# ============================================================================
+
+def _per_character_amounts(characters, amount):
+    """
+    Expand an amount into one amount per character
+
+    Args:
+        characters: Sequence of character dictionaries
+        amount: A single number, or a sequence with one number per character
+
+    Returns: List of amounts, one per character
+    Raises: ValueError if a sequence of the wrong length is given
+    """
+    if isinstance(amount, (int, float)):
+        return [amount] * len(characters)
+
+    amounts = list(amount)
+    if len(amounts) != len(characters):
+        raise ValueError(f"Expected {len(characters)} amounts, got {len(amounts)}.")
+    return amounts
+
+def heal_all(characters, amount):
+    """
+    Heal every character in a batch (e.g. a regen tick)
+
+    Same rules as heal_character, but without printing for each character.
+
+    Args:
+        characters: List of character dictionaries, or a CharacterStore
+        amount: Heal amount, or a sequence with one amount per character
+
+    Returns: List with the actual amount healed for each character
+             (an array when given a CharacterStore)
+    """
+    if isinstance(characters, CharacterStore):
+        return characters.heal(amount)
+
+    amounts = _per_character_amounts(characters, amount)
+    healed = []
+
+    for character, heal in zip(characters, amounts):
+        if heal < 0:
+            healed.append(0)
+            continue
+        with character_lock(character):
+            actual_heal = min(heal, character["max_health"] - character["health"])
+            character["health"] += actual_heal
+            touch_character(character)
+        healed.append(actual_heal)
+
+    return healed
+
+def grant_gold_all(characters, amount):
+    """
+    Add gold to every character in a batch (e.g. a daily stipend)
+
+    The whole batch is checked before any gold changes, so either every
+    character is updated or none are.
+
+    Args:
+        characters: List of character dictionaries, or a CharacterStore
+        amount: Gold amount, or a sequence with one amount per character
+
+    Returns: List with the new gold total for each character
+             (an array when given a CharacterStore)
+    Raises: ValueError if any character's gold would become negative
+    """
+    if isinstance(characters, CharacterStore):
+        return characters.add_gold(amount)
+
+    amounts = _per_character_amounts(characters, amount)
+
+    with lock_characters(characters):
+        # 1. Check every result first so a failure leaves the batch untouched
+        new_totals = [character["gold"] + gold for character, gold in zip(characters, amounts)]
+        for character, new_total in zip(characters, new_totals):
+            if new_total < 0:
+                raise ValueError(
+                    f"Gold total cannot be negative. {character['name']} only has {character['gold']} gold."
+                )
+
+        # 2. Apply the batch
+        for character, new_total, gold in zip(characters, new_totals, amounts):
+            character["gold"] = new_total
+            record_gold_change(character, gold)
+            touch_character(character)
+
+    return new_totals
+
+def grant_xp_all(characters, xp_amount):
+    """
+    Give experience to every character in a batch (e.g. an XP event)
+
+    Same level up rules as gain_experience. Dead characters are skipped
+    instead of raising CharacterDeadError, so one dead character does not
+    stop the batch.
+
+    Args:
+        characters: List of character dictionaries, or a CharacterStore
+        xp_amount: XP amount, or a sequence with one amount per character
+
+    Returns: List with the number of levels gained by each character
+             (0 for dead characters, which receive no XP; an array when
+             given a CharacterStore)
+    """
+    if isinstance(characters, CharacterStore):
+        return characters.gain_experience(xp_amount)
+
+    amounts = _per_character_amounts(characters, xp_amount)
+    levels_gained = []
+
+    for character, xp in zip(characters, amounts):
+        with character_lock(character):
+            if character["health"] <= 0:
+                levels_gained.append(0)
+                continue
+
+            character["experience"] += xp
+            touch_character(character)
+
+            # Leveling stops at the first level where level * 100 > experience,
+            # so the final level can be computed directly instead of looping
+            gained = int(character["experience"] // 100) + 1 - character["level"]
+            if gained > 0:
+                character["level"] += gained
+                character["max_health"] += 10 * gained
+                character["strength"] += 2 * gained
+                character["magic"] += 2 * gained
+                character["health"] = character["max_health"]
+            else:
+                gained = 0
+        levels_gained.append(gained)
+
+    return levels_gained
+
+# ============================================================================
+# COLUMNAR CHARACTER STORE
+# ============================================================================
+
+# Numeric character fields kept as one column (array) each in CharacterStore
+STORE_STAT_FIELDS = ("level", "health", "max_health", "strength", "magic", "experience", "gold")
+
+class CharacterStore:
+    """
+    Struct-of-arrays storage for many characters
+
+    Each numeric stat in STORE_STAT_FIELDS is stored as one column (a NumPy
+    int64 array, or a list when NumPy is not installed), so analytics and
+    batch ticks work on whole columns instead of one dictionary at a time.
+    Names are interned and classes are stored as small integer codes into
+    class_names. Any other fields (inventory, quests, ...) are kept per
+    character in extras so that export gives back complete characters.
+    """
+
+    def __init__(self):
+        """Create an empty store"""
+        self.names = []
+        self.class_names = []
+        self._class_codes_by_name = {}
+        self.class_codes = []
+        self.extras = []
+        for field in STORE_STAT_FIELDS:
+            setattr(self, field, self._make_column([]))
+
+    @staticmethod
+    def _make_column(values):
+        """Build one stat column from a list of numbers"""
+        if np is not None:
+            return np.array(values, dtype=np.int64)
+        return list(values)
+
+    def _amounts(self, amount):
+        """Expand an amount into one amount per stored character"""
+        if np is not None:
+            return np.broadcast_to(np.asarray(amount, dtype=np.int64), (len(self),))
+        return _per_character_amounts(self.names, amount)
+
+    def __len__(self):
+        """Number of characters in the store"""
+        return len(self.names)
+
+    @classmethod
+    def from_characters(cls, characters):
+        """
+        Build a store from character dictionaries
+
+        Args:
+            characters: List of characters made by create_character/load_character
+
+        Returns: CharacterStore holding a copy of the characters' data
+        """
+        store = cls()
+        columns = {field: [] for field in STORE_STAT_FIELDS}
+        class_codes = []
+
+        for character in characters:
+            store.names.append(sys.intern(character["name"]))
+
+            class_name = character["class"]
+            if class_name not in store._class_codes_by_name:
+                store._class_codes_by_name[class_name] = len(store.class_names)
+                store.class_names.append(sys.intern(class_name))
+            class_codes.append(store._class_codes_by_name[class_name])
+
+            for field in STORE_STAT_FIELDS:
+                columns[field].append(character[field])
+
+            # Private runtime keys (leading underscore) are not carried over
+            store.extras.append({
+                key: (value.copy() if hasattr(value, "copy") else value)
+                for key, value in character.items()
+                if key not in columns and key not in ("name", "class") and not key.startswith("_")
+            })
+
+        store.class_codes = store._make_column(class_codes)
+        for field in STORE_STAT_FIELDS:
+            setattr(store, field, store._make_column(columns[field]))
+        return store
+
+    def to_characters(self):
+        """
+        Export the store back to character dictionaries
+
+        Returns: List of character dictionaries in the same format as
+                 create_character/load_character
+        """
+        if np is not None:
+            # tolist() converts to plain Python ints in one pass
+            columns = {field: getattr(self, field).tolist() for field in STORE_STAT_FIELDS}
+            class_codes = self.class_codes.tolist()
+        else:
+            columns = {field: getattr(self, field) for field in STORE_STAT_FIELDS}
+            class_codes = self.class_codes
+
+        characters = []
+        for i, name in enumerate(self.names):
+            character = Character({"name": name, "class": self.class_names[class_codes[i]]})
+            for field in STORE_STAT_FIELDS:
+                character[field] = columns[field][i]
+            for key, value in self.extras[i].items():
+                character[key] = value.copy() if hasattr(value, "copy") else value
+            characters.append(character)
+        return characters
+
+    def is_dead(self):
+        """
+        Vectorized is_character_dead
+
+        Returns: Boolean array (or list) that is True where health <= 0
+        """
+        if np is not None:
+            return self.health <= 0
+        return [health <= 0 for health in self.health]
+
+    def heal(self, amount):
+        """
+        Vectorized heal_character
+
+        Args:
+            amount: Heal amount, or one amount per character
+
+        Returns: Actual amount healed for each character
+        """
+        amounts = self._amounts(amount)
+
+        if np is not None:
+            healed = np.where(amounts < 0, 0, np.minimum(amounts, self.max_health - self.health))
+            self.health += healed
+            return healed
+
+        healed = []
+        for i, heal in enumerate(amounts):
+            actual_heal = 0 if heal < 0 else min(heal, self.max_health[i] - self.health[i])
+            self.health[i] += actual_heal
+            healed.append(actual_heal)
+        return healed
+
+    def add_gold(self, amount):
+        """
+        Vectorized add_gold
+
+        The whole store is checked first, so either every character is
+        updated or none are.
+
+        Args:
+            amount: Gold amount, or one amount per character
+
+        Returns: New gold total for each character
+        Raises: ValueError if any character's gold would become negative
+        """
+        amounts = self._amounts(amount)
+
+        if np is not None:
+            new_totals = self.gold + amounts
+            negative = np.flatnonzero(new_totals < 0)
+        else:
+            new_totals = [gold + change for gold, change in zip(self.gold, amounts)]
+            negative = [i for i, total in enumerate(new_totals) if total < 0]
+
+        if len(negative) > 0:
+            i = int(negative[0])
+            raise ValueError(
+                f"Gold total cannot be negative. {self.names[i]} only has {int(self.gold[i])} gold."
+            )
+
+        self.gold = new_totals
+        if _active_ledger is not None:
+            for name, change, new_total in zip(self.names, amounts, new_totals):
+                if change:
+                    _active_ledger.record(LEDGER_GOLD, name, "", int(change), int(new_total))
+        return new_totals
+
+    def gain_experience(self, xp_amount):
+        """
+        Vectorized gain_experience
+
+        Uses the same level up rules (level_up_xp = level * 100, +10 max
+        health, +2 strength, +2 magic, full heal). Dead characters are
+        skipped instead of raising CharacterDeadError.
+
+        Args:
+            xp_amount: XP amount, or one amount per character
+
+        Returns: Number of levels gained by each character (0 for the dead)
+        """
+        amounts = self._amounts(xp_amount)
+
+        if np is not None:
+            alive = self.health > 0
+            self.experience += np.where(alive, amounts, 0)
+            # Leveling stops at the first level where level * 100 > experience
+            gained = np.where(alive, np.maximum(self.experience // 100 + 1 - self.level, 0), 0)
+            self.level += gained
+            self.max_health += 10 * gained
+            self.strength += 2 * gained
+            self.magic += 2 * gained
+            self.health = np.where(gained > 0, self.max_health, self.health)
+            return gained
+
+        levels_gained = []
+        for i, xp in enumerate(amounts):
+            if self.health[i] <= 0:
+                levels_gained.append(0)
+                continue
+            self.experience[i] += xp
+            gained = max(int(self.experience[i] // 100) + 1 - self.level[i], 0)
+            if gained:
+                self.level[i] += gained
+                self.max_health[i] += 10 * gained
+                self.strength[i] += 2 * gained
+                self.magic[i] += 2 * gained
+                self.health[i] = self.max_health[i]
+            levels_gained.append(gained)
+        return levels_gained
+
+# ============================================================================
+# ECONOMY LEDGER
+# ============================================================================
+
+# Binary layout of one ledger record: sequence number, record kind, delta,
+# balance after the change, name length and key length, followed by the
+# character name and the key (item ID, empty for gold) as UTF-8 bytes
+LEDGER_RECORD = struct.Struct("<QBqqHH")
+
+# Record kinds
+LEDGER_GOLD = 0
+LEDGER_ITEM = 1
+
+class EconomyLedger:
+    """
+    Append-only binary log of gold and item movements
+
+    Every record gets the next sequence number. Records are packed into an
+    in-memory buffer and appended to the file in batches of flush_every,
+    so recording a change costs a struct.pack and no I/O. Call flush()
+    (or use the ledger as a context manager) before reading the file back.
+    Recording is thread-safe.
+    """
+
+    def __init__(self, path, flush_every=256):
+        self.path = path
+        self.flush_every = flush_every
+        self.sequence = 0
+        self._buffer = bytearray()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        # Continue numbering from an existing ledger file
+        if os.path.exists(path):
+            for record in iter_ledger(path):
+                self.sequence = record[0]
+
+    def record(self, kind, name, key, delta, balance):
+        """
+        Append one record to the buffer
+
+        Args:
+            kind: LEDGER_GOLD or LEDGER_ITEM
+            name: Character name
+            key: Item ID (empty string for gold)
+            delta: Change in gold or item count
+            balance: Gold or item count after the change
+
+        Returns: The record's sequence number
+        """
+        name_bytes = name.encode("utf-8")
+        key_bytes = key.encode("utf-8")
+
+        with self._lock:
+            self.sequence += 1
+            self._buffer += LEDGER_RECORD.pack(
+                self.sequence, kind, delta, balance, len(name_bytes), len(key_bytes)
+            )
+            self._buffer += name_bytes
+            self._buffer += key_bytes
+
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._write_buffer()
+            return self.sequence
+
+    def flush(self):
+        """Append all buffered records to the ledger file"""
+        with self._lock:
+            self._write_buffer()
+
+    def _write_buffer(self):
+        """Append the buffer to the file; the caller holds self._lock"""
+        if not self._buffer:
+            return
+        with open(self.path, "ab") as file:
+            file.write(self._buffer)
+        self._buffer.clear()
+        self._pending = 0
+
+    def close(self):
+        """Flush the ledger"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+# Ledger that gold and item changes are recorded to (None = not recording)
+_active_ledger = None
+
+def set_ledger(ledger):
+    """
+    Start recording gold and item changes to a ledger
+
+    Args:
+        ledger: EconomyLedger, or None to stop recording
+
+    Returns: The previously active ledger (or None)
+    """
+    global _active_ledger
+    previous = _active_ledger
+    _active_ledger = ledger
+    return previous
+
+def get_ledger():
+    """Get the active EconomyLedger, or None if nothing is being recorded"""
+    return _active_ledger
+
+def record_gold_change(character, delta):
+    """Record a gold change that has already been applied to the character"""
+    if _active_ledger is not None and delta:
+        _active_ledger.record(LEDGER_GOLD, character.get("name", "unknown_character"), "", delta, character["gold"])
+
+def record_item_change(character, item_id, delta, count):
+    """Record an item count change; count is the quantity owned afterwards"""
+    if _active_ledger is not None and delta:
+        _active_ledger.record(LEDGER_ITEM, character.get("name", "unknown_character"), item_id, delta, count)
+
+def iter_ledger(path):
+    """
+    Read the records of a ledger file in order
+
+    Args:
+        path: Ledger file path
+
+    Yields: Tuples of (sequence, kind, name, key, delta, balance)
+    Raises: InvalidSaveDataError if the file ends partway through a record
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    offset = 0
+    header_size = LEDGER_RECORD.size
+    while offset < len(data):
+        if offset + header_size > len(data):
+            raise InvalidSaveDataError(path, f"truncated ledger record at byte {offset}")
+        sequence, kind, delta, balance, name_length, key_length = LEDGER_RECORD.unpack_from(data, offset)
+        offset += header_size
+
+        end = offset + name_length + key_length
+        if end > len(data):
+            raise InvalidSaveDataError(path, f"truncated ledger record {sequence}")
+        name = data[offset:offset + name_length].decode("utf-8")
+        key = data[offset + name_length:end].decode("utf-8")
+        offset = end
+
+        yield sequence, kind, name, key, delta, balance
+
+def replay_ledger(path, character_name=None):
+    """
+    Rebuild gold and item balances from a ledger file
+
+    Args:
+        path: Ledger file path
+        character_name: Only replay this character (default: everyone)
+
+    Returns: Dictionary of name -> {'gold': balance or None, 'items': {item_id: count}}
+    """
+    balances = {}
+    for sequence, kind, name, key, delta, balance in iter_ledger(path):
+        if character_name is not None and name != character_name:
+            continue
+        entry = balances.setdefault(name, {"gold": None, "items": {}})
+        if kind == LEDGER_GOLD:
+            entry["gold"] = balance
+        else:
+            entry["items"][key] = balance
+    return balances
+
+def verify_ledger(path):
+    """
+    Check that a ledger file is internally consistent
+
+    Sequence numbers must increase, and each record's balance minus its
+    delta must equal the previous balance for the same character and key.
+
+    Args:
+        path: Ledger file path
+
+    Returns: List of (sequence, problem description); empty if consistent
+    """
+    problems = []
+    last_sequence = 0
+    last_balance = {}
+
+    for sequence, kind, name, key, delta, balance in iter_ledger(path):
+        if sequence <= last_sequence:
+            problems.append((sequence, f"sequence number after {last_sequence}"))
+        last_sequence = sequence
+
+        previous = last_balance.get((kind, name, key))
+        if previous is not None and balance - delta != previous:
+            label = "gold" if kind == LEDGER_GOLD else key
+            problems.append((sequence, f"{name} {label} went from {previous} to {balance} with delta {delta}"))
+        last_balance[(kind, name, key)] = balance
+
+    return problems
+
+def verify_character_balance(character, path):
+    """
+    Compare a character's gold and items with the balances in a ledger
+
+    Only gold and items that appear in the ledger are compared.
+
+    Args:
+        character: Character dictionary
+        path: Ledger file path
+
+    Returns: List of mismatch descriptions; empty if everything matches
+    """
+    entry = replay_ledger(path, character["name"]).get(character["name"])
+    if entry is None:
+        return []
+
+    mismatches = []
+    if entry["gold"] is not None and entry["gold"] != character["gold"]:
+        mismatches.append(f"gold: ledger {entry['gold']}, character {character['gold']}")
+    for item_id, count in entry["items"].items():
+        owned = character["inventory"].count(item_id)
+        if owned != count:
+            mismatches.append(f"{item_id}: ledger {count}, character {owned}")
+    return mismatches
+
 # ============================================================================
 # VALIDATION
 # ============================================================================
 
+# Required character fields and their types, used by validate_character_data
+CHARACTER_SCHEMA = {
+    "name": str,
+    "class": str,
+    "level": int,
+    "health": int,
+    "max_health": int,
+    "strength": int,
+    "magic": int,
+    "experience": int,
+    "gold": int,
+    "inventory": list,
+    "active_quests": list,
+    "completed_quests": list
+}
+
+# Validators already built by compile_character_validator, keyed by schema
+_compiled_validators = {}
+
+def compile_character_validator(schema=None):
+    """
+    Build (once per schema) a function that validates one character
+
+    The returned validator checks every field in a single pass and only
+    builds an error message when a check fails. A list field may also hold
+    a list-like container that provides to_save_list() (such as
+    inventory_system.Inventory).
+
+    Args:
+        schema: Dictionary of {field_name: expected_type}
+                (defaults to CHARACTER_SCHEMA)
+
+    Returns: Function validator(character) that returns True if valid
+    Raises (from the validator): InvalidSaveDataError if a field is missing
+                                 or has the wrong type
+    """
+    if schema is None:
+        schema = CHARACTER_SCHEMA
+
+    schema_key = tuple(schema.items())
+    if schema_key in _compiled_validators:
+        return _compiled_validators[schema_key]
+
+    fields = schema_key
+
+    def validator(character):
+        for key, expected_type in fields:
+            try:
+                value = character[key]
+            except KeyError:
+                raise InvalidSaveDataError(
+                    character.get("name", "unknown_character"), f"missing required key: {key}"
+                )
+            if not isinstance(value, expected_type) and not (
+                expected_type is list and hasattr(value, "to_save_list")
+            ):
+                raise InvalidSaveDataError(
+                    character.get("name", "unknown_character"),
+                    f"{key} (expected {expected_type.__name__}, got {type(value).__name__})"
+                )
+        return True
+
+    _compiled_validators[schema_key] = validator
+    return validator
+
 def validate_character_data(character):
     """
     Validate that character dictionary has all required fields
@@ -434,58 +1342,30 @@ def validate_character_data(character):
     Returns: True if valid
     Raises: InvalidSaveDataError if missing fields or invalid types
     """
-    # TODO: Implement validation
-    # Check all required keys exist
-    # Check that numeric values are numbers
-    # Check that lists are actually lists
-    EXPECTED_FIELDS = {
-        "name": str, 
-        "class": str, 
-        "level": int, 
-        "health": int, 
-        "max_health": int, 
-        "strength": int, 
-        "magic": int, 
-        "experience": int, 
-        "gold": int, 
-        "inventory": list,
-        "active_quests": list, 
-        "completed_quests": list
-    }
-    
-    # 1. Check all required keys exist
-    for key in EXPECTED_FIELDS:
-        if key not in character:
-            raise InvalidSaveDataError(key_error=key)
-            
-    # 2. Check for correct data types
-    for key, expected_type in EXPECTED_FIELDS.items():
-        value = character[key]
-        
-        # Use isinstance check for type validation
-        if not isinstance(value, expected_type):
-            # Special case: allow float/bool values that could be mistakenly loaded as numbers
-            # or strings that look like numbers, but report the type mismatch.
-            if key in ["name", "class"] and not value:
-                 raise InvalidSaveDataError(type_error=f"{key} (cannot be empty)")
-            
-            # Allow int/float interchangeability for numbers loaded from string files, but
-            # only if the *primary* type check fails. 
-            if expected_type is int and not isinstance(value, (int, float)):
-                 raise InvalidSaveDataError(type_error=f"{key} (expected int, got {type(value).__name__})")
-            
-            if expected_type is list and not isinstance(value, list):
-                 raise InvalidSaveDataError(type_error=f"{key} (expected list, got {type(value).__name__})")
-            
-            if expected_type is str and not isinstance(value, str):
-                 raise InvalidSaveDataError(type_error=f"{key} (expected str, got {type(value).__name__})")
-            
-            # Simplified strict type check for all cases
-            if not isinstance(value, expected_type):
-                 raise InvalidSaveDataError(type_error=f"{key} (expected {expected_type.__name__}, got {type(value).__name__})")
+    return compile_character_validator()(character)
 
-    # If the loop completes without raising an exception, the data is valid.
-    return True
+def validate_characters(characters, schema=None):
+    """
+    Validate many characters at once
+
+    Args:
+        characters: List of character dictionaries
+        schema: Dictionary of {field_name: expected_type}
+                (defaults to CHARACTER_SCHEMA)
+
+    Returns: List of (index, InvalidSaveDataError) pairs, one for each
+             character that failed validation (empty if all are valid)
+    """
+    validator = compile_character_validator(schema)
+    failures = []
+
+    for i, character in enumerate(characters):
+        try:
+            validator(character)
+        except InvalidSaveDataError as e:
+            failures.append((i, e))
+
+    return failures
 
 # ============================================================================
 # TESTING
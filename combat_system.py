@@ -10,6 +10,8 @@ Handles combat mechanics
 """
 import random
 import character_manager
+import inventory_system
+import quest_handler
 from character_manager import is_character_dead
 from custom_exceptions import (
     InvalidTargetError,
@@ -18,6 +20,12 @@ from custom_exceptions import (
     AbilityOnCooldownError
 )
 
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional; LootTable draws batches in pure Python without it
+    np = None
+
 # ============================================================================
 # ENEMY DEFINITIONS
 # ============================================================================
@@ -53,7 +61,7 @@ def create_enemy(enemy_type):
     stats = BASE_STATS[enemy_type]
     
     # 2. Implement enemy creation (health and max_health are the same initially)
-    enemy_data = {
+    enemy_data = character_manager.Character({
         "name": enemy_type.capitalize(), # Capitalize for display name
         "type": enemy_type,
         "health": stats["health"],
@@ -62,7 +70,7 @@ def create_enemy(enemy_type):
         "magic": stats["magic"],
         "xp_reward": stats["xp_reward"],
         "gold_reward": stats["gold_reward"],
-    }
+    })
     
     return enemy_data
 
@@ -103,14 +111,20 @@ class SimpleBattle:
     Manages combat between character and enemy
     """
     
-    def __init__(self, character, enemy):
-        """Initialize battle with character and enemy"""
+    def __init__(self, character, enemy, loot_tables=None):
+        """
+        Initialize battle with character and enemy
+        
+        loot_tables (optional, from build_loot_tables) are used to roll
+        the enemy's loot drop when the player wins.
+        """
         # TODO: Implement initialization
         # Store character and enemy
         # Set combat_active flag
         # Initialize turn counter
         self.character = character
         self.enemy = enemy
+        self.loot_tables = loot_tables
         
         # Set combat_active flag
         self.combat_active = False
@@ -123,7 +137,8 @@ class SimpleBattle:
         Start the combat loop
         
         Returns: Dictionary with battle results:
-                {'winner': 'player'|'enemy', 'xp_gained': int, 'gold_gained': int}
+                {'winner': 'player'|'enemy', 'xp_gained': int, 'gold_gained': int,
+                 'loot': [item_id, ...]}
         
         Raises: CharacterDeadError if character is already dead
         """
@@ -142,6 +157,9 @@ class SimpleBattle:
             self.turn += 1
             print(f"\nTurn {self.turn}")
             
+            # Timed item effects (buffs, effects over time) run in battle turns
+            inventory_system.tick_effects(self.character)
+            
             # 1. Character's Turn
             if not is_character_dead(self.character):
                 self._calculate_damage(self.character, self.enemy)
@@ -173,11 +191,20 @@ class SimpleBattle:
         # Award XP and gold if player wins (This would normally call the gain_experience and add_gold functions)
         if winner == 'player':
             print(f"Rewards: +{xp_gained} XP, +{gold_gained} Gold.")
+            quest_handler.dispatch_quest_event(self.character, f"enemy_defeated:{self.enemy.get('type')}")
+        
+        loot = []
+        if winner == 'player' and self.loot_tables is not None:
+            loot = roll_loot(self.enemy, self.loot_tables)
+
+        # The enemy is not used after the battle; drop its runtime state
+        character_manager.forget_character(self.enemy)
         
         return {
             'winner': winner, 
             'xp_gained': xp_gained, 
-            'gold_gained': gold_gained
+            'gold_gained': gold_gained,
+            'loot': loot
         }
     
     def player_turn(self):
@@ -305,6 +332,7 @@ class SimpleBattle:
         # Prevent negative health
         if target["health"] < 0:
             target["health"] = 0
+        character_manager.touch_character(target)
     
     def check_battle_end(self):
         """
@@ -350,6 +378,7 @@ def _apply_damage(target, damage):
     # Prevent negative health
     if target["health"] < 0:
         target["health"] = 0
+    character_manager.touch_character(target)
 
 def _heal_target(target, amount):
     """Heals target, returns actual amount healed."""
@@ -357,6 +386,7 @@ def _heal_target(target, amount):
     needed_heal = max_health - target["health"]
     actual_heal = min(amount, needed_heal)
     target["health"] += actual_heal
+    character_manager.touch_character(target)
     return actual_heal
 
 def use_special_ability(character, enemy):
@@ -468,20 +498,29 @@ def can_character_fight(character):
         
     return True
 
-def get_victory_rewards(enemy):
+def get_victory_rewards(enemy, loot_tables=None):
     """
     Calculate rewards for defeating enemy
     
-    Returns: Dictionary with 'xp' and 'gold'
+    Args:
+        enemy: Enemy dictionary
+        loot_tables: Optional tables from build_loot_tables; when given,
+                     a loot drop is rolled as well
+    
+    Returns: Dictionary with 'xp' and 'gold' (and 'loot', a list of item
+             IDs, when loot_tables is given)
     """
     # TODO: Implement reward calculation
     xp = enemy.get('xp_reward', 0)
     gold = enemy.get('gold_reward', 0)
     
-    return {
+    rewards = {
         'xp': xp,
         'gold': gold
     }
+    if loot_tables is not None:
+        rewards['loot'] = roll_loot(enemy, loot_tables)
+    return rewards
 
 def display_combat_stats(character, enemy):
     """
@@ -490,13 +529,23 @@ def display_combat_stats(character, enemy):
     Shows both character and enemy health/stats
     """
     # TODO: Implement status display
-    print(f"\n{character['name']}: HP={character['health']}/{character['max_health']}")
-    print(f"{enemy['name']}: HP={enemy['health']}/{enemy['max_health']}")
-    print("\n" + "="*40)
-    print(f"| {character.get('name', 'Player'):<18} | {enemy.get('name', 'Enemy'):<18} |")
-    print("-" * 40)
-    print(f"| HP: {character.get('health'):<14} | HP: {enemy.get('health'):<14} |")
-    print("="*40)
+    # The text is cached until the character or the enemy changes
+    print(character_manager.cached_render(
+        character, "combat_stats", (enemy, character_manager.get_character_version(enemy)),
+        lambda: _render_combat_stats(character, enemy)
+    ))
+
+def _render_combat_stats(character, enemy):
+    """Build the display_combat_stats text"""
+    return "\n".join([
+        f"\n{character['name']}: HP={character['health']}/{character['max_health']}",
+        f"{enemy['name']}: HP={enemy['health']}/{enemy['max_health']}",
+        "\n" + "="*40,
+        f"| {character.get('name', 'Player'):<18} | {enemy.get('name', 'Enemy'):<18} |",
+        "-" * 40,
+        f"| HP: {character.get('health'):<14} | HP: {enemy.get('health'):<14} |",
+        "="*40
+    ])
 
 def display_battle_log(message):
     """
@@ -506,6 +555,176 @@ def display_battle_log(message):
     print(f">>> {message}")
     
 
+# ============================================================================
+# LOOT TABLES
+# ============================================================================
+
+# Which items each enemy type can drop and how often it drops anything.
+# Items up to max_cost are eligible; cheaper items are more likely.
+LOOT_PROFILES = {
+    "goblin": {"max_cost": 100, "drop_chance": 0.3},
+    "orc": {"max_cost": 250, "drop_chance": 0.5},
+    "dragon": {"max_cost": None, "drop_chance": 0.9},
+}
+
+class LootTable:
+    """
+    Weighted drop table sampled with Vose's alias method
+
+    Building the table is O(n); each draw is O(1) (one column pick and one
+    coin flip) no matter how many outcomes there are. An outcome of None
+    means nothing dropped.
+    """
+
+    def __init__(self, outcomes, weights):
+        """
+        Build the alias table
+
+        Args:
+            outcomes: List of outcomes (item IDs, or None for no drop)
+            weights: Non-negative weight for each outcome (at least one > 0)
+
+        Raises: ValueError if the weights are empty, negative or all zero
+        """
+        if len(outcomes) != len(weights) or not outcomes:
+            raise ValueError("Loot table needs one weight per outcome.")
+        total = float(sum(weights))
+        if total <= 0 or min(weights) < 0:
+            raise ValueError("Loot weights must be non-negative with a positive total.")
+
+        count = len(outcomes)
+        self.outcomes = list(outcomes)
+        self.probabilities = [weight / total for weight in weights]
+        self.accept = [1.0] * count
+        self.alias = list(range(count))
+
+        # Scale so the average column height is 1, then pair each short
+        # column with a tall one that tops it up
+        scaled = [p * count for p in self.probabilities]
+        small = [i for i, height in enumerate(scaled) if height < 1.0]
+        large = [i for i, height in enumerate(scaled) if height >= 1.0]
+        while small and large:
+            short, tall = small.pop(), large.pop()
+            self.accept[short] = scaled[short]
+            self.alias[short] = tall
+            scaled[tall] += scaled[short] - 1.0
+            (small if scaled[tall] < 1.0 else large).append(tall)
+        # Whatever is left is 1.0 up to rounding error
+        for i in small + large:
+            self.accept[i] = 1.0
+
+        self._accept_array = None
+        self._alias_array = None
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def draw(self, rng=random):
+        """
+        Draw one outcome
+
+        Args:
+            rng: Random number source with a random() method (default: random module)
+
+        Returns: The outcome (an item ID, or None for no drop)
+        """
+        column = int(rng.random() * len(self.outcomes))
+        if rng.random() < self.accept[column]:
+            return self.outcomes[column]
+        return self.outcomes[self.alias[column]]
+
+    def draw_indices(self, count, seed=None):
+        """
+        Draw many outcomes at once, as indices into self.outcomes
+
+        Uses NumPy to draw the whole batch with a few array operations when
+        it is installed, and falls back to repeated draw() calls otherwise.
+
+        Args:
+            count: Number of draws
+            seed: Optional seed for reproducible draws
+
+        Returns: Array (or list without NumPy) of outcome indices
+        """
+        if np is None:
+            rng = random.Random(seed)
+            indices = []
+            for _ in range(count):
+                column = int(rng.random() * len(self.outcomes))
+                indices.append(column if rng.random() < self.accept[column] else self.alias[column])
+            return indices
+
+        if self._accept_array is None:
+            self._accept_array = np.asarray(self.accept)
+            self._alias_array = np.asarray(self.alias)
+        rng = np.random.default_rng(seed)
+        columns = rng.integers(0, len(self.outcomes), size=count)
+        keep = rng.random(count) < self._accept_array[columns]
+        return np.where(keep, columns, self._alias_array[columns])
+
+    def count_drops(self, count, seed=None):
+        """
+        Simulate count kills and tally what dropped
+
+        Returns: Dictionary of outcome -> number of times it was drawn
+        """
+        indices = self.draw_indices(count, seed)
+        if np is not None:
+            tallies = np.bincount(indices, minlength=len(self.outcomes)).tolist()
+        else:
+            tallies = [0] * len(self.outcomes)
+            for index in indices:
+                tallies[index] += 1
+        return dict(zip(self.outcomes, tallies))
+
+def build_loot_tables(item_data_dict, profiles=None):
+    """
+    Build a LootTable for each enemy type from item data
+
+    Each eligible item gets weight 1 / cost (free items count as cost 1),
+    scaled so all items together drop with the profile's drop_chance.
+
+    Args:
+        item_data_dict: Dictionary of all item data (from game_data.load_items)
+        profiles: Enemy type -> {'max_cost', 'drop_chance'} (default: LOOT_PROFILES)
+
+    Returns: Dictionary of enemy type -> LootTable
+    """
+    profiles = LOOT_PROFILES if profiles is None else profiles
+    tables = {}
+
+    for enemy_type, profile in profiles.items():
+        max_cost = profile.get("max_cost")
+        eligible = [
+            item_id for item_id, item_data in sorted(item_data_dict.items())
+            if max_cost is None or item_data.get("cost", 0) <= max_cost
+        ]
+        drop_chance = profile.get("drop_chance", 0) if eligible else 0
+
+        item_weights = [1.0 / max(1, item_data_dict[item_id].get("cost", 0)) for item_id in eligible]
+        item_total = sum(item_weights)
+        weights = [1.0 - drop_chance] + [drop_chance * weight / item_total for weight in item_weights]
+        tables[enemy_type] = LootTable([None] + eligible, weights)
+
+    return tables
+
+def roll_loot(enemy, loot_tables, rng=random):
+    """
+    Roll an enemy's loot drop
+
+    Args:
+        enemy: Enemy dictionary (from create_enemy)
+        loot_tables: Tables from build_loot_tables
+        rng: Random number source (default: random module)
+
+    Returns: List of dropped item IDs (empty if nothing dropped)
+    """
+    table = loot_tables.get(enemy.get("type"))
+    if table is None:
+        return []
+    item_id = table.draw(rng)
+    return [] if item_id is None else [item_id]
+
 # ============================================================================
 # TESTING
 # ============================================================================
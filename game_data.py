@@ -10,6 +10,10 @@ This module handles loading and validating game data from text files.
 """
 
 import os
+import re
+import bisect
+import heapq
+import collections
 from custom_exceptions import (
     InvalidDataFormatError,
     MissingDataFileError,
@@ -32,6 +36,14 @@ def load_quests(filename="data/quests.txt"):
     REWARD_GOLD: 50
     REQUIRED_LEVEL: 1
     PREREQUISITE: previous_quest_id (or NONE)
+    REQUIRES: ANY 2 OF (quest_a, quest_b, quest_c) AND LEVEL 5   (optional)
+    OBJECTIVE: enemy_defeated:goblin 3   (optional, may be repeated)
+    
+    REQUIRES takes an AND/OR expression over completed quests and the
+    character's level (see parse_requirement). It applies on top of
+    REQUIRED_LEVEL and PREREQUISITE, so existing quests load unchanged.
+    OBJECTIVE lines give the events the quest tracks (see parse_objective);
+    without them a description like "Defeat 3 goblins" implies one.
     
     Returns: Dictionary of quests {quest_id: quest_data_dict}
     Raises: MissingDataFileError, InvalidDataFormatError, CorruptedDataError
@@ -81,6 +93,13 @@ def load_items(filename="data/items.txt"):
     EFFECT: stat_name:value (e.g., strength:5 or health:20)
     COST: 100
     DESCRIPTION: Item description
+    STACK_SIZE: 10 (optional, max copies per inventory slot)
+    
+    EFFECT may also list several comma-separated effects, each optionally
+    a percentage and/or timed (see parse_effect_terms), e.g.
+    "health:25%, strength:5@3". A single plain "stat:value" effect is
+    stored as {'stat': ..., 'value': ...}; any other effect is kept as
+    its string.
     
     Returns: Dictionary of items {item_id: item_data_dict}
     Raises: MissingDataFileError, InvalidDataFormatError, CorruptedDataError
@@ -150,6 +169,9 @@ def load_items(filename="data/items.txt"):
         # NOTE: The helper parse_item_block is now responsible for returning the final, fully-parsed dictionary.
         items[item_id] = current_item
 
+    # Keep the search index in step with the loaded items
+    item_search_index.update(items)
+
     return items
 
 def validate_quest_data(quest_dict):
@@ -211,6 +233,22 @@ def validate_quest_data(quest_dict):
                     f"Quest ID '{quest_id}' field '{key}' must be a string, but found: {type(value).__name__}."
                 )
 
+    # 4. Optional objectives must be (event, count) pairs
+    for objective in quest_dict.get('objectives', []):
+        if (not isinstance(objective, tuple) or len(objective) != 2
+                or not isinstance(objective[0], str) or not isinstance(objective[1], int) or objective[1] < 1):
+            raise InvalidDataFormatError(
+                f"Quest ID '{quest_id}' objectives must be (event, count) pairs, but found: {objective!r}."
+            )
+
+    # 5. The optional requirement expression must be a parsed requirement tree
+    if 'requires' in quest_dict:
+        requires = quest_dict['requires']
+        if not isinstance(requires, tuple) or not requires or requires[0] not in ('quest', 'level', 'any'):
+            raise InvalidDataFormatError(
+                f"Quest ID '{quest_id}' field 'requires' must be a requirement tree, but found: {requires!r}."
+            )
+
     return True
 
 def validate_item_data(item_dict):
@@ -266,31 +304,32 @@ def validate_item_data(item_dict):
             f"Item ID '{item_id}' cost must be a non-negative integer, but found: {item_cost}."
         )
 
-    # 4. Validate 'effect' field structure and types
-    item_effect_str = item_dict["effect"]
-    
-    effect_parts = [p.strip() for p in item_effect_str.split(':', 1)] 
-    
-    if len(effect_parts) != 2:
+    # Optional 'stack_size' field (must be a positive integer)
+    stack_size = item_dict.get("stack_size", 1)
+    if not isinstance(stack_size, int) or stack_size < 1:
         raise InvalidDataFormatError(
-            f"Item ID '{item_id}' effect string has invalid format. Expected 'stat:value', got '{item_effect_str}'."
+            f"Item ID '{item_id}' stack_size must be a positive integer, but found: {stack_size}."
         )
+
+    # 4. Validate 'effect' field structure and types
+    item_effect = item_dict["effect"]
     
-    effect_stat = effect_parts[0]
-    effect_value_str = effect_parts[1]
+    if isinstance(item_effect, dict):
+        # Single effect already parsed by load_items
+        if not isinstance(item_effect.get("stat"), str) or not item_effect["stat"].strip():
+            raise InvalidDataFormatError(
+                f"Item ID '{item_id}' effect 'stat' must be a non-empty string."
+            )
+        if not isinstance(item_effect.get("value"), int):
+            raise InvalidDataFormatError(
+                f"Item ID '{item_id}' effect 'value' must be an integer, but found: {item_effect.get('value')}."
+            )
+        return True
     
-    if not effect_stat.strip():
-        raise InvalidDataFormatError(
-            f"Item ID '{item_id}' effect 'stat' must be a non-empty string."
-        )
-        
     try:
-        # Check if the value part is an integer
-        int(effect_value_str) 
-    except ValueError:
-        raise InvalidDataFormatError(
-            f"Item ID '{item_id}' effect 'value' must be an integer, but found: {effect_value_str}."
-        )
+        parse_effect_terms(item_effect)
+    except InvalidDataFormatError as e:
+        raise InvalidDataFormatError(f"Item ID '{item_id}' effect is invalid: {e}")
         
     return True
 
@@ -379,6 +418,191 @@ DESCRIPTION: Restores a small amount of health instantly.
                 print(f"Error: Could not write to file '{filename}'. Check permissions. Details: {e}")
 
 
+# ============================================================================
+# ITEM SEARCH
+# ============================================================================
+
+# How much a query token matching each item field counts towards the rank
+SEARCH_FIELD_WEIGHTS = {
+    "name": 3,
+    "item_id": 2,
+    "description": 1
+}
+
+# Maximum number of query results each search index keeps cached
+SEARCH_CACHE_SIZE = 128
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric search tokens"""
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+class ItemSearchIndex:
+    """
+    Inverted index over item names, IDs and descriptions
+
+    Each token maps to the items containing it and a field-weighted score.
+    A sorted list of all tokens allows prefix lookups by bisect, so a
+    query only touches the tokens that start with its words instead of
+    every item. update() re-indexes only the items that changed.
+    The results of the SEARCH_CACHE_SIZE most recent queries are cached
+    until the next update that changes anything.
+    """
+
+    def __init__(self, item_data_dict=None):
+        self._postings = {}    # token -> {item_id: score}
+        self._tokens = []      # sorted list of every indexed token
+        self._item_tokens = {} # item_id -> {token: score} (for removal)
+        self._items = {}
+        self._results = collections.OrderedDict()  # (query, limit) -> ranked results, most recent last
+        if item_data_dict:
+            self.update(item_data_dict)
+
+    def _item_scores(self, item_id, item_data):
+        scores = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            value = item_id if field == "item_id" else item_data.get(field, "")
+            for token in tokenize(value):
+                scores[token] = scores.get(token, 0) + weight
+        return scores
+
+    def _add(self, item_id, item_data):
+        scores = self._item_scores(item_id, item_data)
+        for token, score in scores.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                bisect.insort(self._tokens, token)
+            posting[item_id] = score
+        self._item_tokens[item_id] = scores
+        self._items[item_id] = dict(item_data)
+
+    def _remove(self, item_id):
+        for token in self._item_tokens.pop(item_id):
+            posting = self._postings[token]
+            del posting[item_id]
+            if not posting:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+        del self._items[item_id]
+
+    def update(self, item_data_dict):
+        """
+        Bring the index in line with new item data
+
+        Args:
+            item_data_dict: Dictionary of all item data (item_id -> data)
+
+        Returns: Number of items added, changed or removed
+        """
+        changed = 0
+        for item_id in [i for i in self._items if i not in item_data_dict]:
+            self._remove(item_id)
+            changed += 1
+
+        for item_id, item_data in item_data_dict.items():
+            if self._items.get(item_id) == item_data:
+                continue
+            if item_id in self._items:
+                self._remove(item_id)
+            self._add(item_id, item_data)
+            changed += 1
+
+        if changed:
+            self._results.clear()
+        return changed
+
+    def __len__(self):
+        return len(self._items)
+
+    def _token_range(self, word):
+        """Slice bounds of the sorted tokens that start with word"""
+        start = bisect.bisect_left(self._tokens, word)
+        end = bisect.bisect_left(self._tokens, word + "\uffff", start)
+        return start, end
+
+    def _matches(self, word, start, end):
+        """Scores of the items matching one query word (exact token matches count double)"""
+        matches = {}
+        for token in self._tokens[start:end]:
+            factor = 2 if token == word else 1
+            for item_id, score in self._postings[token].items():
+                if score * factor > matches.get(item_id, 0):
+                    matches[item_id] = score * factor
+        return matches
+
+    def _candidate_score(self, item_id, word):
+        """Best score of one item's tokens for a query word (0 if none match)"""
+        best = 0
+        for token, score in self._item_tokens[item_id].items():
+            if token.startswith(word):
+                best = max(best, score * 2 if token == word else score)
+        return best
+
+    def search(self, query, limit=10):
+        """
+        Find items matching every word of a query (by whole word or prefix)
+
+        Results of recent queries are cached until the next update().
+
+        Args:
+            query: Search text, e.g. "sword" or "heal pot"
+            limit: Maximum number of results (None for all)
+
+        Returns: List of (item_id, score) pairs, best match first
+        """
+        key = (query, limit)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            return list(cached)
+
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # 1. Only the rarest word walks the postings; the candidates it
+        #    finds are then checked against the other words one by one
+        ranges = {word: self._token_range(word) for word in words}
+        sizes = {
+            word: sum(len(self._postings[token]) for token in self._tokens[start:end])
+            for word, (start, end) in ranges.items()
+        }
+        rarest = min(words, key=sizes.get)
+        scores = self._matches(rarest, *ranges[rarest])
+
+        for word in words:
+            if word == rarest or not scores:
+                continue
+            next_scores = {}
+            for item_id, score in scores.items():
+                extra = self._candidate_score(item_id, word)
+                if extra:
+                    next_scores[item_id] = score + extra
+            scores = next_scores
+
+        # 2. Rank; a bounded heap avoids sorting every match
+        rank = lambda pair: (-pair[1], pair[0])
+        if limit is None:
+            ranked = sorted(scores.items(), key=rank)
+        else:
+            ranked = heapq.nsmallest(limit, scores.items(), key=rank)
+
+        self._results[key] = ranked
+        while len(self._results) > SEARCH_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return list(ranked)
+
+# Index over the items loaded by load_items
+item_search_index = ItemSearchIndex()
+
+def search_items(query, limit=10):
+    """
+    Search the items loaded by load_items by name, ID or description
+
+    Returns: List of (item_id, score) pairs, best match first
+    """
+    return item_search_index.search(query, limit)
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -434,6 +658,12 @@ def parse_quest_block(lines):
         elif processed_key == 'prerequisite':
             # Store 'NONE' as None, otherwise store the quest_id string
             quest_data['prerequisite'] = value
+        elif processed_key == 'requires':
+            # Optional AND/OR requirement expression (see parse_requirement)
+            quest_data['requires'] = parse_requirement(value)
+        elif processed_key == 'objective':
+            # Optional, may be repeated (see parse_objective)
+            quest_data.setdefault('objectives', []).append(parse_objective(value))
         else:
             print(f"Warning: Unknown quest key '{key}' encountered and ignored.")
             
@@ -443,9 +673,229 @@ def parse_quest_block(lines):
         if key not in quest_data:
             # You might need to import MissingDataFileError from custom_exceptions
             raise InvalidDataFormatError(f"Quest block is missing required field: '{key}'")
+    
+    # 3. Without OBJECTIVE lines, "Defeat N <enemy>" in the description is the objective
+    if 'objectives' not in quest_data:
+        objectives = objectives_from_description(quest_data['description'])
+        if objectives:
+            quest_data['objectives'] = objectives
             
     return quest_data
 
+# Quest objective events, "<event type>:<target>" (see parse_objective)
+OBJECTIVE_EVENT_TYPES = ("enemy_defeated", "item_acquired")
+OBJECTIVE_PATTERN = re.compile(
+    r"^(" + "|".join(OBJECTIVE_EVENT_TYPES) + r"):([A-Za-z0-9_]+)(?:\s+(\d+))?$"
+)
+# Objective implied by a description such as "Defeat 3 goblins ..."
+DEFEAT_OBJECTIVE_PATTERN = re.compile(r"\bDefeat (\d+) ([A-Za-z]+)", re.IGNORECASE)
+
+def parse_objective(text):
+    """
+    Parse a quest OBJECTIVE value
+    
+    Format: "<event type>:<target> [count]", e.g. "enemy_defeated:goblin 3"
+    or "item_acquired:health_potion" (count defaults to 1)
+    
+    Returns: Tuple of (event, count), e.g. ("enemy_defeated:goblin", 3)
+    Raises: InvalidDataFormatError if the objective is malformed
+    """
+    match = OBJECTIVE_PATTERN.match(text.strip())
+    if not match:
+        raise InvalidDataFormatError(
+            f"OBJECTIVE must look like '<{'|'.join(OBJECTIVE_EVENT_TYPES)}>:<target> [count]': '{text}'"
+        )
+    event_type, target, count = match.groups()
+    count = int(count) if count else 1
+    if count < 1:
+        raise InvalidDataFormatError(f"OBJECTIVE count must be at least 1: '{text}'")
+    return (f"{event_type}:{target.lower()}", count)
+
+def objectives_from_description(description):
+    """
+    Derive objectives from a description like "Defeat 3 goblins near the forest"
+    
+    Returns: List of (event, count) pairs (empty if the description has none)
+    """
+    objectives = []
+    for count, enemy in DEFEAT_OBJECTIVE_PATTERN.findall(description):
+        count = int(count)
+        enemy = enemy.lower()
+        if count != 1 and enemy.endswith('s'):
+            enemy = enemy[:-1]
+        if count > 0:
+            objectives.append((f"enemy_defeated:{enemy}", count))
+    return objectives
+
+# One token of a REQUIRES expression: a parenthesis, a comma or a word
+REQUIREMENT_TOKEN_PATTERN = re.compile(r"\s*(\(|\)|,|[A-Za-z0-9_]+)")
+REQUIREMENT_KEYWORDS = {'AND', 'OR', 'ANY', 'OF', 'LEVEL'}
+
+def parse_requirement(text):
+    """
+    Parse a quest REQUIRES expression
+    
+    Grammar (keywords are upper case, AND binds tighter than OR):
+        expr   := term (OR term)*
+        term   := atom (AND atom)*
+        atom   := quest_id | LEVEL n | ANY n OF (expr, expr, ...) | (expr)
+    E.g. "ANY 2 OF (goblin_hunter, orc_slayer, dragon_slayer) AND LEVEL 5"
+    
+    Args:
+        text: The expression string
+    
+    Returns: Requirement tree of nested tuples:
+        ('quest', quest_id), ('level', n) or ('any', n, (child, ...)),
+        where AND is ('any', <number of children>, ...) and OR is ('any', 1, ...)
+    Raises: InvalidDataFormatError if the expression is malformed
+    """
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = REQUIREMENT_TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise InvalidDataFormatError(f"Invalid character in REQUIRES: '{text[position:].strip()}'")
+        tokens.append(match.group(1))
+        position = match.end()
+    
+    cursor = [0]
+    
+    def peek():
+        return tokens[cursor[0]] if cursor[0] < len(tokens) else None
+    
+    def take(expected=None):
+        token = peek()
+        if token is None or (expected is not None and token != expected):
+            wanted = f"'{expected}'" if expected else "more input"
+            raise InvalidDataFormatError(f"REQUIRES expected {wanted} in '{text}'")
+        cursor[0] += 1
+        return token
+    
+    def number():
+        token = take()
+        if not token.isdigit():
+            raise InvalidDataFormatError(f"REQUIRES expected a number, found '{token}' in '{text}'")
+        return int(token)
+    
+    def combine(children, count):
+        return children[0] if len(children) == 1 else ('any', count, tuple(children))
+    
+    def expr():
+        terms = [term()]
+        while peek() == 'OR':
+            take()
+            terms.append(term())
+        return combine(terms, 1)
+    
+    def term():
+        atoms = [atom()]
+        while peek() == 'AND':
+            take()
+            atoms.append(atom())
+        return combine(atoms, len(atoms))
+    
+    def atom():
+        token = take()
+        if token == '(':
+            node = expr()
+            take(')')
+            return node
+        if token == 'LEVEL':
+            return ('level', number())
+        if token == 'ANY':
+            count = number()
+            take('OF')
+            take('(')
+            children = [expr()]
+            while peek() == ',':
+                take()
+                children.append(expr())
+            take(')')
+            if not 1 <= count <= len(children):
+                raise InvalidDataFormatError(
+                    f"REQUIRES 'ANY {count} OF' needs between 1 and {len(children)} in '{text}'"
+                )
+            return ('any', count, tuple(children))
+        if token in REQUIREMENT_KEYWORDS or token in '(),':
+            raise InvalidDataFormatError(f"REQUIRES unexpected '{token}' in '{text}'")
+        return ('quest', token)
+    
+    node = expr()
+    if peek() is not None:
+        raise InvalidDataFormatError(f"REQUIRES unexpected '{peek()}' in '{text}'")
+    return node
+
+def format_requirement(node):
+    """
+    Format a requirement tree back into REQUIRES syntax
+    
+    Returns: Expression string (parse_requirement(format_requirement(n)) == n)
+    """
+    kind = node[0]
+    if kind == 'quest':
+        return node[1]
+    if kind == 'level':
+        return f"LEVEL {node[1]}"
+    count, children = node[1], node[2]
+    parts = [format_requirement(child) for child in children]
+    if count == 1:
+        return "(" + " OR ".join(parts) + ")"
+    if count == len(children):
+        return "(" + " AND ".join(parts) + ")"
+    return f"ANY {count} OF ({', '.join(parts)})"
+
+def requirement_quests(node):
+    """
+    All quest IDs a requirement tree refers to
+    
+    Returns: List of quest IDs, in order of first appearance
+    """
+    if node[0] == 'quest':
+        return [node[1]]
+    if node[0] == 'level':
+        return []
+    found = []
+    for child in node[2]:
+        for quest_id in requirement_quests(child):
+            if quest_id not in found:
+                found.append(quest_id)
+    return found
+
+# One effect term: stat:value, optionally a percentage ("%") and/or timed,
+# either a temporary buff lasting N ticks ("@N") or applied every tick for
+# N ticks ("*N"). E.g. "health:20", "health:25%", "strength:5@3", "health:4*5"
+EFFECT_TERM_PATTERN = re.compile(r"^([A-Za-z_]+)\s*:\s*([+-]?\d+)(%?)(?:([@*])(\d+))?$")
+
+def parse_effect_terms(effect_str):
+    """
+    Parse an item EFFECT string into its effect terms
+    
+    Args:
+        effect_str: One or more comma-separated terms, e.g. "health:20, magic:5@3"
+    
+    Returns: List of (stat, value, percent, mode, duration) tuples, where
+             percent is a bool, mode is None, "@" (buff) or "*" (over time)
+             and duration is the number of ticks (0 when mode is None)
+    Raises: InvalidDataFormatError if any term does not match the grammar
+    """
+    if not isinstance(effect_str, str):
+        raise InvalidDataFormatError(f"EFFECT must be a string, got '{effect_str}'.")
+    
+    terms = []
+    for term in effect_str.split(","):
+        match = EFFECT_TERM_PATTERN.match(term.strip())
+        if match is None:
+            raise InvalidDataFormatError(
+                f"EFFECT format invalid. Expected 'stat:value[%][@ticks|*ticks]', got '{term.strip()}'."
+            )
+        stat, value, percent, mode, duration = match.groups()
+        duration = int(duration) if duration else 0
+        if mode is not None and duration < 1:
+            raise InvalidDataFormatError(f"EFFECT duration must be at least 1 tick: '{term.strip()}'.")
+        terms.append((stat, int(value), percent == "%", mode, duration))
+    return terms
+
 def parse_item_block(lines):
     """
     Parse a block of lines into an item dictionary
@@ -465,11 +915,15 @@ def parse_item_block(lines):
         "COST": int, 
         "DESCRIPTION": str
     }
+    # Keys an item block may leave out
+    OPTIONAL_KEYS = {
+        "STACK_SIZE": int # Max copies per inventory slot
+    }
     VALID_TYPES = {"weapon", "armor", "consumable"}
     
     item_data = {}
     
-    if len(lines) != len(REQUIRED_KEYS):
+    if not len(REQUIRED_KEYS) <= len(lines) <= len(REQUIRED_KEYS) + len(OPTIONAL_KEYS):
         raise InvalidDataFormatError(
             f"Item block expected {len(REQUIRED_KEYS)} lines, found {len(lines)}."
         )
@@ -481,14 +935,14 @@ def parse_item_block(lines):
         except ValueError:
             raise InvalidDataFormatError(f"Line must contain 'KEY: VALUE' structure: '{line}'")
 
-        if key not in REQUIRED_KEYS:
+        if key not in REQUIRED_KEYS and key not in OPTIONAL_KEYS:
             raise InvalidDataFormatError(f"Unexpected key found: '{key}'")
         
-        expected_type = REQUIRED_KEYS[key]
+        expected_type = REQUIRED_KEYS.get(key) or OPTIONAL_KEYS[key]
         
         try:
-            # Convert COST to integer
-            if key == "COST":
+            # Convert COST and STACK_SIZE to integer
+            if expected_type is int:
                 value = int(value_str)
             else:
                 value = value_str
@@ -496,6 +950,13 @@ def parse_item_block(lines):
             raise InvalidDataFormatError(f"Value for '{key}' must be an integer: '{value_str}'")
 
         item_data[key] = value
+
+    for key in REQUIRED_KEYS:
+        if key not in item_data:
+            raise InvalidDataFormatError(f"Item block is missing required field: '{key}'")
+
+    if item_data.get("STACK_SIZE", 1) < 1:
+        raise InvalidDataFormatError(f"STACK_SIZE must be at least 1: '{item_data['STACK_SIZE']}'")
         
     # Validation and Final Normalization
     
@@ -506,30 +967,29 @@ def parse_item_block(lines):
 
     # 2. Parse EFFECT (e.g., "strength:5" -> {'stat': 'strength', 'value': 5})
     effect_str = item_data.get("EFFECT", "")
-    effect_parts = [p.strip() for p in effect_str.split(':', 1)]
+    terms = parse_effect_terms(effect_str)
     
-    if len(effect_parts) != 2:
-        raise InvalidDataFormatError(f"EFFECT format invalid. Expected 'stat:value', got '{effect_str}'.")
-    
-    stat_name = effect_parts[0]
-    
-    try:
-        stat_value = int(effect_parts[1])
-    except ValueError:
-        raise InvalidDataFormatError(f"EFFECT value must be an integer: '{effect_parts[1]}'")
+    stat_name, stat_value, percent, mode, duration = terms[0]
+    if len(terms) == 1 and not percent and mode is None:
+        effect = {
+            "stat": stat_name,
+            "value": stat_value
+        }
+    else:
+        # Multi-stat, percentage and timed effects keep their string form
+        effect = effect_str.strip()
         
     # Final data structure
     final_data = {
         "item_id": item_data["ITEM_ID"],
         "name": item_data["NAME"],
         "type": item_data["TYPE"].lower(), 
-        "effect": {
-            "stat": stat_name,
-            "value": stat_value
-        },
+        "effect": effect,
         "cost": item_data["COST"],
         "description": item_data["DESCRIPTION"],
     }
+    if "STACK_SIZE" in item_data:
+        final_data["stack_size"] = item_data["STACK_SIZE"]
     
     return final_data
     
@@ -9,78 +9,331 @@ AI Usage: [Document any AI assistance used]
 This module handles inventory management, item usage, and equipment.
 """
 
+import bisect
+import heapq
+import itertools
+
+import character_manager
+import game_data
+import quest_handler
 from custom_exceptions import (
+    InvalidDataFormatError,
     InventoryFullError,
     ItemNotFoundError,
     InsufficientResourcesError,
     InvalidItemTypeError
 )
 
-# Maximum inventory size
+# Maximum inventory size (in slots; one slot holds one stack)
 MAX_INVENTORY_SIZE = 20
 
+# Default maximum stack size per item type. An item's own STACK_SIZE in
+# the item data overrides these.
+DEFAULT_STACK_SIZES = {
+    "consumable": 20,
+    "weapon": 1,
+    "armor": 1
+}
+
+def _check_quantity(item_id, quantity):
+    """
+    Make sure quantity is a usable item count
+
+    Raises: ValueError if quantity is not a positive integer
+    """
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+        raise ValueError(f"Quantity for '{item_id}' must be a positive integer, got {quantity}.")
+
+# ============================================================================
+# INVENTORY CONTAINER
+# ============================================================================
+
+class Inventory:
+    """
+    Multiset of item IDs backed by an item_id -> quantity map
+
+    Keeps a running total so adding, removing, counting and membership
+    checks are all O(1). Iterating gives item IDs the same way the old
+    list inventory did (one entry per copy), so `in`, len() and loops over
+    character['inventory'] keep working.
+
+    Copies of an item are grouped into stacks of up to that item's stack
+    size, and each stack takes one slot. Items with no known stack size
+    stack one per slot, like the old list inventory.
+    """
+
+    def __init__(self, items=None):
+        """
+        Create an inventory
+
+        Args:
+            items: Optional list of item IDs (e.g. a loaded save file list).
+                   Saved entries of the form "item_id*quantity" are
+                   expanded, and "item_id*quantity/stack_size" also sets
+                   the item's stack size.
+        """
+        self._counts = {}
+        self._stack_sizes = {}
+        self._total = 0
+        self._slots = 0
+        for entry in items or []:
+            entry, _, stack_size = entry.partition("/")
+            item_id, _, quantity = entry.partition("*")
+            self.add(item_id, int(quantity) if quantity else 1, int(stack_size) if stack_size else None)
+
+    def _slots_for(self, item_id, quantity):
+        """Slots needed to hold quantity copies of item_id"""
+        stack_size = self._stack_sizes.get(item_id, 1)
+        return -(-quantity // stack_size)
+
+    def set_stack_size(self, item_id, stack_size):
+        """Set the maximum stack size for item_id and recount its slots"""
+        owned = self._counts.get(item_id, 0)
+        before = self._slots_for(item_id, owned)
+        self._stack_sizes[item_id] = max(1, stack_size)
+        self._slots += self._slots_for(item_id, owned) - before
+
+    def slots_needed(self, item_id, quantity=1, stack_size=None):
+        """
+        Extra slots that adding quantity copies of item_id would use
+
+        Args:
+            stack_size: Stack size to use for item_id (defaults to the
+                        size already recorded for it, or 1)
+        """
+        owned = self._counts.get(item_id, 0)
+        current = self._slots_for(item_id, owned)
+        if stack_size is None:
+            stack_size = self._stack_sizes.get(item_id, 1)
+        return -(-(owned + quantity) // max(1, stack_size)) - current
+
+    def add(self, item_id, quantity=1, stack_size=None):
+        """
+        Add quantity copies of item_id, optionally setting its stack size
+
+        Raises: ValueError if quantity is not a positive integer
+        """
+        _check_quantity(item_id, quantity)
+        if stack_size is not None and stack_size != self._stack_sizes.get(item_id):
+            self.set_stack_size(item_id, stack_size)
+
+        owned = self._counts.get(item_id, 0)
+        self._slots += self._slots_for(item_id, owned + quantity) - self._slots_for(item_id, owned)
+        self._counts[item_id] = owned + quantity
+        self._total += quantity
+
+    def remove(self, item_id, quantity=1):
+        """
+        Remove quantity copies of item_id
+
+        Raises:
+            ItemNotFoundError if there are fewer than quantity copies
+            ValueError if quantity is not a positive integer
+        """
+        _check_quantity(item_id, quantity)
+        owned = self._counts.get(item_id, 0)
+        if owned < quantity:
+            raise ItemNotFoundError(item_id)
+
+        self._slots += self._slots_for(item_id, owned - quantity) - self._slots_for(item_id, owned)
+        if owned == quantity:
+            del self._counts[item_id]
+        else:
+            self._counts[item_id] = owned - quantity
+        self._total -= quantity
+
+    def count(self, item_id):
+        """Number of copies of item_id"""
+        return self._counts.get(item_id, 0)
+
+    def slots_used(self):
+        """Number of slots (stacks) currently in use"""
+        return self._slots
+
+    def items(self):
+        """(item_id, quantity) pairs in the order items were first added"""
+        return self._counts.items()
+
+    def stacks(self):
+        """
+        List of (item_id, quantity) stacks, one entry per slot used
+
+        Full stacks come first, followed by any partial stack.
+        """
+        stacks = []
+        for item_id, quantity in self._counts.items():
+            stack_size = self._stack_sizes.get(item_id, 1)
+            full_stacks, remainder = divmod(quantity, stack_size)
+            stacks.extend([(item_id, stack_size)] * full_stacks)
+            if remainder:
+                stacks.append((item_id, remainder))
+        return stacks
+
+    def copy(self):
+        """Independent copy of this inventory"""
+        duplicate = Inventory()
+        duplicate._counts = dict(self._counts)
+        duplicate._stack_sizes = dict(self._stack_sizes)
+        duplicate._total = self._total
+        duplicate._slots = self._slots
+        return duplicate
+
+    def to_list(self):
+        """Item IDs as a flat list, one entry per copy"""
+        return list(self)
+
+    def to_save_list(self):
+        """
+        Compact list form used by save_character
+
+        One entry per item ID: "item_id" for a single copy, otherwise
+        "item_id*quantity", followed by "/stack_size" if the item stacks,
+        so loading the save gives the same slots without item data.
+        """
+        entries = []
+        for item_id, quantity in self._counts.items():
+            entry = item_id if quantity == 1 else f"{item_id}*{quantity}"
+            stack_size = self._stack_sizes.get(item_id, 1)
+            if stack_size > 1:
+                entry = f"{entry}*1/{stack_size}" if quantity == 1 else f"{entry}/{stack_size}"
+            entries.append(entry)
+        return entries
+
+    def __contains__(self, item_id):
+        return item_id in self._counts
+
+    def __len__(self):
+        return self._total
+
+    def __iter__(self):
+        for item_id, quantity in self._counts.items():
+            for _ in range(quantity):
+                yield item_id
+
+    def __eq__(self, other):
+        if isinstance(other, list):
+            other = Inventory(other)
+        if not isinstance(other, Inventory):
+            return NotImplemented
+        return self._counts == other._counts
+
+    def __repr__(self):
+        return f"Inventory({self._counts})"
+
+def get_stack_size(item_data):
+    """
+    Get the maximum stack size for an item
+
+    Uses the item's own 'stack_size' if it has one, otherwise the default
+    for its type from DEFAULT_STACK_SIZES.
+
+    Returns: Integer stack size (1 if item_data is missing)
+    """
+    if not item_data:
+        return 1
+    return item_data.get('stack_size') or DEFAULT_STACK_SIZES.get(item_data.get('type'), 1)
+
+def apply_stack_sizes(character, item_data_dict):
+    """
+    Set stack sizes for every item in a character's inventory
+
+    Saves record the stack size of stacking items, so this is only
+    needed for older saves, or to pick up changed item data.
+    """
+    inventory = get_inventory(character)
+    for item_id, _ in list(inventory.items()):
+        if item_id in item_data_dict:
+            inventory.set_stack_size(item_id, get_stack_size(item_data_dict[item_id]))
+
+@character_manager.locks_character
+def get_inventory(character):
+    """
+    Get a character's inventory as an Inventory
+
+    A plain list (from create_character or load_character) is converted
+    the first time it is used and stored back on the character.
+
+    Returns: The character's Inventory
+    """
+    inventory = character.get('inventory')
+    if not isinstance(inventory, Inventory):
+        inventory = Inventory(inventory)
+        character['inventory'] = inventory
+    return inventory
+
 # ============================================================================
 # INVENTORY MANAGEMENT
 # ============================================================================
 
-def add_item_to_inventory(character, item_id):
+@character_manager.mutates_character
+def add_item_to_inventory(character, item_id, quantity=1, item_data=None, acquired=True):
     """
     Add an item to character's inventory
     
+    Every way of getting new items (loot, purchases) goes through here,
+    so this is where "item_acquired" quest events are sent from.
+    
     Args:
         character: Character dictionary
         item_id: Unique item identifier
+        quantity: Number of copies to add
+        item_data: Optional item information, used for the stack size
+        acquired: False for items that are only coming back (unequipped,
+                  or returned by an undone trade), which are not new
     
     Returns: True if added successfully
-    Raises: InventoryFullError if inventory is at max capacity
+    Raises:
+        InventoryFullError if the items need more slots than are free
+        ValueError if quantity is not a positive integer
     """
     # TODO: Implement adding items
     # Check if inventory is full (>= MAX_INVENTORY_SIZE)
     # Add item_id to character['inventory'] list
-    if 'inventory' not in character:
-        character['inventory'] = []
-
-    inventory = character['inventory']
+    _check_quantity(item_id, quantity)
+    inventory = get_inventory(character)
+    stack_size = get_stack_size(item_data) if item_data else None
     
-    # 1. Check if inventory is full
-    if len(inventory) >= MAX_INVENTORY_SIZE:
+    # 1. Check if the new copies fit in the free slots
+    if inventory.slots_needed(item_id, quantity, stack_size) > MAX_INVENTORY_SIZE - inventory.slots_used():
         # Raise InventoryFullError
         raise InventoryFullError() 
         
-    # 2. Add item_id to character['inventory'] list
-    inventory.append(item_id)
+    # 2. Add item_id to the inventory
+    inventory.add(item_id, quantity, stack_size)
+    character_manager.record_item_change(character, item_id, quantity, inventory.count(item_id))
+    if acquired:
+        quest_handler.dispatch_quest_event(character, f"item_acquired:{item_id}", quantity)
     
     return True
 
-def remove_item_from_inventory(character, item_id):
+@character_manager.mutates_character
+def remove_item_from_inventory(character, item_id, quantity=1):
     """
     Remove an item from character's inventory
     
     Args:
         character: Character dictionary
         item_id: Item to remove
+        quantity: Number of copies to remove
     
     Returns: True if removed successfully
-    Raises: ItemNotFoundError if item not in inventory
+    Raises:
+        ItemNotFoundError if fewer than quantity copies are in inventory
+        ValueError if quantity is not a positive integer
     """
     # TODO: Implement item removal
     # Check if item exists in inventory
     # Remove item from list
+    _check_quantity(item_id, quantity)
     if 'inventory' not in character:
         # If the list doesn't exist, the item certainly isn't there
         raise ItemNotFoundError(item_id)
 
-    inventory = character['inventory']
-    
-    # 1. Check if item exists and remove it
-    try:
-        # The list.remove() method removes the first occurrence of the value
-        inventory.remove(item_id)
-        return True
-    except ValueError:
-        # list.remove() raises a ValueError if the item is not found
-        # Raise ItemNotFoundError
-        raise ItemNotFoundError(item_id)
+    # Inventory.remove() raises ItemNotFoundError if the item is not found
+    inventory = get_inventory(character)
+    inventory.remove(item_id, quantity)
+    character_manager.record_item_change(character, item_id, -quantity, inventory.count(item_id))
+    return True
 
 def has_item(character, item_id):
     """
@@ -93,7 +346,7 @@ def has_item(character, item_id):
         return False
         
     # Use the 'in' operator to quickly check for presence
-    return item_id in character['inventory']
+    return item_id in get_inventory(character)
 
 def count_item(character, item_id):
     """
@@ -102,16 +355,14 @@ def count_item(character, item_id):
     Returns: Integer count of item
     """
     # TODO: Implement item counting
-    # Use list.count() method
     if 'inventory' not in character:
         return 0
         
-    # Use list.count() method
-    return character['inventory'].count(item_id)
+    return get_inventory(character).count(item_id)
 
 def get_inventory_space_remaining(character):
     """
-    Calculate how many more items can fit in inventory
+    Calculate how many more stacks can fit in inventory
     
     Returns: Integer representing available slots
     """
@@ -119,13 +370,14 @@ def get_inventory_space_remaining(character):
     if 'inventory' not in character:
         current_size = 0
     else:
-        current_size = len(character['inventory'])
+        current_size = get_inventory(character).slots_used()
         
     # Calculate remaining space, ensuring the result is not negative
     remaining_space = MAX_INVENTORY_SIZE - current_size
     
     return max(0, remaining_space)
 
+@character_manager.mutates_character
 def clear_inventory(character):
     """
     Remove all items from inventory
@@ -140,10 +392,13 @@ def clear_inventory(character):
         return []
         
     # Save a copy of the current inventory before clearing
-    removed_items = character['inventory'].copy()
+    inventory = get_inventory(character)
+    removed_items = inventory.to_list()
     
-    # Clear character's inventory list (easiest way is usually slice assignment)
-    character['inventory'] = []
+    # Replace the character's inventory with an empty one
+    character['inventory'] = Inventory()
+    for item_id, quantity in inventory.items():
+        character_manager.record_item_change(character, item_id, -quantity, 0)
     
     return removed_items
 
@@ -151,6 +406,7 @@ def clear_inventory(character):
 # ITEM USAGE
 # ============================================================================
 
+@character_manager.mutates_character
 def use_item(character, item_id, item_data):
     """
     Use a consumable item from inventory
@@ -183,12 +439,12 @@ def use_item(character, item_id, item_data):
     if item_data["type"] != "consumable":
         raise InvalidItemTypeError("Only consumable items can be used.")
     
-    stat, value = parse_item_effect(item_data["effect"])
-    apply_stat_effect(character, stat, value)
+    # Effects are compiled once per item effect and applied by kind
+    results = apply_effects(character, compile_effects(item_data["effect"]))
 
     remove_item_from_inventory(character, item_id)
 
-    return f"{character['name']} used {item_id} and gained {stat} +{value}."
+    return f"{character['name']} used {item_id} and gained {', '.join(results)}."
 
 
 def equip_weapon(character, item_id, item_data):
@@ -217,46 +473,8 @@ def equip_weapon(character, item_id, item_data):
     # Parse effect and apply to character stats
     # Store equipped_weapon in character dictionary
     # Remove item from inventory
-    # Validation checks
-    if not has_item(character, item_id):
-        raise ItemNotFoundError(item_id)
-        
-    item_name = item_data.get('name', item_id)
-    item_type = item_data.get('type')
-    
-    if item_type != 'weapon':
-        raise InvalidItemTypeError(f"Item '{item_name}' is a '{item_type}'. Only 'weapon' can be equipped here.")
-
-    try:
-        new_stat, new_value = parse_item_effect(item_data.get('effect'))
-    except InvalidItemTypeError as e:
-        # Re-raise with a more specific error message if parsing fails
-        raise InvalidItemTypeError(f"Weapon '{item_name}' effect parsing error: {e}")
-    
+    return "⚔️ " + _equip_item(character, 'weapon', item_id, item_data)
 
-
-    unequip_message = ""
-    
-
-    # Apply New Weapon Effect (INLINED LOGIC)
-    applied_new_bonus = False
-    if new_stat in character and isinstance(character[new_stat], (int, float)):
-        character[new_stat] += new_value
-        applied_new_bonus = True
-    
-    if not applied_new_bonus:
-        raise InvalidItemTypeError(f"Weapon '{item_name}' has an effect on an unsupported stat: {new_stat}.")
-
-    # Finalize
-    character['equipped_weapon'] = item_id
-    remove_item_from_inventory(character, item_id)
-    
-    #  Final message assembly
-    return (
-        f"⚔️ {unequip_message}Equipped {item_name}! "
-        f"({new_stat.capitalize()}: +{new_value}). "
-        f"Current {new_stat.capitalize()}: {character.get(new_stat, 'N/A')}"
-    )
 def equip_armor(character, item_id, item_data):
     """
     Equip armor
@@ -279,6 +497,61 @@ def equip_armor(character, item_id, item_data):
     """
     # TODO: Implement armor equipping
     # Similar to equip_weapon but for armor
+    return "🛡️ " + _equip_item(character, 'armor', item_id, item_data)
+
+def unequip_weapon(character, item_data_dict):
+    """
+    Remove equipped weapon and return it to inventory
+    
+    Returns: Item ID that was unequipped, or None if no weapon equipped
+    Raises: InventoryFullError if inventory is full
+    """
+    # TODO: Implement weapon unequipping
+    # Check if weapon is equipped
+    # Remove stat bonuses
+    # Add weapon back to inventory
+    # Clear equipped_weapon from character
+    return _unequip_item(character, 'weapon', item_data_dict)
+
+def unequip_armor(character, GAME_ITEM_DATA):
+    """
+    Remove equipped armor and return it to inventory
+    
+    Returns: Item ID that was unequipped, or None if no armor equipped
+    Raises: InventoryFullError if inventory is full
+    """
+    # TODO: Implement armor unequipping
+    return _unequip_item(character, 'armor', GAME_ITEM_DATA)
+
+# ============================================================================
+# EQUIPMENT BONUSES
+# ============================================================================
+
+def _effect_pair(effect):
+    """
+    Get (stat_name, value) from an item effect
+
+    Accepts both the "stat:value" string form and the
+    {'stat': ..., 'value': ...} form produced by game_data.load_items.
+    """
+    if isinstance(effect, dict):
+        return effect.get('stat'), effect.get('value', 0)
+    return parse_item_effect(effect)
+
+@character_manager.mutates_character
+def _equip_item(character, slot, item_id, item_data):
+    """
+    Equip an item into a slot ('weapon' or 'armor')
+
+    The item's bonus is recorded in character['equipment'][slot] so it can
+    be removed exactly when the item is unequipped or replaced.
+
+    Returns: String describing equipment change (without the slot icon)
+    Raises:
+        ItemNotFoundError if item not in inventory
+        InvalidItemTypeError if item type does not match the slot
+        InventoryFullError if the replaced item does not fit in inventory
+    """
     # Validation checks
     if not has_item(character, item_id):
         raise ItemNotFoundError(item_id)
@@ -286,138 +559,359 @@ def equip_armor(character, item_id, item_data):
     item_name = item_data.get('name', item_id)
     item_type = item_data.get('type')
     
-    if item_type != 'armor':
-        raise InvalidItemTypeError(f"Item '{item_name}' is a '{item_type}'. Only 'armor' can be equipped here.")
+    if item_type != slot:
+        raise InvalidItemTypeError(f"Item '{item_name}' is a '{item_type}'. Only '{slot}' can be equipped here.")
 
     try:
-        new_stat, new_value = parse_item_effect(item_data.get('effect'))
+        new_stat, new_value = _effect_pair(item_data.get('effect'))
     except InvalidItemTypeError as e:
         # Re-raise with a more specific error message if parsing fails
-        raise InvalidItemTypeError(f"Armor '{item_name}' effect parsing error: {e}")
+        raise InvalidItemTypeError(f"{slot.capitalize()} '{item_name}' effect parsing error: {e}")
+
+    if not isinstance(character.get(new_stat), (int, float)):
+        raise InvalidItemTypeError(f"{slot.capitalize()} '{item_name}' has an effect on an unsupported stat: {new_stat}.")
 
+    # 1. Take the new item out of inventory first, freeing its slot
+    remove_item_from_inventory(character, item_id)
+
+    # 2. Handle unequipping the current item (if any)
     unequip_message = ""
-    
-    #  Handle Unequipping Current Armor (if any)
-   
+    try:
+        old_item_id = _unequip_item(character, slot, {})
+    except InventoryFullError:
+        add_item_to_inventory(character, item_id, 1, item_data, acquired=False)
+        raise
+    if old_item_id is not None:
+        unequip_message = f"Unequipped {old_item_id}. "
 
-    #  Apply New Armor Effect (Inline Logic)
-    applied_new_bonus = False
-    if new_stat in character and isinstance(character[new_stat], (int, float)):
-        apply_stat_effect(character, new_stat, new_value)
-        applied_new_bonus = True
-        
-        
-    if not applied_new_bonus:
-        # If the stat is unknown or not numeric, raise an error
-        raise InvalidItemTypeError(f"Armor '{item_name}' has an effect on an unsupported stat: {new_stat}.")
+    # 3. Apply the new bonus and remember it
+    character[new_stat] += new_value
+    character[f'equipped_{slot}'] = item_id
+    character.setdefault('equipment', {})[slot] = {
+        'item_id': item_id,
+        'stat': new_stat,
+        'value': new_value
+    }
+    character_manager.get_runtime_state(character).pop('equipment_bonuses', None)
 
-    #  Finalize
-    character['equipped_armor'] = item_id
-    remove_item_from_inventory(character, item_id)
-    
-    #  Final message assembly
-    current_stat_value = character.get(new_stat, 'N/A')
-    
     return (
-        f"🛡️ {unequip_message}Equipped {item_name}! "
+        f"{unequip_message}Equipped {item_name}! "
         f"({new_stat.capitalize()}: +{new_value}). "
-        f"Current {new_stat.capitalize()}: {current_stat_value}"
+        f"Current {new_stat.capitalize()}: {character[new_stat]}"
     )
-def unequip_weapon(character, item_data_dict):
+
+@character_manager.mutates_character
+def _unequip_item(character, slot, item_data_dict):
     """
-    Remove equipped weapon and return it to inventory
-    
-    Returns: Item ID that was unequipped, or None if no weapon equipped
+    Unequip the item in a slot ('weapon' or 'armor') and remove its bonus
+
+    Uses the bonus recorded when the item was equipped. For characters
+    equipped before bonuses were recorded (e.g. loaded from a save file),
+    the bonus is looked up in item_data_dict instead.
+
+    Returns: Item ID that was unequipped, or None if the slot is empty
     Raises: InventoryFullError if inventory is full
     """
-    # TODO: Implement weapon unequipping
-    # Check if weapon is equipped
-    # Remove stat bonuses
-    # Add weapon back to inventory
-    # Clear equipped_weapon from character
-    old_weapon_id = character.pop('equipped_weapon', None)
-    
-    if old_weapon_id is None:
-        return None # Nothing to unequip
-        
-    # 2. Look up the old weapon's effect data
-    if old_weapon_id in item_data_dict:
-        old_item_data = item_data_dict[old_weapon_id]
-        old_effect = old_item_data.get('effect', {})
-        old_stat = old_effect.get('stat', 'strength') # Default to common weapon stat
-        old_value = old_effect.get('value', 0)
-        
-        # 3. Add weapon back to inventory (MUST happen before removing stats, 
-        # as this can raise InventoryFullError)
-        try:
-            add_item_to_inventory(character, old_weapon_id)
-        except InventoryFullError:
-            # If inventory is full, return the weapon ID to the character object
-            # and re-raise the error.
-            character['equipped_weapon'] = old_weapon_id 
-            raise InventoryFullError(f"Cannot unequip {old_weapon_id}: Inventory is full.")
+    old_item_id = character.get(f'equipped_{slot}')
+    if old_item_id is None:
+        return None
 
-        # 4. Remove stat bonuses (Inline Logic)
-        if old_stat in character and isinstance(character[old_stat], (int, float)):
-            character[old_stat] -= old_value
-            
-        return old_weapon_id
+    modifier = character.get('equipment', {}).get(slot)
+    if modifier is None and old_item_id in item_data_dict:
+        old_stat, old_value = _effect_pair(item_data_dict[old_item_id].get('effect'))
+        modifier = {'item_id': old_item_id, 'stat': old_stat, 'value': old_value}
 
-def unequip_armor(character, GAME_ITEM_DATA):
+    # 1. Add the item back to inventory (can raise InventoryFullError,
+    # so it happens before anything else changes)
+    add_item_to_inventory(character, old_item_id, 1, item_data_dict.get(old_item_id), acquired=False)
+
+    # 2. Remove the stat bonus
+    if modifier is not None and isinstance(character.get(modifier['stat']), (int, float)):
+        character[modifier['stat']] -= modifier['value']
+
+        # Health cannot exceed a reduced maximum
+        if modifier['stat'] == 'max_health' and character.get('health', 0) > character['max_health']:
+            character['health'] = character['max_health']
+
+    # 3. Clear the slot
+    del character[f'equipped_{slot}']
+    character.get('equipment', {}).pop(slot, None)
+    character_manager.get_runtime_state(character).pop('equipment_bonuses', None)
+
+    return old_item_id
+
+def get_equipment_bonuses(character):
     """
-    Remove equipped armor and return it to inventory
-    
-    Returns: Item ID that was unequipped, or None if no armor equipped
-    Raises: InventoryFullError if inventory is full
+    Get the total stat bonus from everything the character has equipped
+
+    The totals are cached in the character's runtime state (see
+    character_manager.get_runtime_state) and only recomputed after an
+    equip or unequip.
+
+    Returns: Dictionary of {stat_name: total_bonus}
     """
-    # TODO: Implement armor unequipping
-    old_armor_id = character.pop('equipped_armor', None)
-    
-    if old_armor_id is None:
-        return None # Nothing to unequip
-        
-    # 2. Look up the old armor's effect data using the GLOBAL constant
-    if old_armor_id in GAME_ITEM_DATA:
-        old_item_data = GAME_ITEM_DATA[old_armor_id]
-        old_effect = old_item_data.get('effect', {})
-        old_stat = old_effect.get('stat', 'max_health') # Default to common armor stat
-        old_value = old_effect.get('value', 0)
-        
-        # 3. Add armor back to inventory (Must happen before removing stats, 
-        # as this can raise InventoryFullError)
+    state = character_manager.get_runtime_state(character)
+    bonuses = state.get('equipment_bonuses')
+    if bonuses is None:
+        bonuses = {}
+        for modifier in character.get('equipment', {}).values():
+            bonuses[modifier['stat']] = bonuses.get(modifier['stat'], 0) + modifier['value']
+        state['equipment_bonuses'] = bonuses
+    return bonuses
+
+def get_base_stat(character, stat_name):
+    """
+    Get a stat without equipment bonuses
+
+    character[stat_name] always holds the effective value (base plus
+    bonuses), which is what combat reads.
+
+    Returns: Base value of the stat
+    """
+    return character[stat_name] - get_equipment_bonuses(character).get(stat_name, 0)
+
+def get_base_stats(character):
+    """
+    Get strength, magic and max_health without equipment bonuses
+
+    Returns: Dictionary of {stat_name: base_value}
+    """
+    return {stat: get_base_stat(character, stat) for stat in ('strength', 'magic', 'max_health')}
+
+# ============================================================================
+# EFFECT ENGINE
+# ============================================================================
+
+# A compiled effect is a tuple (kind, stat, value, percent, duration):
+#   kind:     "instant", "buff" (undone after duration ticks) or
+#             "over_time" (value applied every tick for duration ticks)
+#   percent:  value is a percentage of the stat's base value, without
+#             equipment bonuses (see _effect_amount and PERCENT_BASES)
+EFFECT_KINDS_BY_MODE = {None: "instant", "@": "buff", "*": "over_time"}
+
+# Stat a percentage effect is taken from as it stands, instead of the
+# stat's own base value (a health percentage is of max health)
+PERCENT_BASES = {"health": "max_health"}
+
+# Compiled effects, keyed by effect string (or (stat, value) for dict effects)
+_compiled_effects = {}
+
+def compile_effects(effect):
+    """
+    Compile an item effect into a tuple of effects
+
+    Accepts the "stat:value" string form (including the comma-separated,
+    percentage and timed forms described in game_data.parse_effect_terms)
+    and the {'stat': ..., 'value': ...} form produced by game_data.load_items.
+    Each distinct effect is compiled once.
+
+    Returns: Tuple of (kind, stat, value, percent, duration) tuples
+    Raises: InvalidItemTypeError if the effect cannot be parsed
+    """
+    key = (effect.get('stat'), effect.get('value', 0)) if isinstance(effect, dict) else effect
+    compiled = _compiled_effects.get(key)
+    if compiled is not None:
+        return compiled
+
+    if isinstance(effect, dict):
+        compiled = (("instant", effect.get('stat'), effect.get('value', 0), False, 0),)
+    else:
         try:
-            # Assuming add_item_to_inventory is accessible
-            add_item_to_inventory(character, old_armor_id)
-        except InventoryFullError:
-            # If inventory is full, return the armor ID to the character object
-            # and re-raise the error.
-            character['equipped_armor'] = old_armor_id 
-            raise InventoryFullError(f"Cannot unequip {old_armor_id}: Inventory is full.")
-
-        # 4. Remove stat bonuses (Inline Logic)
-        if old_stat in character and isinstance(character[old_stat], (int, float)):
-            # Remove the bonus
-            character[old_stat] -= old_value
-            
-            # Special Case: If max_health was reduced, check and clamp current health.
-            if old_stat == 'max_health':
-                current_health = character.get('health', 0)
-                new_max_health = character[old_stat]
-                
-                # Health cannot exceed the new maximum
-                if current_health > new_max_health:
-                    character['health'] = new_max_health
-            
-        return old_armor_id
-    
-    # Case where the ID was equipped but the data is missing
-    return None
+            terms = game_data.parse_effect_terms(effect)
+        except InvalidDataFormatError as e:
+            raise InvalidItemTypeError(str(e))
+        compiled = tuple(
+            (EFFECT_KINDS_BY_MODE[mode], stat, value, percent, duration)
+            for stat, value, percent, mode, duration in terms
+        )
+
+    _compiled_effects[key] = compiled
+    return compiled
+
+def _effect_amount(character, stat_name, value, percent):
+    """
+    Absolute amount of an effect
+
+    Percentages are of the stat's base value (see get_base_stat), so
+    equipment bonuses do not inflate them, or of the stat PERCENT_BASES
+    names for it.
+    """
+    if not percent:
+        return value
+    if stat_name in PERCENT_BASES:
+        base = character.get(PERCENT_BASES[stat_name], 0)
+    elif isinstance(character.get(stat_name), (int, float)):
+        base = get_base_stat(character, stat_name)
+    else:
+        base = 0
+    return base * value // 100
+
+def _change_stat(character, stat_name, value):
+    """Add value to a numeric stat (creating it if missing); returns the change made"""
+    current = character.get(stat_name, 0)
+    if not isinstance(current, (int, float)):
+        print(f"Warning: Stat '{stat_name}' is not numeric and was not modified.")
+        return 0
+    character[stat_name] = current + value
+    return value
+
+def _change_health(character, stat_name, value):
+    """Change health, kept between 0 and max_health; returns the change made"""
+    current_hp = character.get('health', 0)
+    max_hp = character.get('max_health', current_hp) # If max_health isn't set, use current HP as max
+    character['health'] = max(0, min(current_hp + value, max_hp))
+    return character['health'] - current_hp
+
+def _change_max_health(character, stat_name, value):
+    """Change max_health, lowering health if it is now above the maximum"""
+    _change_stat(character, 'max_health', value)
+    if character.get('health', 0) > character['max_health']:
+        character['health'] = character['max_health']
+    return value
+
+# Stat-specific appliers; any other stat uses _change_stat
+STAT_APPLIERS = {
+    "health": _change_health,
+    "max_health": _change_max_health
+}
+
+def _apply_to_stat(character, stat_name, value):
+    """Apply a change through the stat's applier; returns the change made"""
+    return STAT_APPLIERS.get(stat_name, _change_stat)(character, stat_name, value)
+
+def _timed_effects(character):
+    """
+    The character's timed-effect state, created on first use
+
+    Kept in the character's runtime state (see
+    character_manager.get_runtime_state) as 'timed_effects' (the heap),
+    'effect_clock' (ticks so far) and 'temporary_stats' (stat -> change
+    active buffs have made, which save_character leaves out).
+
+    Returns: The runtime state dictionary holding them
+    """
+    state = character_manager.get_runtime_state(character)
+    if 'timed_effects' not in state:
+        state['timed_effects'] = []
+        state['effect_clock'] = 0
+        state['temporary_stats'] = {}
+    return state
+
+def _change_temporary_stat(state, stat, change):
+    """Record (or undo) a buff's change to a stat"""
+    total = state['temporary_stats'].get(stat, 0) + change
+    if total:
+        state['temporary_stats'][stat] = total
+    else:
+        state['temporary_stats'].pop(stat, None)
+
+def _apply_instant(character, effect):
+    kind, stat, value, percent, duration = effect
+    change = _apply_to_stat(character, stat, _effect_amount(character, stat, value, percent))
+    return f"{stat} {change:+d}"
+
+def _apply_buff(character, effect):
+    kind, stat, value, percent, duration = effect
+    change = _apply_to_stat(character, stat, _effect_amount(character, stat, value, percent))
+
+    # The change actually made is undone when the buff expires
+    state = _timed_effects(character)
+    expires = state['effect_clock'] + duration
+    heapq.heappush(state['timed_effects'], (expires, next(_effect_sequence), effect, change))
+    _change_temporary_stat(state, stat, change)
+    return f"{stat} {change:+d} for {duration} turns"
+
+def _apply_over_time(character, effect):
+    kind, stat, value, percent, duration = effect
+    state = _timed_effects(character)
+    heapq.heappush(state['timed_effects'], (state['effect_clock'] + 1, next(_effect_sequence), effect, duration))
+    amount = f"{value:+d}%" if percent else f"{value:+d}"
+    return f"{stat} {amount} per turn for {duration} turns"
+
+# How each kind of effect is applied
+EFFECT_APPLIERS = {
+    "instant": _apply_instant,
+    "buff": _apply_buff,
+    "over_time": _apply_over_time
+}
+
+# Tie-breaker so heap entries due on the same tick never compare effects
+_effect_sequence = itertools.count()
+
+@character_manager.mutates_character
+def apply_effects(character, effects):
+    """
+    Apply compiled effects to a character
+
+    Args:
+        character: Character dictionary
+        effects: Tuple from compile_effects
+
+    Returns: List of descriptions of what each effect did
+    """
+    return [EFFECT_APPLIERS[effect[0]](character, effect) for effect in effects]
+
+@character_manager.mutates_character
+def tick_effects(character, ticks=1):
+    """
+    Advance a character's timed effects
+
+    Timed effects are kept in a heap ordered by the tick they are next
+    due, so each tick only touches the effects that are due, at
+    O(log n) each. combat_system ticks the player once per battle turn.
+
+    Args:
+        character: Character dictionary
+        ticks: Number of ticks (turns) to advance
+
+    Returns: Number of timed effects that finished
+    """
+    state = _timed_effects(character)
+    heap = state['timed_effects']
+    clock = state['effect_clock'] + ticks
+    finished = 0
+
+    while heap and heap[0][0] <= clock:
+        due, sequence, effect, remaining = heapq.heappop(heap)
+        kind, stat, value, percent, duration = effect
+
+        if kind == "buff":
+            # remaining holds the change to undo
+            _apply_to_stat(character, stat, -remaining)
+            _change_temporary_stat(state, stat, -remaining)
+            finished += 1
+            continue
+
+        _apply_to_stat(character, stat, _effect_amount(character, stat, value, percent))
+        if remaining > 1:
+            heapq.heappush(heap, (due + 1, sequence, effect, remaining - 1))
+        else:
+            finished += 1
+
+    state['effect_clock'] = clock
+    return finished
+
+def get_timed_effects(character):
+    """
+    List a character's active timed effects
+
+    Returns: List of (stat, kind, ticks_left) tuples, soonest first
+    """
+    state = _timed_effects(character)
+    clock = state['effect_clock']
+    active = []
+    for due, sequence, effect, remaining in sorted(state['timed_effects']):
+        kind, stat = effect[0], effect[1]
+        ticks_left = due - clock if kind == "buff" else due - clock + remaining - 1
+        active.append((stat, kind, ticks_left))
+    return active
 
 # ============================================================================
 # SHOP SYSTEM
 # ============================================================================
 
-def purchase_item(character, item_id, item_data):
+@character_manager.mutates_character
+def purchase_item(character, item_id, item_data, quantity=1):
     """
     Purchase an item from a shop
     
@@ -425,42 +919,48 @@ def purchase_item(character, item_id, item_data):
         character: Character dictionary
         item_id: Item to purchase
         item_data: Item information with 'cost' field
+        quantity: Number of copies to buy in one purchase
     
     Returns: True if purchased successfully
     Raises:
         InsufficientResourcesError if not enough gold
         InventoryFullError if inventory is full
+        ValueError if quantity is not a positive integer
     """
     # TODO: Implement purchasing
     # Check if character has enough gold
     # Check if inventory has space
     # Subtract gold from character
     # Add item to inventory
-    item_cost = item_data.get('cost', 0)
+    _check_quantity(item_id, quantity)
+    item_cost = item_data.get('cost', 0) * quantity
     current_gold = character.get('gold', 0)
     
     # 1. Check if character has enough gold
     if current_gold < item_cost:
         raise InsufficientResourcesError("Gold", item_cost, current_gold)
     
-    # 2. Check if inventory has space
-    if get_inventory_space_remaining(character) <= 0:
-        raise InventoryFullError("Cannot purchase item: Inventory is full.")
+    # 2. Check if inventory has space for the new stacks
+    inventory = get_inventory(character)
+    if inventory.slots_needed(item_id, quantity, get_stack_size(item_data)) > get_inventory_space_remaining(character):
+        raise InventoryFullError()
         
     # 3. Subtract gold from character
     character['gold'] = current_gold - item_cost
+    character_manager.record_gold_change(character, -item_cost)
     
     # 4. Add item to inventory
     # This call includes a final check for space and handles the addition
-    add_item_to_inventory(character, item_id)
+    add_item_to_inventory(character, item_id, quantity, item_data)
     
     item_name = item_data.get('name', item_id)
     
     # Optional: Return a descriptive message
-    print(f"💰 Purchased {item_name} for {item_cost} gold. Remaining gold: {character['gold']}")
+    print(f"💰 Purchased {quantity}x {item_name} for {item_cost} gold. Remaining gold: {character['gold']}")
     return True
 
-def sell_item(character, item_id, item_data):
+@character_manager.mutates_character
+def sell_item(character, item_id, item_data, quantity=1):
     """
     Sell an item for half its purchase cost
     
@@ -468,9 +968,12 @@ def sell_item(character, item_id, item_data):
         character: Character dictionary
         item_id: Item to sell
         item_data: Item information with 'cost' field
+        quantity: Number of copies to sell in one sale
     
     Returns: Amount of gold received
-    Raises: ItemNotFoundError if item not in inventory
+    Raises:
+        ItemNotFoundError if fewer than quantity copies are in inventory
+        ValueError if quantity is not a positive integer
     """
     # TODO: Implement selling
     # Check if character has item
@@ -479,25 +982,410 @@ def sell_item(character, item_id, item_data):
     # Add gold to character
     # 1. Check if character has the item and remove it from inventory
     # remove_item_from_inventory handles the ItemNotFoundError if the item isn't present.
-    remove_item_from_inventory(character, item_id)
+    remove_item_from_inventory(character, item_id, quantity)
     
     item_cost = item_data.get('cost', 0)
     
     # 2. Calculate sell price (cost // 2 for integer division)
     # The cost is typically the purchase price; selling is half that.
-    sell_price = item_cost // 2
+    sell_price = (item_cost // 2) * quantity
     
     # 3. Add gold to character
     current_gold = character.get('gold', 0)
     character['gold'] = current_gold + sell_price
+    character_manager.record_gold_change(character, sell_price)
     
     item_name = item_data.get('name', item_id)
     
     # Optional: Print a descriptive message
-    print(f"💰 Sold {item_name} for {sell_price} gold. Character now has {character['gold']} gold.")
+    print(f"💰 Sold {quantity}x {item_name} for {sell_price} gold. Character now has {character['gold']} gold.")
     
     return sell_price
 
+def _merge_basket(basket):
+    """
+    Combine a basket of (item_id, quantity) pairs into {item_id: quantity}
+
+    Raises: ValueError if any quantity is not a positive integer
+    """
+    merged = {}
+    for item_id, quantity in basket:
+        _check_quantity(item_id, quantity)
+        merged[item_id] = merged.get(item_id, 0) + quantity
+    return merged
+
+def _make_receipt(kind, lines, gold_before, gold_after):
+    """Build the receipt returned by purchase_items and sell_items"""
+    return {
+        'type': kind,
+        'items': lines,
+        'total_gold': abs(gold_after - gold_before),
+        'gold_before': gold_before,
+        'gold_after': gold_after
+    }
+
+@character_manager.mutates_character
+def purchase_items(character, basket, item_data_dict):
+    """
+    Purchase a whole basket of items in one transaction
+
+    The basket is checked up front (known items, total cost, inventory
+    space). If any check fails nothing changes; otherwise all items are
+    added and gold is updated once.
+
+    Args:
+        character: Character dictionary
+        basket: List of (item_id, quantity) pairs
+        item_data_dict: Dictionary of all item data
+
+    Returns: Receipt dictionary with 'type', 'items' (one line per item
+             with item_id, name, quantity, unit_price, total),
+             'total_gold', 'gold_before' and 'gold_after'
+    Raises:
+        ValueError if a quantity is not a positive integer
+        ItemNotFoundError if an item is not in item_data_dict
+        InsufficientResourcesError if the basket costs more than the gold owned
+        InventoryFullError if the basket does not fit in the inventory
+    """
+    merged = _merge_basket(basket)
+    inventory = get_inventory(character)
+    gold_before = character.get('gold', 0)
+
+    # 1. Check every item and add up the cost and slots needed
+    lines = []
+    total_cost = 0
+    slots_needed = 0
+    for item_id, quantity in merged.items():
+        if item_id not in item_data_dict:
+            raise ItemNotFoundError(item_id)
+        item_data = item_data_dict[item_id]
+        unit_price = item_data.get('cost', 0)
+
+        total_cost += unit_price * quantity
+        slots_needed += inventory.slots_needed(item_id, quantity, get_stack_size(item_data))
+        lines.append({
+            'item_id': item_id,
+            'name': item_data.get('name', item_id),
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'total': unit_price * quantity
+        })
+
+    if total_cost > gold_before:
+        raise InsufficientResourcesError("Gold", total_cost, gold_before)
+    if slots_needed > get_inventory_space_remaining(character):
+        raise InventoryFullError()
+
+    # 2. Apply the whole basket
+    for item_id, quantity in merged.items():
+        add_item_to_inventory(character, item_id, quantity, item_data_dict[item_id])
+    character['gold'] = gold_before - total_cost
+    character_manager.record_gold_change(character, -total_cost)
+
+    return _make_receipt('purchase', lines, gold_before, character['gold'])
+
+@character_manager.mutates_character
+def sell_items(character, basket, item_data_dict):
+    """
+    Sell a whole basket of items in one transaction
+
+    Each item sells for half its cost, like sell_item. The basket is checked
+    up front; if any item is missing nothing changes, otherwise all items
+    are removed and gold is updated once.
+
+    Args:
+        character: Character dictionary
+        basket: List of (item_id, quantity) pairs
+        item_data_dict: Dictionary of all item data
+
+    Returns: Receipt dictionary (same format as purchase_items)
+    Raises:
+        ValueError if a quantity is not a positive integer
+        ItemNotFoundError if fewer than the requested copies are owned
+    """
+    merged = _merge_basket(basket)
+    inventory = get_inventory(character)
+    gold_before = character.get('gold', 0)
+
+    # 1. Check every item is owned in the requested quantity
+    lines = []
+    total_price = 0
+    for item_id, quantity in merged.items():
+        if inventory.count(item_id) < quantity:
+            raise ItemNotFoundError(item_id)
+        item_data = item_data_dict.get(item_id, {})
+        unit_price = item_data.get('cost', 0) // 2
+
+        total_price += unit_price * quantity
+        lines.append({
+            'item_id': item_id,
+            'name': item_data.get('name', item_id),
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'total': unit_price * quantity
+        })
+
+    # 2. Apply the whole basket
+    for item_id, quantity in merged.items():
+        inventory.remove(item_id, quantity)
+        character_manager.record_item_change(character, item_id, -quantity, inventory.count(item_id))
+    character['gold'] = gold_before + total_price
+    character_manager.record_gold_change(character, total_price)
+
+    return _make_receipt('sale', lines, gold_before, character['gold'])
+
+# ============================================================================
+# TRADING
+# ============================================================================
+
+def _offer_parts(offer):
+    """
+    Split a trade offer {'items': [(item_id, quantity), ...], 'gold': n}
+    into ({item_id: quantity}, gold)
+
+    Raises: ValueError if a quantity or the gold amount is invalid
+    """
+    offer = offer or {}
+    items = _merge_basket(offer.get('items', []))
+    gold = offer.get('gold', 0)
+    if not isinstance(gold, int) or gold < 0:
+        raise ValueError(f"Offered gold must be a non-negative integer, got {gold}.")
+    return items, gold
+
+def execute_trade(first, second, first_offer, second_offer, item_data_dict=None):
+    """
+    Exchange items and gold between two characters in one transaction
+
+    Both characters are locked (in a fixed order, so opposite trades
+    cannot deadlock) for the whole exchange. Items move through
+    remove_item_from_inventory/add_item_to_inventory; if the receiver runs
+    out of space every move made so far is undone and nothing changes.
+
+    Args:
+        first: Character dictionary
+        second: Character dictionary
+        first_offer: What first gives, {'items': [(item_id, quantity), ...], 'gold': n}
+        second_offer: What second gives, in the same format
+        item_data_dict: Optional item data, used for received items' stack sizes
+
+    Returns: Receipt dictionary with 'first', 'second' (names) and
+             'first_gave', 'second_gave' ({'items': {item_id: quantity}, 'gold': n})
+    Raises:
+        ValueError if the offers are invalid or a character trades with itself
+        ItemNotFoundError if a side does not own the items it offers
+        InsufficientResourcesError if a side does not have the gold it offers
+        InventoryFullError if a side has no room for what it receives
+    """
+    if first is second:
+        raise ValueError("A character cannot trade with itself.")
+    item_data_dict = item_data_dict or {}
+    first_items, first_gold = _offer_parts(first_offer)
+    second_items, second_gold = _offer_parts(second_offer)
+    sides = ((first, second, first_items, first_gold), (second, first, second_items, second_gold))
+
+    with character_manager.lock_characters((first, second)):
+        # 1. Check both sides own what they offer
+        for giver, receiver, items, gold in sides:
+            inventory = get_inventory(giver)
+            for item_id, quantity in items.items():
+                if inventory.count(item_id) < quantity:
+                    raise ItemNotFoundError(item_id)
+            if giver.get('gold', 0) < gold:
+                raise InsufficientResourcesError("Gold", gold, giver.get('gold', 0))
+
+        # 2. Move the items; removals first so received items can use freed slots
+        undo = []
+        try:
+            for giver, receiver, items, gold in sides:
+                for item_id, quantity in items.items():
+                    remove_item_from_inventory(giver, item_id, quantity)
+                    undo.append((add_item_to_inventory, giver, item_id, quantity))
+            for giver, receiver, items, gold in sides:
+                for item_id, quantity in items.items():
+                    # Counted as acquired in step 4, once the trade cannot be undone
+                    add_item_to_inventory(receiver, item_id, quantity, item_data_dict.get(item_id), acquired=False)
+                    undo.append((remove_item_from_inventory, receiver, item_id, quantity))
+        except InventoryFullError:
+            for action, character, item_id, quantity in reversed(undo):
+                if action is add_item_to_inventory:
+                    action(character, item_id, quantity, item_data_dict.get(item_id), acquired=False)
+                else:
+                    action(character, item_id, quantity)
+            raise
+
+        # 3. Settle gold (both balances were checked in step 1)
+        character_manager.add_gold(first, second_gold - first_gold)
+        character_manager.add_gold(second, first_gold - second_gold)
+
+        # 4. Received items count towards quest objectives once the trade stands
+        for giver, receiver, items, gold in sides:
+            for item_id, quantity in items.items():
+                quest_handler.dispatch_quest_event(receiver, f"item_acquired:{item_id}", quantity)
+
+    return {
+        'first': first.get('name'),
+        'second': second.get('name'),
+        'first_gave': {'items': first_items, 'gold': first_gold},
+        'second_gave': {'items': second_items, 'gold': second_gold}
+    }
+
+def execute_trades(trades, item_data_dict=None):
+    """
+    Run a batch of trades (e.g. a marketplace tick)
+
+    Each trade is atomic on its own; a failed trade does not stop the
+    batch or affect the other trades.
+
+    Args:
+        trades: Iterable of (first, second, first_offer, second_offer) tuples
+        item_data_dict: Optional item data, used for stack sizes
+
+    Returns: List with, for each trade, its receipt or the exception that
+             stopped it
+    """
+    results = []
+    for first, second, first_offer, second_offer in trades:
+        try:
+            results.append(execute_trade(first, second, first_offer, second_offer, item_data_dict))
+        except (ValueError, ItemNotFoundError, InsufficientResourcesError, InventoryFullError) as error:
+            results.append(error)
+    return results
+
+# ============================================================================
+# SHOP CATALOG
+# ============================================================================
+
+class ShopCatalog:
+    """
+    Precomputed, pre-sorted views of the shop's item data
+
+    Items are kept sorted by (cost, item_id) overall, per item type and per
+    effect stat, together with a parallel list of costs so "what can I
+    afford" is a bisect on gold instead of a scan. Display rows are
+    formatted once per item. update() only touches items whose data
+    changed, so reloading item data does not rebuild the whole catalog.
+    """
+
+    def __init__(self, item_data_dict=None):
+        self._items = {}
+        self._rows = {}
+        self._by_cost = []     # sorted (cost, item_id) keys
+        self._costs = []       # parallel list of costs for bisect
+        self._by_type = {}     # item type -> sorted (cost, item_id) keys
+        self._by_stat = {}     # effect stat -> sorted (cost, item_id) keys
+        if item_data_dict:
+            self.update(item_data_dict)
+
+    @staticmethod
+    def _effect_stats(item_data):
+        """Get the stats an item's effects change ({None} if its effect is unreadable)"""
+        try:
+            return {effect[1] for effect in compile_effects(item_data.get('effect', ''))}
+        except InvalidItemTypeError:
+            return {None}
+
+    @staticmethod
+    def _remove_key(keys, key):
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            del keys[index]
+            return index
+        return None
+
+    def _format_row(self, item_id, item_data):
+        name = item_data.get('name', item_id)
+        cost = item_data.get('cost', 0)
+        item_type = item_data.get('type', 'N/A').capitalize()
+        return f"{name:<18} | {item_type:<10} | {cost} ({cost // 2})"
+
+    def _insert(self, item_id, item_data):
+        key = (item_data.get('cost', 0), item_id)
+        index = bisect.bisect_left(self._by_cost, key)
+        self._by_cost.insert(index, key)
+        self._costs.insert(index, key[0])
+        bisect.insort(self._by_type.setdefault(item_data.get('type'), []), key)
+        for stat in self._effect_stats(item_data):
+            bisect.insort(self._by_stat.setdefault(stat, []), key)
+
+        self._items[item_id] = dict(item_data)
+        self._rows[item_id] = self._format_row(item_id, item_data)
+
+    def _discard(self, item_id):
+        item_data = self._items.pop(item_id)
+        del self._rows[item_id]
+        key = (item_data.get('cost', 0), item_id)
+
+        index = self._remove_key(self._by_cost, key)
+        del self._costs[index]
+        views_and_keys = [(self._by_type, item_data.get('type'))]
+        views_and_keys += [(self._by_stat, stat) for stat in self._effect_stats(item_data)]
+        for views, view_key in views_and_keys:
+            self._remove_key(views[view_key], key)
+            if not views[view_key]:
+                del views[view_key]
+
+    def update(self, item_data_dict):
+        """
+        Bring the catalog in line with new item data
+
+        Items that were removed or whose data changed are re-indexed;
+        unchanged items are left alone.
+
+        Args:
+            item_data_dict: Dictionary of all item data (item_id -> data)
+
+        Returns: Number of items added, changed or removed
+        """
+        changed = 0
+        for item_id in [i for i in self._items if i not in item_data_dict]:
+            self._discard(item_id)
+            changed += 1
+
+        for item_id, item_data in item_data_dict.items():
+            if self._items.get(item_id) == item_data:
+                continue
+            if item_id in self._items:
+                self._discard(item_id)
+            self._insert(item_id, item_data)
+            changed += 1
+        return changed
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    def get(self, item_id, default=None):
+        """Get the catalog's copy of an item's data"""
+        return self._items.get(item_id, default)
+
+    def row(self, item_id):
+        """Get the preformatted display row for an item"""
+        return self._rows[item_id]
+
+    def by_cost(self):
+        """Get all item IDs, cheapest first"""
+        return [item_id for cost, item_id in self._by_cost]
+
+    def by_type(self, item_type):
+        """Get item IDs of one type, cheapest first"""
+        return [item_id for cost, item_id in self._by_type.get(item_type, [])]
+
+    def by_stat(self, stat_name):
+        """Get item IDs whose effect changes stat_name, cheapest first"""
+        return [item_id for cost, item_id in self._by_stat.get(stat_name, [])]
+
+    def affordable(self, gold):
+        """
+        Get the item IDs that cost at most `gold`, cheapest first
+
+        Uses a bisect on the sorted costs, so this is O(log n) plus the
+        size of the result.
+        """
+        end = bisect.bisect_right(self._costs, gold)
+        return [item_id for cost, item_id in self._by_cost[:end]]
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -532,6 +1420,7 @@ def parse_item_effect(effect_string):
         
     return stat_name, value
 
+@character_manager.mutates_character
 def apply_stat_effect(character, stat_name, value):
     """
     Apply a stat modification to character
@@ -543,32 +1432,8 @@ def apply_stat_effect(character, stat_name, value):
     # TODO: Implement stat application
     # Add value to character[stat_name]
     # If stat is health, ensure it doesn't exceed max_health
-    # 1. Handle health separately (requires max_health check)
-    if stat_name == "health":
-        # Get current health and max health, defaulting to safe values
-        current_hp = character.get('health', 0)
-        max_hp = character.get('max_health', current_hp) # If max_health isn't set, use current HP as max
-        
-        new_hp = current_hp + value
-        
-        # Apply the new health, ensuring it does not exceed max_health
-        character['health'] = min(new_hp, max_hp)
-        
-        # Also ensure health doesn't drop below zero
-        character['health'] = max(0, character['health'])
-        
-    # 2. Handle other stats
-    elif stat_name in character:
-        # Check if the stat is an integer/float before modifying
-        if isinstance(character[stat_name], (int, float)):
-            character[stat_name] += value
-        else:
-            print(f"Warning: Stat '{stat_name}' is not numeric and was not modified.")
-            
-    # 3. Handle stats that might be new (e.g., permanent buff from consumable)
-    # This assumes we want to add the stat if it doesn't exist
-    elif isinstance(value, int) or isinstance(value, float):
-        character[stat_name] = value
+    # Stat-specific rules (health clamping etc.) come from STAT_APPLIERS
+    _apply_to_stat(character, stat_name, value)
 
 def display_inventory(character, item_data_dict):
     """
@@ -583,25 +1448,26 @@ def display_inventory(character, item_data_dict):
     # TODO: Implement inventory display
     # Count items (some may appear multiple times)
     # Display with item names from item_data_dict
-    inventory_list = character.get('inventory', [])
-    
-    if not inventory_list:
+    if not character.get('inventory'):
         return "Inventory is empty."
         
-    # 1. Count items (items can appear multiple times)
-    item_counts = {}
-    for item_id in inventory_list:
-        item_counts[item_id] = item_counts.get(item_id, 0) + 1
-        
     # Determine the max capacity (assumed from MAX_INVENTORY_SIZE, but safely using current length for display)
     max_slots = character.get('max_inventory_size', 20) # Use 20 as default if not defined in character
-        
+    
+    # The rendering is cached until the character or the item data changes
+    return character_manager.cached_render(
+        character, "inventory", (item_data_dict, max_slots),
+        lambda: _render_inventory(get_inventory(character), item_data_dict, max_slots)
+    )
+
+def _render_inventory(inventory, item_data_dict, max_slots):
+    """Build the display_inventory text for an Inventory"""
     output = ["## 🎒 Inventory Status"]
-    output.append(f"Total items: {len(inventory_list)} / {max_slots}")
+    output.append(f"Total items: {len(inventory)} | Slots used: {inventory.slots_used()} / {max_slots}")
     output.append("---")
     
-    # 2. Display unique items, sorted by name or ID
-    for item_id, count in sorted(item_counts.items()):
+    # Display unique items, sorted by name or ID
+    for item_id, count in sorted(inventory.items()):
         # Get data, falling back to safe defaults for unknown items
         item_info = item_data_dict.get(item_id, {'name': 'UNKNOWN ITEM', 'type': 'N/A'})
         
@@ -26,6 +26,7 @@ from custom_exceptions import *
 current_character = None
 all_quests = {}
 all_items = {}
+shop_catalog = inventory_system.ShopCatalog()
 game_running = False
 
 # ============================================================================
@@ -121,6 +122,8 @@ def new_game():
             new_char = character_manager.create_character(name, class_choice)
             
             # Character creation successful
+            if current_character is not None:
+                character_manager.forget_character(current_character)
             current_character = new_char
             print(f"\n✅ Character '{name}' ({class_choice.capitalize()}) created successfully!")
             
@@ -190,8 +193,14 @@ def load_game():
                 
                 try:
                     loaded_char = character_manager.load_character(selected_save_name)
+                    # Older saves don't store stack sizes; take them from the item data
+                    inventory_system.apply_stack_sizes(loaded_char, all_items)
+                    # Decode saved quest bitsets now, against the loaded quest data
+                    quest_handler.load_quest_logs(loaded_char, all_quests)
                     
                     # Successfully loaded
+                    if current_character is not None:
+                        character_manager.forget_character(current_character)
                     current_character = loaded_char
                     print(f"✅ Game loaded successfully! Welcome back, {current_character['name']}.")
                     
@@ -204,7 +213,7 @@ def load_game():
                     print(f"❌ Load Error: {e}. The save file appears to be missing.")
                     # Continue the loop to allow user to try again
                 
-                except SaveFileCorruptedError as e:
+                except (SaveFileCorruptedError, InvalidSaveDataError) as e:
                     print(f"❌ Load Error: {e}. This save file is unusable and has been skipped.")
                     # Optionally remove the corrupted file from the list/disk here
                     saved_games.remove(selected_save_name)
@@ -393,7 +402,7 @@ def view_inventory():
     
     while True:
         # Show current inventory (assuming display_inventory is defined elsewhere)
-        display_inventory(char, GAME_ITEM_DATA)
+        print(inventory_system.display_inventory(char, all_items))
         
         print("\n--- Inventory Actions ---")
         print("U. Use Item | E. Equip/Unequip | S. Sell Item | D. Drop Item | B. Back")
@@ -424,7 +433,7 @@ def view_inventory():
                         print(f"✅ {inventory_system.equip_weapon(char, item_id, item_data)}")
                     elif item_data['type'] == 'armor':
                         # Same for armor
-                        print(f"✅ Armor equipped (Functionality TBD)") 
+                        print(f"✅ {inventory_system.equip_armor(char, item_id, item_data)}")
                     else:
                         print(f"❌ Cannot equip item of type '{item_data['type']}'.")
                         
@@ -559,7 +568,7 @@ def explore():
         # 3. Handle combat results
         if results['result'] == 'win':
             char['xp'] = char.get('xp', 0) + results['xp']
-            char['gold'] = char.get('gold', 0) + results['gold']
+            character_manager.add_gold(char, results['gold'])
             
             print("🎉 **VICTORY!**")
             print(f"Gained {results['xp']} XP and {results['gold']} Gold.")
@@ -568,7 +577,8 @@ def explore():
             if results.get('loot'):
                 for item in results['loot']:
                     try:
-                        equip_item(char, item)
+                        # Sends the item_acquired quest event like any other new item
+                        inventory_system.add_item_to_inventory(char, item, 1, all_items.get(item))
                         print(f"💰 Found loot: {item} (Added to inventory).")
                     except InventoryFullError:
                         print(f"⚠️ Could not pick up {item}: Inventory is full.")
@@ -613,13 +623,11 @@ def shop():
         print("**Items for Sale:**")
         print("ID   | Name | Type | Cost (Sell)")
         print("-----|------|------|------------")
-        for i, item_id in enumerate(SHOP_ITEMS, 1):
-            item_data = GAME_ITEM_DATA.get(item_id, {})
-            name = item_data.get('name', item_id)
-            cost = item_data.get('cost', 0)
-            sell_price = cost // 2
-            item_type = item_data.get('type', 'N/A').capitalize()
-            print(f"{i:<4} | {name:<10} | {item_type:<5} | {cost} ({sell_price})")
+        # Rows are preformatted and sorted by the catalog
+        shop_items = shop_catalog.by_cost()
+        for i, item_id in enumerate(shop_items, 1):
+            print(f"{i:<4} | {shop_catalog.row(item_id)}")
+        print(f"You can afford {len(shop_catalog.affordable(current_gold))} of {len(shop_items)} items.")
         
         print("----------------------------")
         print("B. Buy Item | S. Sell Item | X. Back to Menu")
@@ -633,9 +641,9 @@ def shop():
                 item_choice = input("Enter the number of the item to buy: ").strip()
                 item_index = int(item_choice) - 1
                 
-                if 0 <= item_index < len(SHOP_ITEMS):
-                    item_id = SHOP_ITEMS[item_index]
-                    item_data = GAME_ITEM_DATA[item_id]
+                if 0 <= item_index < len(shop_items):
+                    item_id = shop_items[item_index]
+                    item_data = shop_catalog.get(item_id)
                     
                     inventory_system.purchase_item(char, item_id, item_data)
                     print(f"✅ Purchased {item_data['name']} for {item_data['cost']} gold.")
@@ -645,11 +653,14 @@ def shop():
             elif choice == 's':
                 item_id = input("Enter the ID of the item to sell (e.g., wood_sword): ").strip()
                 
-                if item_id not in GAME_ITEM_DATA:
+                if item_id not in shop_catalog:
                     print(f"❌ Unknown item ID: {item_id}.")
+                    suggestions = [found for found, score in game_data.search_items(item_id, limit=3)]
+                    if suggestions:
+                        print(f"   Did you mean: {', '.join(suggestions)}?")
                     continue
                     
-                item_data = GAME_ITEM_DATA[item_id]
+                item_data = shop_catalog.get(item_id)
                 sell_amount = inventory_system.sell_item(char, item_id, item_data)
                 print(f"✅ Sold {item_data['name']} for {sell_amount} gold.")
                 
@@ -736,6 +747,19 @@ def load_game_data():
         print(f"❌ An unexpected error occurred during data loading: {e}")
         return
 
+    # Re-index only the items whose data changed since the last load
+    if data_loaded:
+        shop_catalog.update(all_items)
+        
+        # Number the quests (bitset positions), re-index quest levels and build
+        # the quest graph now, so broken prerequisites are reported at load time
+        try:
+            quest_handler.get_quest_index(all_quests)
+            quest_handler.quest_level_index.update(all_quests)
+            quest_handler.validate_quest_prerequisites(all_quests)
+        except (QuestNotFoundError, InvalidDataFormatError) as e:
+            print(f"❌ Quest Data Error: {e}")
+
 def handle_character_death():
     """Handle character death"""
     global current_character, game_running
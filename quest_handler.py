@@ -8,8 +8,16 @@ AI Usage: [Document any AI assistance used]
 
 This module handles quest management, dependencies, and completion.
 """
+import bisect
+import collections
+import heapq
+import zlib
+
 import character_manager
+import game_data
 from custom_exceptions import (
+    InvalidDataFormatError,
+    InvalidSaveDataError,
     QuestNotFoundError,
     QuestRequirementsNotMetError,
     QuestAlreadyCompletedError,
@@ -17,10 +25,338 @@ from custom_exceptions import (
     InsufficientLevelError
 )
 
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional; QuestColumns falls back to per-character bitmask checks
+    np = None
+
+# ============================================================================
+# QUEST LOG
+# ============================================================================
+
+class QuestLog:
+    """
+    Ordered set of quest IDs
+
+    Backed by a dict, so membership checks, adding and removing are O(1)
+    while the order quests were added in is kept for display and saving.
+    Supports the list operations the quest lists were used with (in,
+    len(), iteration, append, remove and comparison with a list), so
+    character['active_quests'] / ['completed_quests'] keep working.
+
+    version counts the appends and removes made, so cached per-character
+    state can tell when the log changed even if its length did not.
+    """
+
+    def __init__(self, quest_ids=None):
+        """
+        Create a quest log
+
+        Args:
+            quest_ids: Optional list of quest IDs (e.g. a loaded save file list)
+        """
+        self._ids = dict.fromkeys(quest_ids or ())
+        self.version = 0
+
+    def append(self, quest_id):
+        """Add a quest ID at the end (no effect if it is already present)"""
+        self._ids[quest_id] = None
+        self.version += 1
+
+    def remove(self, quest_id):
+        """
+        Remove a quest ID
+
+        Raises: ValueError if the quest ID is not present (like list.remove)
+        """
+        try:
+            del self._ids[quest_id]
+        except KeyError:
+            raise ValueError(f"Quest '{quest_id}' is not in the quest log.")
+        self.version += 1
+
+    def __contains__(self, quest_id):
+        return quest_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __getitem__(self, index):
+        return list(self._ids)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, QuestLog):
+            return list(self) == list(other)
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"QuestLog({list(self._ids)!r})"
+
+    def copy(self):
+        """Independent copy of this quest log"""
+        return QuestLog(self._ids)
+
+    def to_list(self):
+        """Quest IDs as a list, in the order they were added"""
+        return list(self._ids)
+
+    def to_save_list(self):
+        """Quest IDs in the list form save_character writes"""
+        return list(self._ids)
+
+# Save-file form of a QuestBitset: "@<index fingerprint>:<bitmask in hex>"
+QUEST_BITSET_PREFIX = "@"
+
+class QuestBitset(QuestLog):
+    """
+    Quest log kept as a bitmask over a quest index's dense quest numbers
+
+    Bit n is set when the quest at position n of the quest data is in the
+    log, so membership, adding and removing are single bit operations,
+    the completed-quests mask used by requirement checks is the log
+    itself, and the save file stores one hex number instead of a list of
+    IDs. Quest IDs the index does not know are kept separately, in order.
+    Iterates in quest data order rather than the order quests were added.
+    """
+
+    def __init__(self, index, quest_ids=None):
+        """
+        Create a bitset quest log
+
+        Args:
+            index: QuestAvailabilityIndex giving the quest numbering
+            quest_ids: Optional iterable of quest IDs
+        """
+        self.index = index
+        self.mask = 0
+        self._ids = {}   # quest IDs the index does not know
+        self.version = 0
+        for quest_id in quest_ids or ():
+            self.append(quest_id)
+
+    def append(self, quest_id):
+        """Add a quest ID (no effect if it is already present)"""
+        bit = self.index.bits.get(quest_id)
+        if bit:
+            self.mask |= bit
+        else:
+            self._ids[quest_id] = None
+        self.version += 1
+
+    def remove(self, quest_id):
+        """
+        Remove a quest ID
+
+        Raises: ValueError if the quest ID is not present (like list.remove)
+        """
+        bit = self.index.bits.get(quest_id)
+        if bit and self.mask & bit:
+            self.mask ^= bit
+        elif quest_id in self._ids:
+            del self._ids[quest_id]
+        else:
+            raise ValueError(f"Quest '{quest_id}' is not in the quest log.")
+        self.version += 1
+
+    def __contains__(self, quest_id):
+        bit = self.index.bits.get(quest_id)
+        if bit:
+            return bool(self.mask & bit)
+        return quest_id in self._ids
+
+    def __len__(self):
+        return self.mask.bit_count() + len(self._ids)
+
+    def __iter__(self):
+        quest_ids = self.index.quest_ids
+        for position in _set_bits(self.mask):
+            yield quest_ids[position]
+        yield from list(self._ids)
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __repr__(self):
+        return f"QuestBitset({list(self)!r})"
+
+    def copy(self):
+        """Independent copy of this quest log"""
+        copy = QuestBitset(self.index)
+        copy.mask = self.mask
+        copy._ids = dict(self._ids)
+        return copy
+
+    def to_list(self):
+        """Quest IDs as a list, in quest data order"""
+        return list(self)
+
+    def to_save_list(self):
+        """
+        Save file form: the encoded bitmask, or the plain ID list if the
+        log holds quest IDs the index does not know
+        """
+        if self._ids:
+            return list(self)
+        return [self.encode()]
+
+    def encode(self):
+        """Encode the bitmask as "@<index fingerprint>:<hex mask>" """
+        return f"{QUEST_BITSET_PREFIX}{self.index.fingerprint:08x}:{self.mask:x}"
+
+    @staticmethod
+    def decode(text, quest_data_dict=None):
+        """
+        Decode an encoded bitmask against the quest index it was saved with
+
+        Args:
+            quest_data_dict: Quest data to decode against; without it the
+                             cached index with the saved quest numbering
+                             is used (if there still is one)
+
+        Raises: InvalidSaveDataError if it is malformed or the quest data
+                does not have the same quests in the same order
+        """
+        try:
+            fingerprint, mask = text[len(QUEST_BITSET_PREFIX):].split(":")
+            fingerprint, mask = int(fingerprint, 16), int(mask, 16)
+        except ValueError:
+            raise InvalidSaveDataError("quest log", f"malformed quest bitset '{text}'")
+
+        if quest_data_dict is not None:
+            index = get_quest_index(quest_data_dict)
+            if index.fingerprint != fingerprint:
+                index = None
+        else:
+            index = next(
+                (index for index in reversed(_quest_indexes.values()) if index.fingerprint == fingerprint), None
+            )
+        if index is None or mask >> len(index.quest_ids):
+            raise InvalidSaveDataError(
+                "quest log", f"quest bitset was saved with different quest data ({fingerprint:08x})"
+            )
+        quest_log = QuestBitset(index)
+        quest_log.mask = mask
+        return quest_log
+
+def _set_bits(mask):
+    """Positions of the set bits of a bitmask, lowest first"""
+    digits = bin(mask)[:1:-1]
+    position = digits.find('1')
+    while position != -1:
+        yield position
+        position = digits.find('1', position + 1)
+
+def get_quest_log(character, key, quest_data_dict=None):
+    """
+    Get a character's quest list ('active_quests' or 'completed_quests') as a QuestLog
+
+    A plain list (e.g. from create_character or load_character) is
+    converted the first time and stored back on the character. A saved
+    QuestBitset (a single "@..." entry) is decoded back into one, against
+    quest_data_dict if given (see QuestBitset.decode).
+
+    Raises: InvalidSaveDataError if a saved quest bitset cannot be decoded
+    """
+    quest_log = character[key]
+    if not isinstance(quest_log, QuestLog):
+        if len(quest_log) == 1 and str(quest_log[0]).startswith(QUEST_BITSET_PREFIX):
+            quest_log = QuestBitset.decode(quest_log[0], quest_data_dict)
+        else:
+            quest_log = QuestLog(quest_log)
+        character[key] = quest_log
+    return quest_log
+
+@character_manager.locks_character
+def use_quest_bitsets(character, quest_data_dict):
+    """
+    Keep a character's active and completed quests as QuestBitsets
+
+    Worth it with large quest sets: membership and requirement checks
+    become bit operations and saves store one hex number per list.
+
+    Returns: The character's completed QuestBitset
+    """
+    index = get_quest_index(quest_data_dict)
+    for key in ('active_quests', 'completed_quests'):
+        quest_log = get_quest_log(character, key, quest_data_dict)
+        if not (isinstance(quest_log, QuestBitset) and quest_log.index is index):
+            character[key] = QuestBitset(index, quest_log)
+    return character['completed_quests']
+
+@character_manager.locks_character
+def load_quest_logs(character, quest_data_dict):
+    """
+    Convert a just-loaded character's quest lists to QuestLogs
+
+    Call this after load_character, so saved quest bitsets are decoded
+    against the game's quest data straight away rather than on first use.
+
+    Raises: InvalidSaveDataError if a saved quest bitset does not match quest_data_dict
+    """
+    for key in ('active_quests', 'completed_quests'):
+        get_quest_log(character, key, quest_data_dict)
+
+def _active(character, quest_data_dict=None):
+    return get_quest_log(character, 'active_quests', quest_data_dict)
+
+def _completed(character, quest_data_dict=None):
+    return get_quest_log(character, 'completed_quests', quest_data_dict)
+
 # ============================================================================
 # QUEST MANAGEMENT
 # ============================================================================
 
+def _acceptance_error(character, quest_id, quest_data_dict):
+    """
+    Why a character cannot accept a quest right now
+
+    Shared by accept_quest and can_accept_quest so they always agree.
+    Every check reads the quest data as it is now; the availability index
+    only supplies the quest bit numbering and the completed-quests mask
+    the REQUIRES expression is evaluated against.
+
+    Returns: The exception accept_quest should raise, or None if the
+             quest can be accepted
+    """
+    if quest_id not in quest_data_dict:
+        return QuestNotFoundError(f"Quest '{quest_id}' not found.")
+
+    quest = quest_data_dict[quest_id]
+
+    # Level requirement
+    if character['level'] < quest['required_level']:
+        return InsufficientLevelError(character['level'], quest['required_level'])
+
+    # Prerequisite check
+    prereq = quest['prerequisite']
+    if prereq != "NONE" and prereq not in _completed(character, quest_data_dict):
+        return QuestRequirementsNotMetError("Prerequisite quest not completed.")
+
+    # Requirement expression (REQUIRES), if any
+    if 'requires' in quest:
+        index = get_quest_index(quest_data_dict)
+        requirement = compile_requirement(quest['requires'], index.bits)
+        if requirement(index.state(character)['completed']) > character['level']:
+            return QuestRequirementsNotMetError(
+                f"Requires {game_data.format_requirement(quest['requires'])}."
+            )
+
+    # Not already completed
+    if quest_id in _completed(character, quest_data_dict):
+        return QuestAlreadyCompletedError("Quest already completed.")
+
+    # Not already active
+    if quest_id in _active(character, quest_data_dict):
+        return QuestRequirementsNotMetError("Quest already active.")
+    return None
+
+@character_manager.mutates_character
 def accept_quest(character, quest_id, quest_data_dict):
     """
     Accept a new quest
@@ -51,32 +387,21 @@ def accept_quest(character, quest_id, quest_data_dict):
     # Check not already active
     # Add to character['active_quests']
     
-    if quest_id not in quest_data_dict:
-        raise QuestNotFoundError(f"Quest '{quest_id}' not found.")
+    error = _acceptance_error(character, quest_id, quest_data_dict)
+    if error is not None:
+        raise error
 
+    # Accept quest
     quest = quest_data_dict[quest_id]
+    _active(character, quest_data_dict).append(quest_id)
+    get_quest_index(quest_data_dict).quest_accepted(character, quest_id)
 
-    # Level requirement
-    if character['level'] < quest['required_level']:
-        raise InsufficientLevelError(character['level'], quest['required_level'])
-
-    # Prerequisite check
-    prereq = quest['prerequisite']
-    if prereq != "NONE" and prereq not in character['completed_quests']:
-        raise QuestRequirementsNotMetError("Prerequisite quest not completed.")
-
-    # Not already completed
-    if quest_id in character['completed_quests']:
-        raise QuestAlreadyCompletedError("Quest already completed.")
-
-    # Not already active
-    if quest_id in character['active_quests']:
-        raise QuestRequirementsNotMetError("Quest already active.")
-
-    # Accept quest
-    character['active_quests'].append(quest_id)
+    # Subscribe the quest to its objective events
+    if quest.get('objectives'):
+        get_quest_progress(character).track(quest_id, quest['objectives'])
     return True
 
+@character_manager.mutates_character
 def complete_quest(character, quest_id, quest_data_dict):
     """
     Complete an active quest and grant rewards
@@ -105,14 +430,19 @@ def complete_quest(character, quest_id, quest_data_dict):
     if quest_id not in quest_data_dict:
         raise QuestNotFoundError(f"Quest '{quest_id}' not found.")
 
-    if quest_id not in character['active_quests']:
+    if quest_id not in _active(character, quest_data_dict):
         raise QuestNotActiveError("Cannot complete a quest that is not active.")
 
     quest = quest_data_dict[quest_id]
+    completed = _completed(character, quest_data_dict)
+    stats = _quest_stats_in_step(character, completed)
 
     # Remove from active, add to completed
-    character['active_quests'].remove(quest_id)
-    character['completed_quests'].append(quest_id)
+    _active(character, quest_data_dict).remove(quest_id)
+    completed.append(quest_id)
+    get_quest_index(quest_data_dict).quest_completed(character, quest_id)
+    if character.get('quest_progress'):
+        get_quest_progress(character).untrack(quest_id)
 
     # Grant rewards
     xp = quest['reward_xp']
@@ -121,12 +451,18 @@ def complete_quest(character, quest_id, quest_data_dict):
     character_manager.gain_experience(character, xp)
     character_manager.add_gold(character, gold)
 
+    # Keep the running statistics in step (if they were out of step,
+    # get_quest_stats rebuilds them the next time they are read)
+    if stats is not None:
+        _set_quest_stats(character, completed, (stats[0] + 1, stats[1] + xp, stats[2] + gold))
+
     return {
         'reward_xp': xp,
         'reward_gold': gold
     }
 
 
+@character_manager.mutates_character
 def abandon_quest(character, quest_id):
     """
     Remove a quest from active quests without completing it
@@ -135,10 +471,16 @@ def abandon_quest(character, quest_id):
     Raises: QuestNotActiveError if quest not active
     """
     # TODO: Implement quest abandonment
-    if quest_id not in character['active_quests']:
+    if quest_id not in _active(character):
         raise QuestNotActiveError("Quest is not active.")
 
-    character['active_quests'].remove(quest_id)
+    _active(character).remove(quest_id)
+    if character.get('quest_progress'):
+        get_quest_progress(character).untrack(quest_id)
+    
+    index = _character_quest_index(character)
+    if index is not None:
+        index.quest_abandoned(character, quest_id)
     return True
 
 def get_active_quests(character, quest_data_dict):
@@ -150,7 +492,7 @@ def get_active_quests(character, quest_data_dict):
     # TODO: Implement active quest retrieval
     # Look up each quest_id in character['active_quests']
     # Return list of full quest data dictionaries
-    return [quest_data_dict[q] for q in character['active_quests']]
+    return [quest_data_dict[q] for q in _active(character, quest_data_dict)]
 
 
 def get_completed_quests(character, quest_data_dict):
@@ -160,26 +502,178 @@ def get_completed_quests(character, quest_data_dict):
     Returns: List of quest dictionaries for completed quests
     """
     # TODO: Implement completed quest retrieval
-    return [quest_data_dict[q] for q in character['completed_quests']]
+    return [quest_data_dict[q] for q in _completed(character, quest_data_dict)]
 
 
 def get_available_quests(character, quest_data_dict):
     """
     Get quests that character can currently accept
     
-    Available = meets level req + prerequisite done + not completed + not active
+    Available = meets level req + prerequisite done + REQUIRES met
+                + not completed + not active
     
     Returns: List of quest dictionaries
     """
     # TODO: Implement available quest search
     # Filter all quests by requirements
-    available = []
+    # The availability index tracks this incrementally (see QuestAvailabilityIndex)
+    index = get_quest_index(quest_data_dict)
+    return [quest_data_dict[q_id] for q_id in index.available(character)]
 
-    for q_id, q_data in quest_data_dict.items():
-        if can_accept_quest(character, q_id, quest_data_dict):
-            available.append(q_data)
+# ============================================================================
+# QUEST OBJECTIVES
+# ============================================================================
+
+class QuestProgress:
+    """
+    Objective progress of a character's active quests
+
+    Each tracked quest has a done/required counter per objective event
+    ("enemy_defeated:goblin", "item_acquired:health_potion", ...). The
+    event -> quest IDs table is the subscription list, so an event only
+    touches the quests waiting for it instead of every active quest being
+    checked. Saved with the character as "quest_id|event|done|required"
+    entries (to_save_list).
+    """
+
+    def __init__(self, entries=None):
+        """
+        Create objective progress
+
+        Args:
+            entries: Optional save list entries ("quest_id|event|done|required")
+
+        Raises: InvalidSaveDataError if an entry is malformed
+        """
+        self._quests = {}       # quest_id -> {event: [done, required]}
+        self._subscribers = {}  # event -> {quest_id: None}
+        for entry in entries or ():
+            try:
+                quest_id, event, done, required = entry.split("|")
+                done, required = int(done), int(required)
+            except ValueError:
+                raise InvalidSaveDataError("quest progress", f"malformed entry '{entry}'")
+            self._add(quest_id, event, done, required)
+
+    def _add(self, quest_id, event, done, required):
+        self._quests.setdefault(quest_id, {})[event] = [done, required]
+        self._subscribers.setdefault(event, {})[quest_id] = None
+
+    def track(self, quest_id, objectives):
+        """
+        Start tracking a quest's objectives (from zero)
+
+        Args:
+            objectives: List of (event, count) pairs
+        """
+        self.untrack(quest_id)
+        for event, required in objectives:
+            self._add(quest_id, event, 0, required)
+
+    def untrack(self, quest_id):
+        """Stop tracking a quest (no effect if it is not tracked)"""
+        for event in self._quests.pop(quest_id, {}):
+            subscribers = self._subscribers[event]
+            del subscribers[quest_id]
+            if not subscribers:
+                del self._subscribers[event]
+
+    def subscribed(self, event):
+        """Quest IDs waiting for an event"""
+        return list(self._subscribers.get(event, ()))
+
+    def record(self, event, amount=1):
+        """
+        Count an event for the quests subscribed to it
+
+        Returns: Quest IDs whose objectives all became complete with this event
+        """
+        ready = []
+        for quest_id in self._subscribers.get(event, ()):
+            counter = self._quests[quest_id][event]
+            if counter[0] >= counter[1]:
+                continue
+            counter[0] = min(counter[0] + amount, counter[1])
+            if counter[0] == counter[1] and self.is_complete(quest_id):
+                ready.append(quest_id)
+        return ready
+
+    def progress(self, quest_id):
+        """Objective progress of a quest: {event: (done, required)} (empty if untracked)"""
+        return {event: tuple(counter) for event, counter in self._quests.get(quest_id, {}).items()}
+
+    def is_complete(self, quest_id):
+        """True if every objective of the quest is done (or it has none)"""
+        return all(done >= required for done, required in self._quests.get(quest_id, {}).values())
 
-    return available
+    def __contains__(self, quest_id):
+        return quest_id in self._quests
+
+    def __len__(self):
+        return len(self._quests)
+
+    def to_save_list(self):
+        """Progress entries in the list form save_character writes"""
+        return [
+            f"{quest_id}|{event}|{done}|{required}"
+            for quest_id, counters in self._quests.items()
+            for event, (done, required) in counters.items()
+        ]
+
+def get_quest_progress(character):
+    """
+    Get a character's QuestProgress
+
+    A saved list (from load_character) is converted the first time, and a
+    character without one gets an empty one; either is stored back.
+    """
+    progress = character.get('quest_progress')
+    if not isinstance(progress, QuestProgress):
+        progress = QuestProgress(progress)
+        character['quest_progress'] = progress
+    return progress
+
+def get_quest_objectives(character, quest_id):
+    """
+    Get the objective progress of one of the character's quests
+
+    Returns: Dictionary of event -> (done, required); empty if the quest has
+             no tracked objectives
+    """
+    return get_quest_progress(character).progress(quest_id)
+
+def are_quest_objectives_complete(character, quest_id):
+    """
+    Check whether a quest's objectives are all done
+
+    Returns: True if done, or if the quest has no tracked objectives
+    """
+    return get_quest_progress(character).is_complete(quest_id)
+
+def dispatch_quest_event(character, event, amount=1):
+    """
+    Report a game event to the character's quests that are waiting for it
+
+    Called by combat ("enemy_defeated:<enemy type>") and the inventory
+    ("item_acquired:<item_id>"). Only quests subscribed to the event are
+    updated, and characters tracking nothing return straight away.
+
+    Args:
+        character: Character dictionary
+        event: Event string, "<event type>:<target>"
+        amount: How many times it happened
+
+    Returns: Quest IDs whose objectives all became complete
+    """
+    if not character.get('quest_progress'):
+        return []
+    with character_manager.character_lock(character):
+        progress = get_quest_progress(character)
+        if not progress.subscribed(event):
+            return []
+        ready = progress.record(event, amount)
+        character_manager.touch_character(character)
+    return ready
 
 # ============================================================================
 # QUEST TRACKING
@@ -192,7 +686,7 @@ def is_quest_completed(character, quest_id):
     Returns: True if completed, False otherwise
     """
     # TODO: Implement completion check
-    return quest_id in character['completed_quests']
+    return quest_id in _completed(character)
 
 
 def is_quest_active(character, quest_id):
@@ -202,7 +696,7 @@ def is_quest_active(character, quest_id):
     Returns: True if active, False otherwise
     """
     # TODO: Implement active check
-    return quest_id in character['active_quests']
+    return quest_id in _active(character)
 
 
 def can_accept_quest(character, quest_id, quest_data_dict):
@@ -214,58 +708,1086 @@ def can_accept_quest(character, quest_id, quest_data_dict):
     """
     # TODO: Implement requirement checking
     # Check all requirements without raising exceptions
-    if quest_id not in quest_data_dict:
+    # Same checks as accept_quest, so the two never disagree
+    try:
+        return _acceptance_error(character, quest_id, quest_data_dict) is None
+    except InvalidSaveDataError:
+        # Saved quest lists that do not match this quest data
         return False
 
-    quest = quest_data_dict[quest_id]
-
-    if character['level'] < quest['required_level']:
-        return False
-
-    prereq = quest['prerequisite']
-    if prereq != "NONE" and prereq not in character['completed_quests']:
-        return False
-
-    if quest_id in character['completed_quests']:
-        return False
-
-    if quest_id in character['active_quests']:
-        return False
-
-    return True
-
 def get_quest_prerequisite_chain(quest_id, quest_data_dict):
     """
     Get the full chain of prerequisites for a quest
     
+    Quests named in a REQUIRES expression count as prerequisites too.
+    
     Returns: List of quest IDs in order [earliest_prereq, ..., quest_id]
     Example: If Quest C requires Quest B, which requires Quest A:
              Returns ["quest_a", "quest_b", "quest_c"]
     
-    Raises: QuestNotFoundError if quest doesn't exist
+    Raises:
+        QuestNotFoundError if quest doesn't exist
+        InvalidDataFormatError if the quest requirements form a cycle
     """
     # TODO: Implement prerequisite chain tracing
     # Follow prerequisite links backwards
     # Build list in reverse order
-    if quest_id not in quest_data_dict:
-        raise QuestNotFoundError(f"Quest '{quest_id}' not found.")
+    # Chains are memoized by the quest graph (see QuestGraph.chain)
+    return get_quest_graph(quest_data_dict).chain(quest_id)
+
+def get_quests_unlocked_by(quest_id, quest_data_dict):
+    """
+    Get every quest that requires quest_id, directly or through other quests
+    
+    Returns: List of quest IDs, each after the quests it requires
+    Raises: QuestNotFoundError if quest doesn't exist
+    """
+    return get_quest_graph(quest_data_dict).unlocked_by(quest_id)
+
+# ============================================================================
+# QUEST AVAILABILITY INDEX
+# ============================================================================
+
+# Requirement level of a quest that cannot be unlocked with the quests done so far
+NEVER = float('inf')
+
+def compile_requirement(node, bits):
+    """
+    Compile a requirement tree (see game_data.parse_requirement) to a function
+
+    Args:
+        node: Requirement tree
+        bits: Dictionary of quest_id -> bit in the completed-quests bitmask
+
+    Returns: Function taking a completed-quests bitmask and returning the
+             lowest character level at which the requirement holds
+             (0 if no level is involved, NEVER if it cannot hold yet)
+    """
+    kind = node[0]
+    if kind == 'level':
+        level = node[1]
+        return lambda completed: level
+    if kind == 'quest':
+        bit = bits.get(node[1], 0)
+        if not bit:
+            return lambda completed: NEVER
+        return lambda completed: 0 if completed & bit else NEVER
+
+    count, children = node[1], node[2]
+    quest_ids = [child[1] for child in children if child[0] == 'quest']
+    mask = 0
+    for quest_id in quest_ids:
+        mask |= bits.get(quest_id, 0)
+
+    # 1. Only quests: one AND plus a popcount against the combined mask
+    if len(quest_ids) == len(children):
+        if count > mask.bit_count():
+            return lambda completed: NEVER
+        return lambda completed: 0 if (completed & mask).bit_count() >= count else NEVER
+
+    # 2. All of: the quest children become a single mask test
+    if count == len(children):
+        if len(quest_ids) > mask.bit_count():
+            return lambda completed: NEVER
+        others = [compile_requirement(child, bits) for child in children if child[0] != 'quest']
+        def all_of(completed):
+            if completed & mask != mask:
+                return NEVER
+            return max(other(completed) for other in others)
+        return all_of
+
+    # 3. Any count of a mix: the count-th lowest child level
+    compiled = [compile_requirement(child, bits) for child in children]
+    if count == 1:
+        return lambda completed: min(child(completed) for child in compiled)
+    return lambda completed: sorted(child(completed) for child in compiled)[count - 1]
+
+def quest_requirement(quest):
+    """
+    Full requirement tree of a quest: REQUIRED_LEVEL, PREREQUISITE and REQUIRES
+
+    Returns: Requirement tree (see game_data.parse_requirement)
+    """
+    parts = [('level', quest['required_level'])]
+    if quest.get('prerequisite', "NONE") != "NONE":
+        parts.append(('quest', quest['prerequisite']))
+    if 'requires' in quest:
+        parts.append(quest['requires'])
+    return parts[0] if len(parts) == 1 else ('any', len(parts), tuple(parts))
+
+class QuestAvailabilityIndex:
+    """
+    Incremental index of the quests each character can accept
+
+    Quests are grouped by the quests their requirements mention, so
+    completing a quest only looks at the quests that depend on it. Each
+    quest's requirements are compiled (compile_requirement) to a function
+    of the character's completed-quests bitmask giving the level the quest
+    unlocks at. Per character, unlocked quests the character is too low
+    level for wait in buckets by that level and move to the available set
+    when the character levels up. Listing available quests then costs
+    O(available) instead of a can_accept_quest call per quest.
+
+    The per-character state lives in the character's runtime state (see
+    character_manager.get_runtime_state), not the character itself, and
+    is rebuilt (one O(quests) pass) if the quest lists were changed other
+    than through accept_quest/complete_quest/abandon_quest: it records
+    which QuestLog objects it was built from and their version counters,
+    so replacing a list or editing one in place (even a same-length swap)
+    is noticed.
+    """
 
-    chain = []
-    current = quest_id
+    def __init__(self, quest_data_dict):
+        self.quest_data = quest_data_dict
+        self.size = len(quest_data_dict)
+        self.quest_ids = list(quest_data_dict)   # position -> quest_id
+        self.position = {}     # quest_id -> position in quest_data_dict (for ordering)
+        self.bits = {}         # quest_id -> bit in the completed-quests bitmask
+        self.dependents = {}   # quest_id mentioned ("NONE" for none) -> [quest_id, ...]
+        self.requirements = {} # quest_id -> compiled requirement (see compile_requirement)
+        for position, quest_id in enumerate(quest_data_dict):
+            self.position[quest_id] = position
+            self.bits[quest_id] = 1 << position
+        # Identifies the quest numbering, so saved bitsets decode against the same one
+        self.fingerprint = zlib.crc32("\n".join(self.quest_ids).encode("utf-8"))
 
-    while current != "NONE":
-        if current not in quest_data_dict:
-            raise QuestNotFoundError(f"Prerequisite '{current}' not found.")
+        for quest_id, quest in quest_data_dict.items():
+            requirement = quest_requirement(quest)
+            self.requirements[quest_id] = compile_requirement(requirement, self.bits)
+            for mentioned in game_data.requirement_quests(requirement) or ["NONE"]:
+                self.dependents.setdefault(mentioned, []).append(quest_id)
 
-        chain.append(current)
-        current = quest_data_dict[current]['prerequisite']
+    def completed_mask(self, quest_ids):
+        """Bitmask of the given (completed) quest IDs"""
+        if isinstance(quest_ids, QuestBitset) and quest_ids.index is self:
+            return quest_ids.mask
+        mask = 0
+        for quest_id in quest_ids:
+            mask |= self.bits.get(quest_id, 0)
+        return mask
 
-    return chain[::-1]
+    def _logs(self, character):
+        return (_active(character, self.quest_data), _completed(character, self.quest_data))
+
+    @staticmethod
+    def _versions(logs):
+        return tuple(quest_log.version for quest_log in logs)
+
+    def _build_state(self, character):
+        """Build a character's availability state from scratch"""
+        completed = _completed(character, self.quest_data)
+        active = _active(character, self.quest_data)
+        state = {
+            'index': self, 'level': 0, 'available': {}, 'waiting': {}, 'placed': {},
+            'completed': self.completed_mask(completed),
+        }
+
+        for prerequisite in ["NONE"] + list(completed):
+            for quest_id in self.dependents.get(prerequisite, ()):
+                if quest_id not in completed and quest_id not in active:
+                    self._unlock(state, quest_id)
+
+        state['logs'] = self._logs(character)
+        state['versions'] = self._versions(state['logs'])
+        character_manager.get_runtime_state(character)['quest_availability'] = state
+        return state
+
+    def _unlock(self, state, quest_id):
+        """(Re)place a quest by the level its requirements now unlock it at"""
+        level = self.requirements[quest_id](state['completed'])
+        placed = state['placed'].get(quest_id)
+        if level == NEVER or (placed is not None and placed <= level):
+            return
+        if placed is not None and placed in state['waiting']:
+            state['waiting'][placed].pop(quest_id, None)
+
+        state['placed'][quest_id] = level
+        if level <= state['level']:
+            state['available'][quest_id] = True
+        else:
+            state['waiting'].setdefault(level, {})[quest_id] = True
+
+    def state(self, character, change=(0, 0)):
+        """
+        Get a character's up-to-date availability state
+
+        Args:
+            change: Number of (active, completed) quest log changes the
+                    caller has just made and is about to report
+        """
+        state = character_manager.get_runtime_state(character).get('quest_availability')
+        level = character['level']
+        logs = self._logs(character)
+        active, completed = self._versions(logs)
+        expected = (active - change[0], completed - change[1])
+        if (state is None or state['index'] is not self
+                or state['logs'][0] is not logs[0] or state['logs'][1] is not logs[1]
+                or state['versions'] != expected or level < state['level']):
+            state = self._build_state(character)
+
+        # Move the buckets the character has levelled into
+        if level > state['level']:
+            for required_level in [l for l in state['waiting'] if l <= level]:
+                state['available'].update(state['waiting'].pop(required_level))
+            state['level'] = level
+        return state
+
+    def requirement_level(self, character, quest_id):
+        """Level at which the character meets the quest's requirements (NEVER if not yet)"""
+        return self.requirements[quest_id](self.state(character)['completed'])
+
+    def available(self, character):
+        """Quest IDs the character can accept, in quest data order"""
+        return sorted(self.state(character)['available'], key=self.position.__getitem__)
+
+    def quest_accepted(self, character, quest_id):
+        state = self.state(character, (1, 0))
+        state['available'].pop(quest_id, None)
+        state['placed'].pop(quest_id, None)
+        state['versions'] = self._versions(state['logs'])
+
+    def quest_completed(self, character, quest_id):
+        state = self.state(character, (1, 1))
+        state['completed'] |= self.bits.get(quest_id, 0)
+        active, completed = state['logs']
+        for dependent in self.dependents.get(quest_id, ()):
+            if dependent not in completed and dependent not in active:
+                self._unlock(state, dependent)
+        state['versions'] = self._versions(state['logs'])
+
+    def quest_abandoned(self, character, quest_id):
+        state = self.state(character, (1, 0))
+        if quest_id in self.quest_data:
+            self._unlock(state, quest_id)
+        state['versions'] = self._versions(state['logs'])
+
+# Number of quest data dictionaries whose indexes, graphs and planners are
+# kept; the least recently used one is dropped when another is added
+QUEST_CACHE_SIZE = 8
+
+def _cached_for(registry, quest_data_dict, build):
+    """
+    Get the cached structure for a quest data dictionary, building it if needed
+
+    Args:
+        registry: OrderedDict of id(quest_data_dict) -> structure with
+                  quest_data and size attributes
+        build: Function building the structure from quest_data_dict
+
+    The structure is rebuilt if quests were added to or removed from the
+    dictionary. Edits inside a quest are not noticed (see refresh_quest_data).
+    """
+    key = id(quest_data_dict)
+    cached = registry.get(key)
+    if cached is None or cached.quest_data is not quest_data_dict or cached.size != len(quest_data_dict):
+        cached = registry[key] = build(quest_data_dict)
+    registry.move_to_end(key)
+    while len(registry) > QUEST_CACHE_SIZE:
+        registry.popitem(last=False)
+    return cached
+
+# Availability indexes by quest data dictionary (most recently used last)
+_quest_indexes = collections.OrderedDict()
+
+def get_quest_index(quest_data_dict):
+    """
+    Get the QuestAvailabilityIndex for a quest data dictionary
+
+    The index is built on first use and rebuilt if quests were added to
+    or removed from the dictionary. It also gives each quest its dense
+    number (its QuestBitset bit), so main.py builds it when data loads;
+    saved bitsets decode against the indexes still cached. See
+    refresh_quest_data for edits inside a quest.
+    """
+    return _cached_for(_quest_indexes, quest_data_dict, QuestAvailabilityIndex)
+
+def _character_quest_index(character):
+    """The index a character's availability state was built from, if any"""
+    state = character_manager.get_runtime_state(character).get('quest_availability')
+    return None if state is None else state['index']
+
+# ============================================================================
+# QUEST GRAPH
+# ============================================================================
+
+class QuestGraph:
+    """
+    Requirement graph of a quest data set
+
+    Each quest points to the quests it needs: its prerequisite and every
+    quest its REQUIRES expression mentions. Built once per quest data
+    set. The quests are put in topological order (Kahn's algorithm),
+    which also detects requirement cycles. Each quest's depth (longest
+    run of needed quests above it) is computed along that order and
+    prerequisite chains are memoized. While every quest needs at most one
+    other (plain PREREQUISITE data) the graph is a forest, and a
+    depth-first numbering makes "all quests unlocked by X" a slice of one
+    list; otherwise they are found by a walk down from X.
+    """
+
+    def __init__(self, quest_data_dict):
+        self.quest_data = quest_data_dict
+        self.size = len(quest_data_dict)
+        self.parents = {}      # quest_id -> [quest_ids it needs]
+        self.children = {}     # quest_id -> [quest_ids that need it]
+        self.missing = {}      # quest_id -> quest it needs that is not in the data
+
+        for quest_id, quest in quest_data_dict.items():
+            parents = self.parents[quest_id] = []
+            for needed in game_data.requirement_quests(quest_requirement(quest)):
+                if needed not in quest_data_dict:
+                    self.missing.setdefault(quest_id, needed)
+                else:
+                    parents.append(needed)
+                    self.children.setdefault(needed, []).append(quest_id)
+
+        self.order = self._topological_order()
+        self.position = {quest_id: position for position, quest_id in enumerate(self.order)}
+        self.depth = {}
+        for quest_id in self.order:
+            parents = self.parents[quest_id]
+            self.depth[quest_id] = 1 + max(self.depth[p] for p in parents) if parents else 0
+
+        # Depth-first numbering (forests only): the quests unlocked by X are
+        # the ones numbered after X up to the end of X's subtree
+        self.forest = all(len(parents) <= 1 for parents in self.parents.values())
+        self._preorder = []
+        self._start = {}
+        self._end = {}
+        if self.forest:
+            for root in (q for q in quest_data_dict if not self.parents[q]):
+                self._number_subtree(root)
+
+        self._chains = {}
+
+    def _topological_order(self):
+        """
+        Order quests so every needed quest comes before the quests needing it
+
+        Raises: InvalidDataFormatError if the requirements form a cycle
+        """
+        waiting = {q: len(parents) for q, parents in self.parents.items()}
+        queue = collections.deque(q for q, count in waiting.items() if count == 0)
+        order = []
+        while queue:
+            quest_id = queue.popleft()
+            order.append(quest_id)
+            for child in self.children.get(quest_id, ()):
+                waiting[child] -= 1
+                if waiting[child] == 0:
+                    queue.append(child)
+
+        if len(order) < self.size:
+            # Every quest left over needs another left-over quest; walk up to find a cycle
+            placed = set(order)
+            current = next(q for q in self.parents if q not in placed)
+            seen = []
+            while current not in seen:
+                seen.append(current)
+                current = next(p for p in self.parents[current] if p not in placed)
+            cycle = seen[seen.index(current):] + [current]
+            raise InvalidDataFormatError(
+                "quest data", f"Quest requirements form a cycle: {' -> '.join(reversed(cycle))}."
+            )
+        return order
+
+    def _number_subtree(self, root):
+        stack = [(root, False)]
+        while stack:
+            quest_id, finished = stack.pop()
+            if finished:
+                self._end[quest_id] = len(self._preorder)
+                continue
+            self._start[quest_id] = len(self._preorder)
+            self._preorder.append(quest_id)
+            stack.append((quest_id, True))
+            for child in reversed(self.children.get(quest_id, ())):
+                stack.append((child, False))
+
+    def chain(self, quest_id):
+        """
+        Every quest needed (directly or indirectly) before quest_id, earliest
+        first, ending with quest_id
+
+        Raises: QuestNotFoundError if the quest (or a quest it needs) is missing
+        """
+        if quest_id not in self.parents:
+            raise QuestNotFoundError(quest_id)
+
+        chain = self._chains.get(quest_id)
+        if chain is None and self.forest:
+            # Walk up to the nearest memoized ancestor and extend its chain
+            path = []
+            current = quest_id
+            while current is not None and current not in self._chains:
+                if current in self.missing:
+                    raise QuestNotFoundError(self.missing[current])
+                path.append(current)
+                current = self.parents[current][0] if self.parents[current] else None
+            chain = self._chains[current] if current is not None else ()
+            chain = chain + tuple(reversed(path))
+            self._chains[quest_id] = chain
+        elif chain is None:
+            needed = set()
+            stack = [quest_id]
+            while stack:
+                current = stack.pop()
+                if current in self.missing:
+                    raise QuestNotFoundError(self.missing[current])
+                for parent in self.parents[current]:
+                    if parent not in needed:
+                        needed.add(parent)
+                        stack.append(parent)
+            chain = tuple(sorted(needed, key=self.position.__getitem__)) + (quest_id,)
+            self._chains[quest_id] = chain
+        return list(chain)
+
+    def unlocked_by(self, quest_id):
+        """
+        All quests that (directly or indirectly) need quest_id
+
+        Returns: List of quest IDs, needed quests before the quests needing them
+        Raises: QuestNotFoundError if the quest does not exist
+        """
+        if quest_id not in self.parents:
+            raise QuestNotFoundError(quest_id)
+        if self.forest:
+            return self._preorder[self._start[quest_id] + 1:self._end[quest_id]]
+
+        found = set()
+        stack = [quest_id]
+        while stack:
+            for child in self.children.get(stack.pop(), ()):
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        return sorted(found, key=self.position.__getitem__)
+
+# Quest graphs by quest data dictionary (most recently used last)
+_quest_graphs = collections.OrderedDict()
+
+def get_quest_graph(quest_data_dict):
+    """
+    Get the QuestGraph for a quest data dictionary
+
+    The graph is built on first use and rebuilt if quests were added to or
+    removed from the dictionary (see refresh_quest_data for other edits).
+
+    Raises: InvalidDataFormatError if the prerequisites form a cycle
+    """
+    return _cached_for(_quest_graphs, quest_data_dict, QuestGraph)
+
+# ============================================================================
+# QUEST PLANNER
+# ============================================================================
+
+# Cached plans kept per planner before the cache is cleared
+PLAN_CACHE_SIZE = 4096
+
+class QuestPlanner:
+    """
+    Finds the shortest quest sequence that unlocks and completes a target
+
+    A quest is reached by completing what its requirements (prerequisite,
+    REQUIRES) name. For ANY/OR choices the cheapest options are picked:
+    fewest quests, then the lowest level the route needs, which is a
+    greedy choice (options that share quests are not combined). The chosen
+    quests are ordered prerequisites first, lowest required level first,
+    and the character's XP is simulated along the route to estimate how
+    much XP beyond the quest rewards (and which level) it takes.
+
+    Routes only change when the character completes one of the quests
+    the target depends on, or passes one of the level thresholds in its
+    requirements, so they are cached per (target, level bucket, completed
+    quests among the target's dependencies).
+    """
+
+    def __init__(self, quest_data_dict):
+        self.quest_data = quest_data_dict
+        self.size = len(quest_data_dict)
+        self.index = get_quest_index(quest_data_dict)
+        self._requirements = {}  # quest_id -> (requirement tree, quest IDs it names)
+        self._scopes = {}   # target -> (dependency bitmask, sorted level thresholds)
+        self._plans = {}    # (target, level bucket, completed dependencies) -> route
+        self._thresholds = None  # every level threshold in the quest data, sorted
+        self._needs = (None, {}) # (global level bucket, completed bitmask) -> per-quest plans
+
+    def _requirement(self, quest_id):
+        """A quest's full requirement tree and the quests it names (computed once)"""
+        requirement = self._requirements.get(quest_id)
+        if requirement is None:
+            tree = quest_requirement(self.quest_data[quest_id])
+            requirement = (tree, game_data.requirement_quests(tree))
+            self._requirements[quest_id] = requirement
+        return requirement
+
+    def _scope(self, target):
+        """Bitmask of the quests a target depends on, and every level threshold involved"""
+        scope = self._scopes.get(target)
+        if scope is None:
+            mask = 0
+            thresholds = set()
+            stack = [target]
+            seen = set()
+            while stack:
+                quest_id = stack.pop()
+                if quest_id in seen or quest_id not in self.quest_data:
+                    continue
+                seen.add(quest_id)
+                mask |= self.index.bits[quest_id]
+                tree, dependencies = self._requirement(quest_id)
+                thresholds.update(_requirement_levels(tree))
+                stack.extend(dependencies)
+            scope = (mask, sorted(thresholds))
+            self._scopes[target] = scope
+        return scope
+
+    def route(self, target, level, completed_mask):
+        """
+        Quest route to a target for a character at `level` with these quests done
+
+        Returns: Tuple of (quest_id, unlock level) pairs in the order to do
+                 them, ending with the target
+        Raises:
+            QuestNotFoundError if the target doesn't exist
+            QuestRequirementsNotMetError if no route exists (missing quests
+            or requirement cycles)
+        """
+        if target not in self.quest_data:
+            raise QuestNotFoundError(target)
+        mask, thresholds = self._scope(target)
+        key = (target, bisect.bisect_right(thresholds, level), completed_mask & mask)
+        route = self._plans.get(key)
+        if route is None:
+            route = self._plan(target, level, completed_mask)
+            if len(self._plans) >= PLAN_CACHE_SIZE:
+                self._plans.clear()
+            self._plans[key] = route
+        return route
+
+    def _plan(self, target, level, completed_mask):
+        bits = self.index.bits
+        if self._thresholds is None:
+            self._thresholds = sorted({
+                threshold for quest_id in self.quest_data
+                for threshold in _requirement_levels(self._requirement(quest_id)[0])
+            })
+
+        # quest_id -> (bitmask of quests needed, peak level, own unlock level, direct deps),
+        # or None if the quest cannot be reached. Per-quest plans hold for any target
+        # as long as the level bucket and completed quests are the same, so the last
+        # set is kept for the next target (e.g. a player planning several quests).
+        context = (bisect.bisect_right(self._thresholds, level), completed_mask)
+        if self._needs[0] != context:
+            self._needs = (context, {})
+        plans = self._needs[1]
+
+        def shortfall(peak):
+            return max(peak - level, 0)
+
+        def evaluate(node):
+            """Cheapest way to satisfy a requirement tree: (quests, peak, own level, deps)"""
+            kind = node[0]
+            if kind == 'level':
+                return (0, node[1], node[1], ())
+            if kind == 'quest':
+                quest_id = node[1]
+                if quest_id in bits and completed_mask & bits[quest_id]:
+                    return (0, 0, 0, ())
+                plan = need(quest_id)
+                if plan is None:
+                    return None
+                return (plan[0], plan[1], 0, (quest_id,))
+
+            count, children = node[1], node[2]
+            options = [option for option in (evaluate(child) for child in children) if option]
+            if len(options) < count:
+                return None
+            if count < len(options):
+                options.sort(key=lambda option: (option[0].bit_count(), shortfall(option[1])))
+                options = options[:count]
+            quests = 0
+            for option in options:
+                quests |= option[0]
+            return (
+                quests,
+                max(option[1] for option in options),
+                max(option[2] for option in options),
+                tuple(dep for option in options for dep in option[3]),
+            )
+
+        def need(quest_id):
+            if quest_id in plans:
+                return plans[quest_id]
+            if quest_id not in self.quest_data:
+                return None
+            option = evaluate(self._requirement(quest_id)[0])
+            plans[quest_id] = None if option is None else (
+                option[0] | bits[quest_id], option[1], option[2], option[3]
+            )
+            return plans[quest_id]
+
+        # Plan dependencies before the quests needing them, so need() never recurses
+        for quest_id in self._dependency_order(target):
+            need(quest_id)
+        plan = need(target)
+        if plan is None:
+            raise QuestRequirementsNotMetError(target, "no quest route reaches it")
+
+        # Order: prerequisites first, then lowest unlock level, then quest data order
+        chosen = {self.index.quest_ids[position] for position in _set_bits(plan[0])}
+        waiting = {quest_id: 0 for quest_id in chosen}
+        unlocks = {}
+        for quest_id in chosen:
+            for dep in plans[quest_id][3]:
+                if dep in chosen:
+                    waiting[quest_id] += 1
+                    unlocks.setdefault(dep, []).append(quest_id)
+
+        def heap_entry(quest_id):
+            return (plans[quest_id][2], self.index.position[quest_id], quest_id)
+
+        ready = [heap_entry(q) for q, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        route = []
+        while ready:
+            unlock_level, position, quest_id = heapq.heappop(ready)
+            route.append((quest_id, unlock_level))
+            for dependent in unlocks.get(quest_id, ()):
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, heap_entry(dependent))
+        return tuple(route)
+
+    def _dependency_order(self, target):
+        """
+        The quests a target depends on, each after the quests it names (iterative DFS)
+
+        Raises: QuestRequirementsNotMetError if the requirements form a cycle
+        """
+        order = []
+        visited = set()
+        on_path = set()
+        stack = [(target, False)]
+        while stack:
+            quest_id, finished = stack.pop()
+            if finished:
+                on_path.discard(quest_id)
+                order.append(quest_id)
+                continue
+            if quest_id in on_path:
+                raise QuestRequirementsNotMetError(target, f"its requirements loop back to '{quest_id}'")
+            if quest_id in visited or quest_id not in self.quest_data:
+                continue
+            visited.add(quest_id)
+            on_path.add(quest_id)
+            stack.append((quest_id, True))
+            for dependency in self._requirement(quest_id)[1]:
+                stack.append((dependency, False))
+        return order
+
+def _requirement_levels(node):
+    """Every LEVEL threshold in a requirement tree"""
+    if node[0] == 'level':
+        return [node[1]]
+    if node[0] == 'quest':
+        return []
+    return [level for child in node[2] for level in _requirement_levels(child)]
+
+# Planners by quest data dictionary (most recently used last)
+_quest_planners = collections.OrderedDict()
+
+def get_quest_planner(quest_data_dict):
+    """
+    Get the QuestPlanner for a quest data dictionary
+
+    The planner (and its cached routes) is rebuilt if quests were added to
+    or removed from the dictionary (see refresh_quest_data for other edits).
+    """
+    return _cached_for(_quest_planners, quest_data_dict, QuestPlanner)
+
+def plan_quest_route(character, target_quest_id, quest_data_dict):
+    """
+    Plan the fastest way for a character to unlock and complete a quest
+    
+    Returns: Dictionary with:
+        'quests': Quest IDs to complete, in order, ending with the target
+        'quest_xp': XP the route's quest rewards give
+        'extra_xp': XP needed from other sources (e.g. combat) to meet
+                    the route's level requirements
+        'final_level': Estimated level after completing the route
+    Raises:
+        QuestNotFoundError if the quest doesn't exist
+        QuestAlreadyCompletedError if the quest is already completed
+        QuestRequirementsNotMetError if no route reaches the quest
+    """
+    if target_quest_id in _completed(character, quest_data_dict):
+        raise QuestAlreadyCompletedError(target_quest_id)
+
+    planner = get_quest_planner(quest_data_dict)
+    completed_mask = planner.index.completed_mask(_completed(character, quest_data_dict))
+    route = planner.route(target_quest_id, character['level'], completed_mask)
+
+    # Walk the route with the level up rule (level = experience // 100 + 1)
+    level = character['level']
+    experience = character['experience']
+    quest_xp = 0
+    extra_xp = 0
+    for quest_id, unlock_level in route:
+        needed = max(unlock_level, quest_data_dict[quest_id]['required_level'])
+        if level < needed:
+            grind = max((needed - 1) * 100 - experience, 0)
+            extra_xp += grind
+            experience += grind
+            level = needed
+        reward = quest_data_dict[quest_id]['reward_xp']
+        quest_xp += reward
+        experience += reward
+        level = max(level, experience // 100 + 1)
+
+    return {
+        'quests': [quest_id for quest_id, unlock_level in route],
+        'quest_xp': quest_xp,
+        'extra_xp': extra_xp,
+        'final_level': level
+    }
+
+def recommend_quests(character, quest_data_dict, count=3):
+    """
+    Recommend the available quests with the best XP rewards
+    
+    Returns: List of up to `count` quest dictionaries, best first
+             (ties go to the lower required level)
+    """
+    return heapq.nlargest(
+        count,
+        get_available_quests(character, quest_data_dict),
+        key=lambda quest: (quest['reward_xp'], -quest['required_level'])
+    )
+
+# ============================================================================
+# QUEST LEVEL INDEX
+# ============================================================================
+
+class QuestLevelIndex:
+    """
+    Quest IDs kept sorted by (required_level, quest_id)
+
+    A parallel list of levels makes a level-range query two bisects plus
+    the size of the result. update() only moves quests that were added,
+    removed or changed level, so reloading quest data does not re-sort
+    everything (unless a large share of the quests changed).
+    """
+
+    def __init__(self, quest_data_dict=None):
+        self.source = None     # quest data dictionary last indexed
+        self.size = 0
+        self._levels = {}      # quest_id -> required_level
+        self._keys = []        # sorted (required_level, quest_id)
+        self._key_levels = []  # parallel list of levels for bisect
+        if quest_data_dict:
+            self.update(quest_data_dict)
+
+    def _insert(self, quest_id, level):
+        key = (level, quest_id)
+        index = bisect.bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._key_levels.insert(index, level)
+        self._levels[quest_id] = level
+
+    def _discard(self, quest_id):
+        key = (self._levels.pop(quest_id), quest_id)
+        index = bisect.bisect_left(self._keys, key)
+        del self._keys[index]
+        del self._key_levels[index]
+
+    def update(self, quest_data_dict):
+        """
+        Bring the index in line with new quest data
+
+        Args:
+            quest_data_dict: Dictionary of all quest data (quest_id -> data)
+
+        Returns: Number of quests added, moved or removed
+        """
+        removed = [q for q in self._levels if q not in quest_data_dict]
+        moved = [
+            (quest_id, quest['required_level']) for quest_id, quest in quest_data_dict.items()
+            if self._levels.get(quest_id) != quest['required_level']
+        ]
+        changed = len(removed) + len(moved)
+
+        if changed > len(self._keys) // 4:
+            # Many changes (e.g. the first load): one sort beats many inserts
+            self._levels = {q_id: quest['required_level'] for q_id, quest in quest_data_dict.items()}
+            self._keys = sorted((level, q_id) for q_id, level in self._levels.items())
+            self._key_levels = [level for level, q_id in self._keys]
+        else:
+            for quest_id in removed:
+                self._discard(quest_id)
+            for quest_id, level in moved:
+                if quest_id in self._levels:
+                    self._discard(quest_id)
+                self._insert(quest_id, level)
+
+        self.source = quest_data_dict
+        self.size = len(quest_data_dict)
+        return changed
+
+    def between(self, min_level, max_level):
+        """Quest IDs with min_level <= required_level <= max_level, lowest level first"""
+        start = bisect.bisect_left(self._key_levels, min_level)
+        end = bisect.bisect_right(self._key_levels, max_level)
+        return [quest_id for level, quest_id in self._keys[start:end]]
+
+    def between_many(self, ranges):
+        """
+        Quest IDs for several level ranges at once
+
+        Args:
+            ranges: Iterable of (min_level, max_level) pairs
+
+        Returns: List with one list of quest IDs per range
+        """
+        return [self.between(min_level, max_level) for min_level, max_level in ranges]
+
+# The level index for the quest data last queried (or loaded by main.py)
+quest_level_index = QuestLevelIndex()
+
+def get_quest_level_index(quest_data_dict):
+    """
+    Get the level index, brought up to date with quest_data_dict
+
+    Switching to another quest data dictionary (e.g. after a reload)
+    updates the index incrementally rather than rebuilding it. Only that
+    one dictionary is referenced; see refresh_quest_data for level edits.
+    """
+    if quest_level_index.source is not quest_data_dict or quest_level_index.size != len(quest_data_dict):
+        quest_level_index.update(quest_data_dict)
+    return quest_level_index
+
+def refresh_quest_data(quest_data_dict):
+    """
+    Bring everything derived from a quest data dictionary up to date after editing it
+
+    The availability index, quest graph, planner and level index notice
+    quests being added or removed, but not edits inside a quest (e.g. a
+    changed required_level, prerequisite or requires). Call this after
+    such edits. accept_quest and can_accept_quest read the quest data
+    directly and are always up to date.
+    """
+    for registry in (_quest_indexes, _quest_graphs, _quest_planners):
+        registry.pop(id(quest_data_dict), None)
+    if quest_level_index.source is quest_data_dict:
+        quest_level_index.update(quest_data_dict)
+
+# ============================================================================
+# BATCH ELIGIBILITY
+# ============================================================================
+
+class QuestColumns:
+    """
+    Columnar quest view of many characters, for batch eligibility checks
+
+    Holds one level per character plus each character's completed and
+    active quests as bitsets over a quest index's numbering. With NumPy
+    the bitsets are packed into (characters x bytes) uint8 arrays, so a
+    quest's column of bits is one strided read and a requirement is
+    evaluated for every character at once; without NumPy they are lists of
+    int bitmasks checked one character at a time.
+    """
+
+    def __init__(self, index, levels, completed, active=None):
+        """
+        Create a view from columns
+
+        Args:
+            index: QuestAvailabilityIndex giving the quest numbering
+            levels: One level per character (array or list)
+            completed: Completed-quest bitsets: a packed uint8 array
+                       (characters x bytes, little-endian bit order) or a
+                       list of int bitmasks
+            active: Active-quest bitsets in the same form (default: none)
+        """
+        self.index = index
+        self.size = len(levels)
+        self.levels = np.asarray(levels, dtype=np.int64) if np is not None else list(levels)
+        self.completed = self._pack(completed)
+        self.active = self._pack(active if active is not None else [0] * self.size)
+
+    def _pack(self, bitsets):
+        """Bring bitsets into this view's form (packed array with NumPy, int list without)"""
+        if np is None:
+            return list(bitsets)
+        if isinstance(bitsets, np.ndarray):
+            return bitsets
+        width = (len(self.index.quest_ids) + 7) // 8
+        packed = b"".join(mask.to_bytes(width, "little") for mask in bitsets)
+        return np.frombuffer(packed, dtype=np.uint8).reshape(len(bitsets), width)
+
+    @classmethod
+    def from_characters(cls, characters, quest_data_dict):
+        """
+        Build a view from character dictionaries (or a CharacterStore)
+
+        Returns: QuestColumns over get_quest_index(quest_data_dict)
+        """
+        index = get_quest_index(quest_data_dict)
+        if isinstance(characters, character_manager.CharacterStore):
+            levels = characters.level
+            quest_lists = characters.extras
+        else:
+            levels = [char['level'] for char in characters]
+            quest_lists = characters
+        completed = [index.completed_mask(_completed(char, quest_data_dict)) for char in quest_lists]
+        active = [index.completed_mask(_active(char, quest_data_dict)) for char in quest_lists]
+        return cls(index, levels, completed, active)
+
+    def __len__(self):
+        return self.size
+
+    def _bits(self, bitsets, quest_id):
+        """One quest's bit for every character (0/1 uint8 array)"""
+        position = self.index.position[quest_id]
+        return (bitsets[:, position >> 3] >> (position & 7)) & 1
+
+    def _met(self, node):
+        """
+        Vectorized requirement check: boolean array, True where the
+        character meets the requirement tree at their current level
+        """
+        kind = node[0]
+        if kind == 'level':
+            return self.levels >= node[1]
+        if kind == 'quest':
+            if node[1] not in self.index.position:
+                return np.zeros(self.size, dtype=bool)
+            return self._bits(self.completed, node[1]).view(bool)
+
+        count, children = node[1], node[2]
+        met = [self._met(child) for child in children]
+        if count == len(children):
+            return np.logical_and.reduce(met)
+        if count == 1:
+            return np.logical_or.reduce(met)
+        done = np.zeros(self.size, dtype=np.uint16)
+        for child_met in met:
+            done += child_met
+        return done >= count
+
+    def eligible(self, quest_id):
+        """
+        Vectorized can_accept_quest for every character
+
+        Returns: Boolean array (or list) that is True where the character
+                 can accept the quest
+        Raises: QuestNotFoundError if the quest is not in the quest data
+        """
+        if quest_id not in self.index.position:
+            raise QuestNotFoundError(quest_id)
+
+        if np is None:
+            requirement = self.index.requirements[quest_id]
+            bit = self.index.bits[quest_id]
+            return [
+                requirement(completed) <= level and not (completed | active) & bit
+                for level, completed, active in zip(self.levels, self.completed, self.active)
+            ]
+
+        met = self._met(quest_requirement(self.index.quest_data[quest_id]))
+        taken = self._bits(self.completed, quest_id) | self._bits(self.active, quest_id)
+        return met & (taken == 0)
+
+def get_eligibility_masks(characters, quest_ids, quest_data_dict):
+    """
+    Check many characters against one or more quests at once
+    
+    Args:
+        characters: QuestColumns, CharacterStore or list of characters
+        quest_ids: Quest ID or list of quest IDs
+        quest_data_dict: Dictionary of all quest data
+    
+    Returns: Dictionary of quest_id -> boolean array (or list) with one
+             entry per character, True where can_accept_quest would be
+    Raises: QuestNotFoundError if a quest does not exist
+    """
+    if not isinstance(characters, QuestColumns):
+        characters = QuestColumns.from_characters(characters, quest_data_dict)
+    if isinstance(quest_ids, str):
+        quest_ids = [quest_ids]
+    return {quest_id: characters.eligible(quest_id) for quest_id in quest_ids}
 
 # ============================================================================
 # QUEST STATISTICS
 # ============================================================================
 
+def _quest_stats_in_step(character, completed):
+    """
+    A character's quest statistic counters, if they still match its completed quests
+
+    The runtime state records the completed QuestLog and its version each
+    time the counters are written. Without a record (e.g. just after
+    loading) saved counters are trusted if the log is unchanged since it
+    was created and the quest count matches.
+
+    Returns: (quests_completed, quest_xp_earned, quest_gold_earned), or
+             None if the counters need rebuilding
+    """
+    counters = tuple(character.get(key, 0) for key in character_manager.QUEST_STAT_KEYS)
+    synced = character_manager.get_runtime_state(character).get('quest_stats')
+    if synced is None:
+        in_step = completed.version == 0 and counters[0] == len(completed)
+    else:
+        in_step = synced[0] is completed and synced[1:] == (completed.version, counters)
+    return counters if in_step else None
+
+def _set_quest_stats(character, completed, counters):
+    """Write all the quest statistic counters and record what they match"""
+    for key, value in zip(character_manager.QUEST_STAT_KEYS, counters):
+        character[key] = value
+    character_manager.get_runtime_state(character)['quest_stats'] = (completed, completed.version, counters)
+
+def get_quest_stats(character, quest_data_dict):
+    """
+    Get a character's running quest statistics
+    
+    The counters live in the character (quests_completed, quest_xp_earned,
+    quest_gold_earned; see character_manager.QUEST_STAT_KEYS), are updated
+    by complete_quest and are saved with the character, so reading them is
+    O(1). If they are missing (e.g. an older save), were edited, or the
+    completed quests changed some other way (even without changing their
+    number), they are rebuilt from the completed quests. Completed quests
+    that are no longer in quest_data_dict count but earn no rewards.
+    
+    Returns: Dictionary of the QUEST_STAT_KEYS counters
+    """
+    completed = _completed(character, quest_data_dict)
+    counters = _quest_stats_in_step(character, completed)
+    if counters is None:
+        xp = gold = 0
+        for quest_id in completed:
+            quest = quest_data_dict.get(quest_id)
+            if quest is not None:
+                xp += quest['reward_xp']
+                gold += quest['reward_gold']
+        counters = (len(completed), xp, gold)
+    _set_quest_stats(character, completed, counters)
+    return dict(zip(character_manager.QUEST_STAT_KEYS, counters))
+
+def get_quest_leaderboard(characters, quest_data_dict, stat='quest_xp_earned', count=10):
+    """
+    Rank characters by one of their running quest statistics
+    
+    Args:
+        characters: List of character dictionaries
+        stat: One of character_manager.QUEST_STAT_KEYS
+        count: Number of places to return
+    
+    Returns: List of (character name, value) pairs, highest first
+    """
+    ranked = heapq.nlargest(count, characters, key=lambda char: get_quest_stats(char, quest_data_dict)[stat])
+    return [(char['name'], char[stat]) for char in ranked]
+
 def get_quest_completion_percentage(character, quest_data_dict):
     """
     Calculate what percentage of all quests have been completed
@@ -277,7 +1799,7 @@ def get_quest_completion_percentage(character, quest_data_dict):
     # completed_quests = len(character['completed_quests'])
     # percentage = (completed / total) * 100
     total = len(quest_data_dict)
-    completed = len(character['completed_quests'])
+    completed = get_quest_stats(character, quest_data_dict)['quests_completed']
     if total == 0:
         return 0.0
     return (completed / total) * 100
@@ -291,29 +1813,37 @@ def get_total_quest_rewards_earned(character, quest_data_dict):
     """
     # TODO: Implement reward calculation
     # Sum up reward_xp and reward_gold for all completed quests
-    total_xp = 0
-    total_gold = 0
-
-    for q_id in character['completed_quests']:
-        quest = quest_data_dict[q_id]
-        total_xp += quest['reward_xp']
-        total_gold += quest['reward_gold']
-
+    # Read from the running counters (see get_quest_stats)
+    stats = get_quest_stats(character, quest_data_dict)
     return {
-        'total_xp': total_xp,
-        'total_gold': total_gold
+        'total_xp': stats['quest_xp_earned'],
+        'total_gold': stats['quest_gold_earned']
     }
 
 def get_quests_by_level(quest_data_dict, min_level, max_level):
     """
     Get all quests within a level range
     
-    Returns: List of quest dictionaries
+    Returns: List of quest dictionaries, lowest required level first
     """
     # TODO: Implement level filtering
+    # Two bisects on the level index instead of a scan (see QuestLevelIndex)
+    index = get_quest_level_index(quest_data_dict)
+    return [quest_data_dict[q_id] for q_id in index.between(min_level, max_level)]
+
+def get_quests_by_level_ranges(quest_data_dict, level_ranges):
+    """
+    Get the quests in each of several level ranges
+    
+    Args:
+        level_ranges: Iterable of (min_level, max_level) pairs
+    
+    Returns: List with one list of quest dictionaries per range
+    """
+    index = get_quest_level_index(quest_data_dict)
     return [
-        q_data for q_data in quest_data_dict.values()
-        if min_level <= q_data['required_level'] <= max_level
+        [quest_data_dict[q_id] for q_id in quest_ids]
+        for quest_ids in index.between_many(level_ranges)
     ]
 
 # ============================================================================
@@ -332,18 +1862,37 @@ def display_quest_info(quest_data):
     # ... etc
     print(f"Required Level: {quest_data['required_level']}")
     print(f"Prerequisite: {quest_data['prerequisite']}")
+    if 'requires' in quest_data:
+        print(f"Requires: {game_data.format_requirement(quest_data['requires'])}")
     print(f"Rewards → XP: {quest_data['reward_xp']}, Gold: {quest_data['reward_gold']}")
 
-def display_quest_list(quest_list):
+def display_quest_list(quest_list, character=None):
     """
     Display a list of quests in summary format
     
     Shows: Title, Required Level, Rewards
+    
+    Args:
+        quest_list: List of quest dictionaries
+        character: Optional character the list was built for; the text is
+                   then cached until the character or the list changes
     """
     # TODO: Implement quest list display
-    print("\n--- Quest List ---")
+    if character is None:
+        print(_render_quest_list(quest_list))
+        return
+    
+    print(character_manager.cached_render(
+        character, "quest_list", tuple(quest_list),
+        lambda: _render_quest_list(quest_list)
+    ))
+
+def _render_quest_list(quest_list):
+    """Build the display_quest_list text"""
+    lines = ["\n--- Quest List ---"]
     for q in quest_list:
-        print(f"{q['title']} (Lvl {q['required_level']}) - XP: {q['reward_xp']} | Gold: {q['reward_gold']}")
+        lines.append(f"{q['title']} (Lvl {q['required_level']}) - XP: {q['reward_xp']} | Gold: {q['reward_gold']}")
+    return "\n".join(lines)
 
 def display_character_quest_progress(character, quest_data_dict):
     """
@@ -357,8 +1906,8 @@ def display_character_quest_progress(character, quest_data_dict):
     """
     # TODO: Implement progress display
     print("\n=== QUEST PROGRESS ===")
-    print(f"Active Quests: {len(character['active_quests'])}")
-    print(f"Completed Quests: {len(character['completed_quests'])}")
+    print(f"Active Quests: {len(_active(character, quest_data_dict))}")
+    print(f"Completed Quests: {len(_completed(character, quest_data_dict))}")
     print(f"Completion: {get_quest_completion_percentage(character, quest_data_dict):.2f}%")
 
     rewards = get_total_quest_rewards_earned(character, quest_data_dict)
@@ -373,18 +1922,29 @@ def validate_quest_prerequisites(quest_data_dict):
     """
     Validate that all quest prerequisites exist
     
-    Checks that every prerequisite (that's not "NONE") refers to a real quest
+    Checks that every prerequisite (that's not "NONE") and every quest named
+    in a REQUIRES expression refers to a real quest
+    and that the prerequisites and REQUIRES expressions do not form a cycle
     
     Returns: True if all valid
-    Raises: QuestNotFoundError if invalid prerequisite found
+    Raises:
+        QuestNotFoundError if invalid prerequisite found
+        InvalidDataFormatError if the requirements form a cycle
     """
     # TODO: Implement prerequisite validation
     # Check each quest's prerequisite
     # Ensure prerequisite exists in quest_data_dict
     for q_id, q_data in quest_data_dict.items():
-        prereq = q_data['prerequisite']
-        if prereq != "NONE" and prereq not in quest_data_dict:
-            raise QuestNotFoundError(f"Quest '{q_id}' has invalid prerequisite '{prereq}'.")
+        if 'requires' in q_data:
+            for required in game_data.requirement_quests(q_data['requires']):
+                if required not in quest_data_dict:
+                    raise QuestNotFoundError(f"Quest '{q_id}' requires unknown quest '{required}'.")
+
+    # Built fresh rather than cached, so in-place edits are validated too
+    graph = QuestGraph(quest_data_dict)
+    if graph.missing:
+        q_id, prereq = next(iter(graph.missing.items()))
+        raise QuestNotFoundError(f"Quest '{q_id}' has invalid prerequisite '{prereq}'.")
     return True
 
 
@@ -0,0 +1,147 @@
+"""
+Test Character Batch Operations
+Tests that batch character operations match the single-character functions
+"""
+
+import gc
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import character_manager
+from custom_exceptions import InvalidSaveDataError
+
+def make_party():
+    """Create a small party of characters with mixed stats"""
+    party = [
+        character_manager.create_character("BatchA", "Warrior"),
+        character_manager.create_character("BatchB", "Mage"),
+        character_manager.create_character("BatchC", "Rogue"),
+    ]
+    party[0]['health'] = 30
+    party[1]['experience'] = 90
+    party[2]['health'] = 0
+    return party
+
+# ============================================================================
+# BATCH OPERATION TESTS
+# ============================================================================
+
+def test_heal_all_matches_heal_character():
+    """Test that heal_all heals like heal_character"""
+    batch = make_party()
+    single = make_party()
+
+    healed = character_manager.heal_all(batch, 50)
+    expected = [character_manager.heal_character(char, 50) for char in single]
+
+    assert healed == expected
+    assert [c['health'] for c in batch] == [c['health'] for c in single]
+
+def test_grant_gold_all_is_all_or_nothing():
+    """Test that grant_gold_all leaves gold untouched when one result is negative"""
+    party = make_party()
+    party[1]['gold'] = 10
+
+    with pytest.raises(ValueError):
+        character_manager.grant_gold_all(party, [5, -20, 5])
+
+    assert [c['gold'] for c in party] == [100, 10, 100]
+    assert character_manager.grant_gold_all(party, 25) == [125, 35, 125]
+
+def test_grant_xp_all_matches_gain_experience():
+    """Test that grant_xp_all levels up like gain_experience and skips the dead"""
+    batch = make_party()
+    single = make_party()
+
+    levels = character_manager.grant_xp_all(batch, 250)
+    for char in single[:2]:
+        character_manager.gain_experience(char, 250)
+
+    assert levels == [2, 3, 0]
+    for batch_char, single_char in zip(batch[:2], single[:2]):
+        for key in ('level', 'experience', 'health', 'max_health', 'strength', 'magic'):
+            assert batch_char[key] == single_char[key]
+    assert batch[2]['experience'] == 0
+
+def test_batch_operations_do_not_keep_characters_alive():
+    """Test that runtime state is released with the characters it belongs to"""
+    before = len(character_manager._runtime_state)
+    party = [character_manager.create_character(f"Crowd{i}", "Rogue") for i in range(500)]
+    character_manager.heal_all(party, 10)
+    character_manager.grant_xp_all(party, 50)
+    assert len(character_manager._runtime_state) == before + 500
+
+    del party
+    gc.collect()
+    assert len(character_manager._runtime_state) == before
+
+# ============================================================================
+# CHARACTER STORE TESTS
+# ============================================================================
+
+def test_character_store_round_trip():
+    """Test that characters survive import into and export from a CharacterStore"""
+    party = make_party()
+    party[0]['inventory'].append('health_potion')
+
+    store = character_manager.CharacterStore.from_characters(party)
+
+    assert len(store) == 3
+    assert store.class_names == ['Warrior', 'Mage', 'Rogue']
+    assert store.to_characters() == party
+
+def test_character_store_matches_single_operations():
+    """Test that vectorized store operations match the per-character functions"""
+    party = make_party()
+    store = character_manager.CharacterStore.from_characters(party)
+
+    assert list(store.is_dead()) == [character_manager.is_character_dead(c) for c in party]
+
+    assert list(character_manager.heal_all(store, 40)) == character_manager.heal_all(party, 40)
+    assert list(character_manager.grant_xp_all(store, [10, 250, 500])) == \
+        character_manager.grant_xp_all(party, [10, 250, 500])
+    assert store.to_characters() == party
+
+    with pytest.raises(ValueError):
+        store.add_gold(-150)
+    assert list(store.gold) == [100, 100, 100]
+
+# ============================================================================
+# VALIDATOR TESTS
+# ============================================================================
+
+def test_compiled_validator_is_built_once():
+    """Test that the compiled validator is reused for the same schema"""
+    first = character_manager.compile_character_validator()
+    second = character_manager.compile_character_validator(character_manager.CHARACTER_SCHEMA)
+    assert first is second
+
+def test_validate_character_data_raises_invalid_save_data():
+    """Test that missing fields and wrong types raise InvalidSaveDataError"""
+    char = character_manager.create_character("ValidTest", "Cleric")
+    assert character_manager.validate_character_data(char) == True
+
+    char['gold'] = "lots"
+    with pytest.raises(InvalidSaveDataError):
+        character_manager.validate_character_data(char)
+
+    del char['inventory']
+    with pytest.raises(InvalidSaveDataError):
+        character_manager.validate_character_data(char)
+
+def test_validate_characters_returns_only_failures():
+    """Test that batch validation reports only the invalid characters"""
+    party = make_party()
+    party[1]['level'] = "one"
+    del party[2]['completed_quests']
+
+    failures = character_manager.validate_characters(party)
+
+    assert [index for index, error in failures] == [1, 2]
+    assert all(isinstance(error, InvalidSaveDataError) for index, error in failures)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
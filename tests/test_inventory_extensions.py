@@ -0,0 +1,564 @@
+"""
+Test Inventory Extensions
+Tests the Inventory container and the inventory features built on it
+"""
+
+import pytest
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_exceptions import *
+import character_manager
+import inventory_system
+import combat_system
+import game_data
+
+# ============================================================================
+# INVENTORY CONTAINER TESTS
+# ============================================================================
+
+def test_inventory_counts_and_membership():
+    """Test that Inventory tracks quantities like the old list inventory"""
+    char = character_manager.create_character("CounterTest", "Rogue")
+
+    for _ in range(3):
+        inventory_system.add_item_to_inventory(char, "health_potion")
+    inventory_system.add_item_to_inventory(char, "iron_sword")
+
+    assert isinstance(char['inventory'], inventory_system.Inventory)
+    assert len(char['inventory']) == 4
+    assert inventory_system.count_item(char, "health_potion") == 3
+    assert inventory_system.has_item(char, "iron_sword")
+    assert inventory_system.get_inventory_space_remaining(char) == inventory_system.MAX_INVENTORY_SIZE - 4
+
+    inventory_system.remove_item_from_inventory(char, "iron_sword")
+    assert "iron_sword" not in char['inventory']
+    with pytest.raises(ItemNotFoundError):
+        inventory_system.remove_item_from_inventory(char, "iron_sword")
+
+    assert inventory_system.clear_inventory(char) == ["health_potion"] * 3
+    assert len(char['inventory']) == 0
+
+def test_inventory_save_and_load_round_trip(tmp_path):
+    """Test that an Inventory is saved in list form and loads back"""
+    char = character_manager.create_character("InventorySave", "Mage")
+    inventory_system.add_item_to_inventory(char, "health_potion")
+    inventory_system.add_item_to_inventory(char, "health_potion")
+    inventory_system.add_item_to_inventory(char, "fire_staff")
+
+    assert character_manager.validate_character_data(char) == True
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("InventorySave", str(tmp_path))
+
+    assert inventory_system.count_item(loaded, "health_potion") == 2
+    assert inventory_system.count_item(loaded, "fire_staff") == 1
+    assert loaded['inventory'] == char['inventory']
+
+# ============================================================================
+# ITEM STACK TESTS
+# ============================================================================
+
+def test_stackable_items_share_slots():
+    """Test that copies of a stackable item share inventory slots"""
+    char = character_manager.create_character("StackTest", "Warrior")
+    char['gold'] = 1000
+    potion = {'name': 'Health Potion', 'type': 'consumable', 'effect': 'health:20', 'cost': 25}
+    elixir = {'name': 'Strength Elixir', 'type': 'consumable', 'effect': 'strength:3', 'cost': 50, 'stack_size': 5}
+
+    inventory_system.purchase_item(char, "health_potion", potion, quantity=20)
+    inventory_system.purchase_item(char, "strength_elixir", elixir, quantity=6)
+
+    assert char['gold'] == 1000 - 20 * 25 - 6 * 50
+    assert inventory_system.count_item(char, "health_potion") == 20
+    assert char['inventory'].slots_used() == 3
+    assert inventory_system.get_inventory_space_remaining(char) == inventory_system.MAX_INVENTORY_SIZE - 3
+
+    assert inventory_system.sell_item(char, "strength_elixir", elixir, quantity=2) == 50
+    assert char['inventory'].slots_used() == 2
+
+def test_non_stackable_items_fill_inventory():
+    """Test that weapons still take one slot each"""
+    char = character_manager.create_character("FullTest", "Rogue")
+    sword = {'type': 'weapon', 'effect': 'strength:5', 'cost': 0}
+
+    inventory_system.add_item_to_inventory(char, "iron_sword", inventory_system.MAX_INVENTORY_SIZE, sword)
+    with pytest.raises(InventoryFullError):
+        inventory_system.add_item_to_inventory(char, "iron_sword", 1, sword)
+
+def test_stacks_are_saved_compactly(tmp_path):
+    """Test that a stack is saved as a single entry"""
+    char = character_manager.create_character("StackSave", "Cleric")
+    inventory_system.add_item_to_inventory(char, "health_potion", 12)
+    inventory_system.add_item_to_inventory(char, "iron_sword")
+
+    assert char['inventory'].to_save_list() == ["health_potion*12", "iron_sword"]
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("StackSave", str(tmp_path))
+
+    assert inventory_system.count_item(loaded, "health_potion") == 12
+    assert inventory_system.count_item(loaded, "iron_sword") == 1
+
+def test_stack_sizes_survive_a_plain_load(tmp_path):
+    """Test that load_character alone gives stacks the slots they had"""
+    char = character_manager.create_character("StackReload", "Cleric")
+    potion = {'type': 'consumable', 'effect': 'health:20'}
+    elixir = {'type': 'consumable', 'effect': 'strength:3', 'stack_size': 5}
+    inventory_system.add_item_to_inventory(char, "health_potion", 20, potion)
+    inventory_system.add_item_to_inventory(char, "strength_elixir", 1, elixir)
+    assert char['inventory'].to_save_list() == ["health_potion*20/20", "strength_elixir*1/5"]
+
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("StackReload", str(tmp_path))
+
+    assert inventory_system.get_inventory_space_remaining(loaded) == inventory_system.MAX_INVENTORY_SIZE - 2
+    inventory_system.add_item_to_inventory(loaded, "strength_elixir", 4)
+    assert inventory_system.get_inventory(loaded).slots_used() == 2
+
+# ============================================================================
+# EQUIPMENT BONUS TESTS
+# ============================================================================
+
+def test_equipment_swaps_are_reversible():
+    """Test that swapping and unequipping restores the base stats"""
+    char = character_manager.create_character("SwapTest", "Warrior")
+    base_strength = char['strength']
+    items = {
+        'iron_sword': {'name': 'Iron Sword', 'type': 'weapon', 'effect': 'strength:5'},
+        'steel_sword': {'name': 'Steel Sword', 'type': 'weapon', 'effect': {'stat': 'strength', 'value': 10}},
+    }
+    inventory_system.add_item_to_inventory(char, "iron_sword")
+    inventory_system.add_item_to_inventory(char, "steel_sword")
+
+    inventory_system.equip_weapon(char, "iron_sword", items['iron_sword'])
+    assert char['strength'] == base_strength + 5
+    assert inventory_system.get_equipment_bonuses(char) == {'strength': 5}
+
+    inventory_system.equip_weapon(char, "steel_sword", items['steel_sword'])
+    assert char['strength'] == base_strength + 10
+    assert inventory_system.has_item(char, "iron_sword")
+    assert inventory_system.get_base_stat(char, 'strength') == base_strength
+
+    assert inventory_system.unequip_weapon(char, items) == "steel_sword"
+    assert char['strength'] == base_strength
+    assert 'equipped_weapon' not in char
+    assert inventory_system.get_equipment_bonuses(char) == {}
+
+def test_equipment_bonus_survives_save_and_load(tmp_path):
+    """Test that a reloaded character swaps and unequips without keeping old bonuses"""
+    char = character_manager.create_character("ReloadSwap", "Warrior")
+    base_strength = char['strength']
+    items = {
+        'iron_sword': {'name': 'Iron Sword', 'type': 'weapon', 'effect': 'strength:5'},
+        'steel_sword': {'name': 'Steel Sword', 'type': 'weapon', 'effect': 'strength:10'},
+    }
+    inventory_system.add_item_to_inventory(char, "iron_sword")
+    inventory_system.equip_weapon(char, "iron_sword", items['iron_sword'])
+
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("ReloadSwap", str(tmp_path))
+    assert loaded['strength'] == base_strength + 5
+    assert inventory_system.get_base_stat(loaded, 'strength') == base_strength
+
+    inventory_system.add_item_to_inventory(loaded, "steel_sword")
+    inventory_system.equip_weapon(loaded, "steel_sword", items['steel_sword'])
+    assert loaded['strength'] == base_strength + 10
+
+    inventory_system.unequip_weapon(loaded, items)
+    assert loaded['strength'] == base_strength
+    assert inventory_system.count_item(loaded, "iron_sword") == 1
+    assert inventory_system.count_item(loaded, "steel_sword") == 1
+
+def test_equipment_bonus_lines_load_in_any_order(tmp_path):
+    """Test that bonus lines load before their slot line and bad ones are rejected"""
+    lines = "NAME: Order\nCLASS: Warrior\nHEALTH: 120\nGOLD: 5\n"
+    (tmp_path / "Order_save.txt").write_text(lines + "EQUIPPED_WEAPON_BONUS: strength:5\nEQUIPPED_WEAPON: iron_sword\n")
+    loaded = character_manager.load_character("Order", str(tmp_path))
+    assert loaded['equipment']['weapon'] == {'item_id': 'iron_sword', 'stat': 'strength', 'value': 5}
+
+    for bonus in ("EQUIPPED_WEAPON_BONUS: strength\nEQUIPPED_WEAPON: iron_sword\n", "EQUIPPED_ARMOR_BONUS: max_health:5\n"):
+        (tmp_path / "Order_save.txt").write_text(lines + bonus)
+        with pytest.raises(InvalidSaveDataError):
+            character_manager.load_character("Order", str(tmp_path))
+
+def test_unequip_armor_clamps_health():
+    """Test that removing max_health armor keeps health within the new maximum"""
+    char = character_manager.create_character("ArmorTest", "Cleric")
+    armor = {'name': 'Steel Armor', 'type': 'armor', 'effect': 'max_health:25'}
+    inventory_system.add_item_to_inventory(char, "steel_armor")
+
+    inventory_system.equip_armor(char, "steel_armor", armor)
+    char['health'] = char['max_health']
+    inventory_system.unequip_armor(char, {'steel_armor': armor})
+
+    assert char['max_health'] == 100
+    assert char['health'] == 100
+
+# ============================================================================
+# BULK TRANSACTION TESTS
+# ============================================================================
+
+SHOP_ITEMS = {
+    'health_potion': {'name': 'Health Potion', 'type': 'consumable', 'effect': 'health:20', 'cost': 25},
+    'iron_sword': {'name': 'Iron Sword', 'type': 'weapon', 'effect': 'strength:5', 'cost': 100},
+}
+
+def test_purchase_items_applies_whole_basket():
+    """Test that a basket purchase updates gold once and returns a receipt"""
+    char = character_manager.create_character("BasketTest", "Warrior")
+    char['gold'] = 500
+
+    receipt = inventory_system.purchase_items(
+        char, [('health_potion', 10), ('iron_sword', 1), ('health_potion', 5)], SHOP_ITEMS
+    )
+
+    assert receipt['total_gold'] == 15 * 25 + 100
+    assert receipt['gold_after'] == char['gold'] == 500 - 475
+    assert inventory_system.count_item(char, 'health_potion') == 15
+    assert [line['quantity'] for line in receipt['items']] == [15, 1]
+
+def test_purchase_items_is_all_or_nothing():
+    """Test that a failing basket leaves the character unchanged"""
+    char = character_manager.create_character("AtomicTest", "Mage")
+
+    with pytest.raises(InsufficientResourcesError):
+        inventory_system.purchase_items(char, [('health_potion', 2), ('iron_sword', 1)], SHOP_ITEMS)
+    with pytest.raises(ItemNotFoundError):
+        inventory_system.purchase_items(char, [('health_potion', 1), ('mystery_box', 1)], SHOP_ITEMS)
+
+    assert char['gold'] == 100
+    assert len(char['inventory']) == 0
+
+def test_sell_items_checks_every_item_first():
+    """Test that a basket sale fails without changes if an item is missing"""
+    char = character_manager.create_character("SellTest", "Rogue")
+    inventory_system.add_item_to_inventory(char, 'health_potion', 4)
+
+    with pytest.raises(ItemNotFoundError):
+        inventory_system.sell_items(char, [('health_potion', 2), ('iron_sword', 1)], SHOP_ITEMS)
+    assert inventory_system.count_item(char, 'health_potion') == 4
+
+    receipt = inventory_system.sell_items(char, [('health_potion', 4)], SHOP_ITEMS)
+    assert receipt['total_gold'] == 4 * 12
+    assert char['gold'] == 100 + 48
+
+def test_single_item_transactions_reject_bad_quantities():
+    """Test that zero, negative and non-integer quantities change nothing"""
+    char = character_manager.create_character("QuantityTest", "Warrior")
+    inventory_system.add_item_to_inventory(char, 'health_potion', 2)
+
+    for quantity in (0, -5, 1.5, True):
+        with pytest.raises(ValueError):
+            inventory_system.add_item_to_inventory(char, 'health_potion', quantity)
+        with pytest.raises(ValueError):
+            inventory_system.remove_item_from_inventory(char, 'health_potion', quantity)
+        with pytest.raises(ValueError):
+            inventory_system.purchase_item(char, 'health_potion', SHOP_ITEMS['health_potion'], quantity)
+        with pytest.raises(ValueError):
+            inventory_system.sell_item(char, 'health_potion', SHOP_ITEMS['health_potion'], quantity)
+        with pytest.raises(ValueError):
+            char['inventory'].add('iron_sword', quantity)
+
+    assert char['gold'] == 100
+    assert inventory_system.count_item(char, 'health_potion') == 2
+    assert not inventory_system.has_item(char, 'iron_sword')
+
+# ============================================================================
+# SHOP CATALOG TESTS
+# ============================================================================
+
+CATALOG_ITEMS = {
+    'health_potion': {'name': 'Health Potion', 'type': 'consumable', 'effect': 'health:20', 'cost': 25},
+    'iron_sword': {'name': 'Iron Sword', 'type': 'weapon', 'effect': 'strength:5', 'cost': 100},
+    'leather_armor': {'name': 'Leather Armor', 'type': 'armor', 'effect': {'stat': 'max_health', 'value': 10}, 'cost': 80},
+    'mana_potion': {'name': 'Mana Potion', 'type': 'consumable', 'effect': 'magic:5', 'cost': 25},
+}
+
+def test_shop_catalog_sorted_views():
+    """Test that catalog views are sorted by cost and affordability uses gold"""
+    catalog = inventory_system.ShopCatalog(CATALOG_ITEMS)
+
+    assert catalog.by_cost() == ['health_potion', 'mana_potion', 'leather_armor', 'iron_sword']
+    assert catalog.by_type('consumable') == ['health_potion', 'mana_potion']
+    assert catalog.by_stat('max_health') == ['leather_armor']
+    assert catalog.affordable(24) == []
+    assert catalog.affordable(80) == ['health_potion', 'mana_potion', 'leather_armor']
+    assert catalog.affordable(1000) == catalog.by_cost()
+
+def test_shop_catalog_updates_incrementally():
+    """Test that update re-indexes only added, changed and removed items"""
+    catalog = inventory_system.ShopCatalog(CATALOG_ITEMS)
+    reloaded = dict(CATALOG_ITEMS)
+    reloaded['iron_sword'] = dict(CATALOG_ITEMS['iron_sword'], cost=10)
+    del reloaded['mana_potion']
+
+    assert catalog.update(reloaded) == 2
+    assert catalog.update(reloaded) == 0
+    assert catalog.by_cost() == ['iron_sword', 'health_potion', 'leather_armor']
+    assert catalog.by_type('consumable') == ['health_potion']
+    assert catalog.by_stat('magic') == []
+    assert 'mana_potion' not in catalog
+    assert '10 (5)' in catalog.row('iron_sword')
+
+# ============================================================================
+# ECONOMY LEDGER TESTS
+# ============================================================================
+
+def test_ledger_records_gold_and_item_movements(tmp_path):
+    """Test that shop and gold changes are recorded and replay to the character's balance"""
+    path = str(tmp_path / "economy.ledger")
+    char = character_manager.create_character("LedgerTest", "Warrior")
+    previous = character_manager.set_ledger(character_manager.EconomyLedger(path, flush_every=2))
+    try:
+        inventory_system.purchase_item(char, 'health_potion', SHOP_ITEMS['health_potion'], quantity=3)
+        inventory_system.sell_item(char, 'health_potion', SHOP_ITEMS['health_potion'])
+        character_manager.add_gold(char, 40)
+        character_manager.get_ledger().flush()
+    finally:
+        character_manager.set_ledger(previous)
+
+    records = list(character_manager.iter_ledger(path))
+    assert [record[0] for record in records] == [1, 2, 3, 4, 5]
+    assert [record[4] for record in records] == [-75, 3, -1, 12, 40]
+
+    balances = character_manager.replay_ledger(path)['LedgerTest']
+    assert balances == {'gold': char['gold'], 'items': {'health_potion': 2}}
+    assert character_manager.verify_ledger(path) == []
+    assert character_manager.verify_character_balance(char, path) == []
+
+    char['gold'] += 1000
+    assert len(character_manager.verify_character_balance(char, path)) == 1
+
+def test_ledger_continues_sequence_and_detects_gaps(tmp_path):
+    """Test that reopening a ledger continues numbering and verify finds bad balances"""
+    path = str(tmp_path / "economy.ledger")
+    with character_manager.EconomyLedger(path) as ledger:
+        ledger.record(character_manager.LEDGER_GOLD, "Hero", "", 50, 150)
+    with character_manager.EconomyLedger(path) as ledger:
+        assert ledger.sequence == 1
+        ledger.record(character_manager.LEDGER_GOLD, "Hero", "", 10, 999)
+
+    problems = character_manager.verify_ledger(path)
+    assert [sequence for sequence, problem in problems] == [2]
+
+# ============================================================================
+# CONCURRENCY TESTS
+# ============================================================================
+
+def run_threads(target, count):
+    """Run target in count threads and wait for all of them"""
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_mutations_are_not_lost():
+    """Test that concurrent item and gold updates on one character all apply"""
+    char = character_manager.create_character("ThreadTest", "Warrior")
+
+    def worker():
+        for _ in range(40):
+            inventory_system.add_item_to_inventory(char, 'health_potion', 1, SHOP_ITEMS['health_potion'])
+            character_manager.add_gold(char, 1)
+
+    run_threads(worker, 8)
+
+    assert inventory_system.count_item(char, 'health_potion') == 320
+    assert char['gold'] == 100 + 320
+
+def test_concurrent_purchases_never_overspend():
+    """Test that racing purchases cannot spend more gold than the character has"""
+    char = character_manager.create_character("RaceTest", "Rogue")
+    char['gold'] = 50
+    potion = {'name': 'Health Potion', 'type': 'consumable', 'effect': 'health:20', 'cost': 10}
+    failures = []
+
+    def worker():
+        try:
+            inventory_system.purchase_item(char, 'health_potion', potion)
+        except InsufficientResourcesError:
+            failures.append(1)
+
+    run_threads(worker, 16)
+
+    assert char['gold'] == 0
+    assert inventory_system.count_item(char, 'health_potion') == 5
+    assert len(failures) == 11
+
+# ============================================================================
+# TRADING TESTS
+# ============================================================================
+
+def test_trade_swaps_items_and_gold():
+    """Test that a trade moves items and gold in both directions"""
+    seller = character_manager.create_character("Seller", "Warrior")
+    buyer = character_manager.create_character("Buyer", "Mage")
+    inventory_system.add_item_to_inventory(seller, 'iron_sword')
+    inventory_system.add_item_to_inventory(buyer, 'health_potion', 3, SHOP_ITEMS['health_potion'])
+
+    receipt = inventory_system.execute_trade(
+        seller, buyer, {'items': [('iron_sword', 1)]},
+        {'items': [('health_potion', 2)], 'gold': 60}, SHOP_ITEMS
+    )
+
+    assert receipt['second_gave'] == {'items': {'health_potion': 2}, 'gold': 60}
+    assert inventory_system.has_item(buyer, 'iron_sword')
+    assert not inventory_system.has_item(seller, 'iron_sword')
+    assert inventory_system.count_item(seller, 'health_potion') == 2
+    assert (seller['gold'], buyer['gold']) == (160, 40)
+
+def test_failed_trade_changes_nothing():
+    """Test that a trade failing on space or ownership is fully undone"""
+    first = character_manager.create_character("FullSide", "Rogue")
+    second = character_manager.create_character("OtherSide", "Cleric")
+    sword = SHOP_ITEMS['iron_sword']
+    inventory_system.add_item_to_inventory(first, 'iron_sword', inventory_system.MAX_INVENTORY_SIZE, sword)
+    inventory_system.add_item_to_inventory(second, 'steel_sword', 2)
+
+    results = inventory_system.execute_trades([
+        (first, second, {'items': [('iron_sword', 1)]}, {'items': [('steel_sword', 2)]}),
+        (first, second, {'gold': 500}, {}),
+        (first, second, {}, {'items': [('fire_staff', 1)]}),
+    ], SHOP_ITEMS)
+
+    assert isinstance(results[0], InventoryFullError)
+    assert isinstance(results[1], InsufficientResourcesError)
+    assert isinstance(results[2], ItemNotFoundError)
+    assert inventory_system.count_item(first, 'iron_sword') == inventory_system.MAX_INVENTORY_SIZE
+    assert inventory_system.count_item(second, 'steel_sword') == 2
+    assert not inventory_system.has_item(second, 'iron_sword')
+    assert (first['gold'], second['gold']) == (100, 100)
+
+# ============================================================================
+# RENDER CACHE TESTS
+# ============================================================================
+
+def test_display_inventory_is_cached_until_a_change():
+    """Test that display_inventory reuses its text until the character changes"""
+    char = character_manager.create_character("RenderTest", "Mage")
+    inventory_system.add_item_to_inventory(char, 'health_potion', 2, SHOP_ITEMS['health_potion'])
+
+    first = inventory_system.display_inventory(char, SHOP_ITEMS)
+    assert inventory_system.display_inventory(char, SHOP_ITEMS) is first
+
+    inventory_system.add_item_to_inventory(char, 'iron_sword', 1, SHOP_ITEMS['iron_sword'])
+    second = inventory_system.display_inventory(char, SHOP_ITEMS)
+    assert second is not first
+    assert "Iron Sword" in second
+
+    assert "Health Potion" not in inventory_system.display_inventory(char, {})
+
+def test_runtime_state_is_kept_outside_the_character():
+    """Test that versions and caches leave the character dictionary untouched"""
+    char = character_manager.create_character("SideTable", "Warrior")
+    copy = character_manager.create_character("SideTable", "Warrior")
+    inventory_system.display_inventory(char, SHOP_ITEMS)
+    inventory_system.get_equipment_bonuses(char)
+    character_manager.touch_character(char)
+
+    assert char == copy
+    assert not [key for key in char if key.startswith('_')]
+    assert character_manager.get_character_version(char) == 1
+
+    character_manager.forget_character(char)
+    assert character_manager.get_character_version(char) == 0
+
+def test_display_combat_stats_redraws_after_damage(capsys):
+    """Test that combat stats are redrawn when either side takes damage"""
+    char = character_manager.create_character("CombatRender", "Warrior")
+    enemy = combat_system.create_enemy("goblin")
+
+    combat_system.display_combat_stats(char, enemy)
+    version = character_manager.get_character_version(char)
+    combat_system.warrior_power_strike(char, enemy)
+    combat_system.display_combat_stats(char, enemy)
+
+    output = capsys.readouterr().out
+    assert f"HP={enemy['health']}/{enemy['max_health']}" in output
+    assert f"HP={enemy['max_health']}/{enemy['max_health']}" in output
+    assert character_manager.get_character_version(char) == version
+
+# ============================================================================
+# EFFECT ENGINE TESTS
+# ============================================================================
+
+def test_multi_stat_and_percentage_effects():
+    """Test that an item can change several stats, including by percentage"""
+    char = character_manager.create_character("EffectTest", "Warrior")
+    char['health'] = 40
+    base_strength = char['strength']
+    inventory_system.add_item_to_inventory(char, 'hero_tonic')
+    tonic = {'type': 'consumable', 'effect': 'health:25%, strength:2'}
+
+    result = inventory_system.use_item(char, 'hero_tonic', tonic)
+
+    assert char['health'] == 40 + char['max_health'] // 4
+    assert char['strength'] == base_strength + 2
+    assert "health +30" in result and "strength +2" in result
+    assert inventory_system.compile_effects(tonic['effect']) is inventory_system.compile_effects(tonic['effect'])
+
+def test_percentage_effects_ignore_equipment_bonuses():
+    """Test that a percentage effect is taken from the stat's base value"""
+    char = character_manager.create_character("PercentBase", "Warrior")
+    char['strength'] = 20
+    sword = {'name': 'Iron Sword', 'type': 'weapon', 'effect': 'strength:20'}
+    inventory_system.add_item_to_inventory(char, 'iron_sword')
+    inventory_system.equip_weapon(char, 'iron_sword', sword)
+    inventory_system.add_item_to_inventory(char, 'giant_draught')
+
+    inventory_system.use_item(char, 'giant_draught', {'type': 'consumable', 'effect': 'strength:50%'})
+
+    assert inventory_system.get_base_stat(char, 'strength') == 30
+    assert char['strength'] == 50
+
+def test_timed_effects_expire_and_tick():
+    """Test that buffs are undone on expiry and over-time effects apply each tick"""
+    char = character_manager.create_character("TimedTest", "Mage")
+    char['health'] = 50
+    base_magic = char['magic']
+    effects = inventory_system.compile_effects('magic:10@2, health:5*3')
+
+    inventory_system.apply_effects(char, effects)
+    assert char['magic'] == base_magic + 10
+    assert char['health'] == 50
+    assert sorted(inventory_system.get_timed_effects(char)) == [('health', 'over_time', 3), ('magic', 'buff', 2)]
+
+    assert inventory_system.tick_effects(char) == 0
+    assert char['health'] == 55
+    assert inventory_system.tick_effects(char, 5) == 2
+    assert char['magic'] == base_magic
+    assert char['health'] == 65
+    assert inventory_system.get_timed_effects(char) == []
+
+def test_active_buffs_are_not_saved(tmp_path):
+    """Test that a character saved while buffed reloads with its base stats"""
+    char = character_manager.create_character("BuffSave", "Warrior")
+    base_strength = char['strength']
+    inventory_system.apply_effects(char, inventory_system.compile_effects('strength:5@3, max_health:20@3'))
+    assert char['strength'] == base_strength + 5
+    assert not [key for key in char if key.startswith('_')]
+
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("BuffSave", str(tmp_path))
+    assert loaded['strength'] == base_strength
+    assert loaded['max_health'] == loaded['health'] == 120
+
+    inventory_system.tick_effects(char, 3)
+    assert char['strength'] == base_strength
+
+def test_game_data_accepts_effect_grammar():
+    """Test that game_data keeps plain effects as dicts and validates the extended grammar"""
+    assert game_data.parse_item_block([
+        "ITEM_ID: regen_potion", "NAME: Regen Potion", "TYPE: consumable",
+        "EFFECT: health:5*4, strength:3@2", "COST: 40", "DESCRIPTION: Heals over time",
+    ])['effect'] == "health:5*4, strength:3@2"
+    with pytest.raises(InvalidDataFormatError):
+        game_data.parse_effect_terms("health:5@0")
+    with pytest.raises(InvalidItemTypeError):
+        inventory_system.compile_effects("health:lots")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
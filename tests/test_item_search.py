@@ -0,0 +1,72 @@
+"""
+Test Item Search
+Tests the inverted item search index built by game_data
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_data
+
+ITEMS = {
+    'iron_sword': {'name': 'Iron Sword', 'description': 'A sturdy iron sword that increases strength'},
+    'steel_sword': {'name': 'Steel Sword', 'description': 'A masterwork steel sword'},
+    'health_potion': {'name': 'Health Potion', 'description': 'Restores 20 health points'},
+    'leather_armor': {'name': 'Leather Armor', 'description': 'Light armor that adds health'},
+}
+
+# ============================================================================
+# SEARCH INDEX TESTS
+# ============================================================================
+
+def test_search_ranks_name_matches_first():
+    """Test that prefix queries match every word and rank name matches above descriptions"""
+    index = game_data.ItemSearchIndex(ITEMS)
+
+    assert [item_id for item_id, score in index.search("sword")] == ['iron_sword', 'steel_sword']
+    assert index.search("heal")[0][0] == 'health_potion'
+    assert [item_id for item_id, score in index.search("heal")] == ['health_potion', 'leather_armor']
+    assert [item_id for item_id, score in index.search("steel sw")] == ['steel_sword']
+    assert index.search("dragon") == []
+    assert index.search("") == []
+
+def test_search_index_updates_incrementally():
+    """Test that update re-indexes only changed items and drops stale results"""
+    index = game_data.ItemSearchIndex(ITEMS)
+    assert index.search("sword", limit=1) == [('iron_sword', 12)]
+
+    reloaded = dict(ITEMS)
+    reloaded['iron_sword'] = {'name': 'Iron Blade', 'description': 'A sturdy iron blade'}
+    del reloaded['steel_sword']
+
+    assert index.update(reloaded) == 2
+    assert index.update(reloaded) == 0
+    # Only the item ID still mentions a sword now
+    assert index.search("sword") == [('iron_sword', 4)]
+    assert [item_id for item_id, score in index.search("blade")] == ['iron_sword']
+
+def test_search_cache_is_bounded():
+    """Test that only the most recently used query results stay cached"""
+    index = game_data.ItemSearchIndex(ITEMS)
+    index.search("sword")
+    for n in range(game_data.SEARCH_CACHE_SIZE):
+        index.search("sword", limit=100 + n)
+        index.search("sword")    # keep the first query recently used
+
+    assert len(index._results) == game_data.SEARCH_CACHE_SIZE
+    assert ("sword", 10) in index._results
+    assert ("sword", 100) not in index._results
+
+def test_load_items_updates_module_index():
+    """Test that load_items keeps search_items in step with the loaded data"""
+    items = game_data.load_items()
+
+    results = game_data.search_items("potion", limit=None)
+    assert {item_id for item_id, score in results} == \
+        {item_id for item_id in items if 'potion' in item_id}
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,77 @@
+"""
+Test Loot Tables
+Tests alias-table loot sampling and the drop tables built from item data
+"""
+
+import pytest
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combat_system
+import game_data
+
+ITEMS = {
+    'health_potion': {'name': 'Health Potion', 'type': 'consumable', 'effect': 'health:20', 'cost': 25},
+    'iron_sword': {'name': 'Iron Sword', 'type': 'weapon', 'effect': 'strength:5', 'cost': 100},
+    'steel_sword': {'name': 'Steel Sword', 'type': 'weapon', 'effect': 'strength:10', 'cost': 250},
+}
+
+# ============================================================================
+# ALIAS TABLE TESTS
+# ============================================================================
+
+def test_alias_table_matches_weights():
+    """Test that the alias table gives every outcome exactly its weight's share"""
+    table = combat_system.LootTable(['a', 'b', 'c', 'd'], [1, 2, 3, 10])
+    count = len(table)
+
+    for i, expected in enumerate([1 / 16, 2 / 16, 3 / 16, 10 / 16]):
+        share = table.accept[i]
+        share += sum(1 - table.accept[j] for j in range(count) if table.alias[j] == i)
+        assert share / count == pytest.approx(expected)
+
+    with pytest.raises(ValueError):
+        combat_system.LootTable(['a'], [0])
+
+def test_batch_draws_follow_the_table():
+    """Test that batched draws are reproducible and close to the table's probabilities"""
+    table = combat_system.LootTable([None, 'health_potion'], [3, 1])
+
+    drops = table.count_drops(200000, seed=7)
+
+    assert sum(drops.values()) == 200000
+    assert drops['health_potion'] / 200000 == pytest.approx(0.25, abs=0.01)
+    assert table.count_drops(1000, seed=7) == table.count_drops(1000, seed=7)
+
+# ============================================================================
+# ENEMY LOOT TESTS
+# ============================================================================
+
+def test_loot_tables_respect_enemy_profiles():
+    """Test that each enemy only drops items within its cost limit"""
+    tables = combat_system.build_loot_tables(ITEMS)
+
+    assert tables['goblin'].outcomes == [None, 'health_potion', 'iron_sword']
+    assert tables['dragon'].outcomes == [None, 'health_potion', 'iron_sword', 'steel_sword']
+    assert tables['goblin'].probabilities[0] == pytest.approx(0.7)
+    assert tables['goblin'].probabilities[1] == pytest.approx(4 * tables['goblin'].probabilities[2])
+
+def test_victory_rewards_include_loot():
+    """Test that victory rewards roll loot when tables are given"""
+    tables = combat_system.build_loot_tables(game_data.load_items())
+    enemy = combat_system.create_enemy("dragon")
+    rng = random.Random(3)
+
+    drops = [combat_system.roll_loot(enemy, tables, rng) for _ in range(50)]
+    assert all(len(drop) <= 1 for drop in drops)
+    assert any(drops)
+
+    rewards = combat_system.get_victory_rewards(enemy, tables)
+    assert set(rewards) == {'xp', 'gold', 'loot'}
+    assert 'loot' not in combat_system.get_victory_rewards(enemy)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
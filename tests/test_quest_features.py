@@ -0,0 +1,609 @@
+"""
+Test Quest Features
+Tests quest indexing and the quest features built on it
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_exceptions import *
+import character_manager
+import game_data
+import inventory_system
+import quest_handler
+
+def make_quests():
+    """Create a small quest tree: a -> b (level 2), a -> c, c -> d (level 3)"""
+    def quest(quest_id, level, prerequisite):
+        return {
+            'quest_id': quest_id, 'title': quest_id.title(), 'description': quest_id,
+            'reward_xp': 100, 'reward_gold': 10, 'required_level': level, 'prerequisite': prerequisite
+        }
+    return {
+        'a': quest('a', 1, "NONE"),
+        'b': quest('b', 2, 'a'),
+        'c': quest('c', 1, 'a'),
+        'd': quest('d', 3, 'c'),
+        'e': quest('e', 1, "NONE"),
+    }
+
+def available_ids(character, quests):
+    return [q['quest_id'] for q in quest_handler.get_available_quests(character, quests)]
+
+# ============================================================================
+# AVAILABILITY INDEX TESTS
+# ============================================================================
+
+def test_availability_index_matches_can_accept_quest():
+    """Test that indexed availability agrees with can_accept_quest through a quest run"""
+    quests = make_quests()
+    quests['c']['reward_xp'] = 0
+    char = character_manager.create_character("IndexTest", "Warrior")
+
+    def expected():
+        return [q_id for q_id in quests if quest_handler.can_accept_quest(char, q_id, quests)]
+
+    assert available_ids(char, quests) == expected() == ['a', 'e']
+    quest_handler.accept_quest(char, 'a', quests)
+    assert available_ids(char, quests) == expected() == ['e']
+
+    # Completing 'a' grants 100 XP, levelling up to 2
+    quest_handler.complete_quest(char, 'a', quests)
+    assert available_ids(char, quests) == expected() == ['b', 'c', 'e']
+
+    # Quest events update the character's state in place instead of rebuilding it
+    state = character_manager.get_runtime_state(char)['quest_availability']
+    quest_handler.accept_quest(char, 'c', quests)
+    quest_handler.complete_quest(char, 'c', quests)
+    assert character_manager.get_runtime_state(char)['quest_availability'] is state
+    assert '_quest_availability' not in char
+    assert available_ids(char, quests) == expected() == ['b', 'e']
+
+    character_manager.gain_experience(char, 100)
+    assert available_ids(char, quests) == expected() == ['b', 'd', 'e']
+
+    quest_handler.accept_quest(char, 'd', quests)
+    quest_handler.abandon_quest(char, 'd')
+    assert available_ids(char, quests) == expected() == ['b', 'd', 'e']
+
+def test_availability_index_rebuilds_after_direct_edits():
+    """Test that editing the quest lists directly still gives correct results"""
+    quests = make_quests()
+    char = character_manager.create_character("DirectEdit", "Rogue")
+    assert available_ids(char, quests) == ['a', 'e']
+
+    char['completed_quests'].append('a')
+    assert available_ids(char, quests) == ['c', 'e']
+
+    index = quest_handler.get_quest_index(quests)
+    assert quest_handler.get_quest_index(quests) is index
+    quests['f'] = dict(quests['e'], quest_id='f')
+    assert quest_handler.get_quest_index(quests) is not index
+    assert available_ids(char, quests) == ['c', 'e', 'f']
+
+    # Same-length swap: the completed list changes but its length does not
+    char['completed_quests'].remove('a')
+    char['completed_quests'].append('e')
+    assert not quest_handler.can_accept_quest(char, 'c', quests)
+    assert quest_handler.can_accept_quest(char, 'a', quests)
+    assert available_ids(char, quests) == ['a', 'f']
+
+    char['completed_quests'] = ['a']
+    assert available_ids(char, quests) == ['c', 'e', 'f']
+
+def test_can_accept_quest_agrees_with_accept_quest_after_edits():
+    """Test that in-place quest edits are seen by both the check and the action"""
+    quests = make_quests()
+    char = character_manager.create_character("EditAgree", "Rogue")
+    quest_handler.get_quest_index(quests)
+
+    quests['e']['required_level'] = 5
+    assert not quest_handler.can_accept_quest(char, 'e', quests)
+    with pytest.raises(InsufficientLevelError):
+        quest_handler.accept_quest(char, 'e', quests)
+
+    quests['b']['required_level'] = 1
+    quests['b']['prerequisite'] = "NONE"
+    assert quest_handler.can_accept_quest(char, 'b', quests)
+    assert quest_handler.accept_quest(char, 'b', quests)
+
+def test_quest_caches_are_bounded_and_refreshable():
+    """Test that cached structures are kept for a few quest sets and can be refreshed"""
+    quest_sets = [make_quests() for _ in range(quest_handler.QUEST_CACHE_SIZE + 3)]
+    for quests in quest_sets:
+        quest_handler.get_quest_index(quests)
+        quest_handler.get_quest_graph(quests)
+    assert len(quest_handler._quest_indexes) == quest_handler.QUEST_CACHE_SIZE
+    assert len(quest_handler._quest_graphs) == quest_handler.QUEST_CACHE_SIZE
+
+    quests = quest_sets[-1]
+    char = character_manager.create_character("Refresh", "Rogue")
+    assert available_ids(char, quests) == ['a', 'e']
+    assert [q['quest_id'] for q in quest_handler.get_quests_by_level(quests, 1, 1)] == ['a', 'c', 'e']
+
+    quests['e']['required_level'] = 3
+    quests['d']['prerequisite'] = "NONE"
+    quests['d']['required_level'] = 1
+    quest_handler.refresh_quest_data(quests)
+    assert available_ids(char, quests) == ['a', 'd']
+    assert [q['quest_id'] for q in quest_handler.get_quests_by_level(quests, 1, 1)] == ['a', 'c', 'd']
+    assert quest_handler.get_quest_prerequisite_chain('d', quests) == ['d']
+
+# ============================================================================
+# QUEST LOG TESTS
+# ============================================================================
+
+def test_quest_log_behaves_like_the_old_lists():
+    """Test that quest lists become QuestLogs that keep list behaviour and order"""
+    quests = make_quests()
+    char = character_manager.create_character("LogTest", "Cleric")
+
+    quest_handler.accept_quest(char, 'e', quests)
+    quest_handler.accept_quest(char, 'a', quests)
+    assert isinstance(char['active_quests'], quest_handler.QuestLog)
+    assert char['active_quests'] == ['e', 'a']
+    assert quest_handler.is_quest_active(char, 'a')
+
+    quest_handler.complete_quest(char, 'e', quests)
+    assert char['active_quests'] == ['a']
+    assert char['completed_quests'] == ['e']
+    with pytest.raises(ValueError):
+        char['completed_quests'].remove('a')
+
+def test_quest_log_save_and_load_round_trip(tmp_path):
+    """Test that QuestLogs are saved in list form and keep their order"""
+    quests = make_quests()
+    char = character_manager.create_character("LogSave", "Mage")
+    for quest_id in ['e', 'a']:
+        quest_handler.accept_quest(char, quest_id, quests)
+    quest_handler.complete_quest(char, 'e', quests)
+
+    assert character_manager.validate_character_data(char) == True
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("LogSave", str(tmp_path))
+
+    assert loaded['active_quests'] == ['a']
+    assert loaded['completed_quests'] == ['e']
+    assert quest_handler.is_quest_completed(loaded, 'e')
+    assert isinstance(loaded['completed_quests'], quest_handler.QuestLog)
+
+def test_quest_bitset_behaves_like_quest_log():
+    """Test that a QuestBitset supports the QuestLog operations as bit operations"""
+    quests = make_quests()
+    index = quest_handler.get_quest_index(quests)
+    log = quest_handler.QuestBitset(index, ['d', 'a', 'unknown'])
+
+    assert log.mask == index.bits['a'] | index.bits['d']
+    assert 'a' in log and 'unknown' in log and 'b' not in log
+    assert len(log) == 3
+    assert log == ['a', 'd', 'unknown']
+
+    log.remove('a')
+    log.remove('unknown')
+    log.append('d')
+    assert log == quest_handler.QuestLog(['d'])
+    with pytest.raises(ValueError):
+        log.remove('a')
+
+def test_quest_bitsets_save_and_drive_availability(tmp_path):
+    """Test that bitset quest logs save as one encoded entry and load back"""
+    quests = make_quests()
+    char = character_manager.create_character("BitsetSave", "Cleric")
+    quest_handler.use_quest_bitsets(char, quests)
+    assert isinstance(char['completed_quests'], quest_handler.QuestBitset)
+
+    quest_handler.accept_quest(char, 'a', quests)
+    quest_handler.complete_quest(char, 'a', quests)
+    quest_handler.accept_quest(char, 'e', quests)
+    assert available_ids(char, quests) == ['b', 'c']
+    assert quest_handler.get_quest_completion_percentage(char, quests) == 20.0
+
+    character_manager.save_character(char, str(tmp_path))
+    with open(tmp_path / "BitsetSave_save.txt") as f:
+        saved = f.read()
+    assert "COMPLETED_QUESTS: @" in saved
+
+    loaded = character_manager.load_character("BitsetSave", str(tmp_path))
+    assert quest_handler.is_quest_completed(loaded, 'a')
+    assert quest_handler.is_quest_active(loaded, 'e')
+    assert isinstance(loaded['completed_quests'], quest_handler.QuestBitset)
+    assert available_ids(loaded, quests) == ['b', 'c']
+
+    # A bitset saved against other quest data cannot be read back
+    stale = character_manager.create_character("Stale", "Cleric")
+    stale['completed_quests'] = ["@00000000:1"]
+    with pytest.raises(InvalidSaveDataError):
+        quest_handler.is_quest_completed(stale, 'a')
+
+def test_quest_bitsets_decode_without_a_cached_index(tmp_path):
+    """Test that a saved bitset decodes against the quest data it is used with"""
+    quests = make_quests()
+    char = character_manager.create_character("BitsetFresh", "Cleric")
+    quest_handler.use_quest_bitsets(char, quests)
+    quest_handler.accept_quest(char, 'a', quests)
+    quest_handler.complete_quest(char, 'a', quests)
+    character_manager.save_character(char, str(tmp_path))
+
+    # As in a new process: no quest index is cached
+    quest_handler._quest_indexes.clear()
+    loaded = character_manager.load_character("BitsetFresh", str(tmp_path))
+    assert quest_handler.can_accept_quest(loaded, 'b', quests)
+
+    quest_handler._quest_indexes.clear()
+    loaded = character_manager.load_character("BitsetFresh", str(tmp_path))
+    quest_handler.load_quest_logs(loaded, quests)
+    assert quest_handler.is_quest_completed(loaded, 'a')
+
+    with pytest.raises(InvalidSaveDataError):
+        quest_handler.load_quest_logs(
+            character_manager.load_character("BitsetFresh", str(tmp_path)), {'x': quests['e']}
+        )
+
+# ============================================================================
+# REQUIREMENT EXPRESSION TESTS
+# ============================================================================
+
+def test_requires_expressions_load_from_file(tmp_path):
+    """Test that REQUIRES parses and plain quests load unchanged"""
+    quest_file = tmp_path / "quests.txt"
+    quest_file.write_text(
+        "QUEST_ID: plain\nTITLE: Plain\nDESCRIPTION: d\nREWARD_XP: 1\nREWARD_GOLD: 1\n"
+        "REQUIRED_LEVEL: 1\nPREREQUISITE: NONE\n\n"
+        "QUEST_ID: combo\nTITLE: Combo\nDESCRIPTION: d\nREWARD_XP: 1\nREWARD_GOLD: 1\n"
+        "REQUIRED_LEVEL: 1\nPREREQUISITE: NONE\n"
+        "REQUIRES: ANY 2 OF (a, b, c) AND (plain OR LEVEL 5)\n"
+    )
+    quests = game_data.load_quests(str(quest_file))
+
+    assert 'requires' not in quests['plain']
+    assert quests['combo']['requires'] == (
+        'any', 2, (
+            ('any', 2, (('quest', 'a'), ('quest', 'b'), ('quest', 'c'))),
+            ('any', 1, (('quest', 'plain'), ('level', 5))),
+        )
+    )
+    assert game_data.parse_requirement(game_data.format_requirement(quests['combo']['requires'])) == \
+        quests['combo']['requires']
+
+    for bad in ["a AND", "ANY 3 OF (a, b)", "a b", "(a OR b"]:
+        with pytest.raises(InvalidDataFormatError):
+            game_data.parse_requirement(bad)
+
+def test_requires_expressions_gate_availability():
+    """Test that 'any two of three quests plus a level' unlocks at the right moment"""
+    quests = make_quests()
+    for quest in quests.values():
+        quest['reward_xp'] = 0
+    quests['f'] = dict(quests['e'], quest_id='f', requires=game_data.parse_requirement(
+        "ANY 2 OF (b, c, e) AND LEVEL 2"
+    ))
+    char = character_manager.create_character("RequiresTest", "Mage")
+
+    def run(quest_id):
+        quest_handler.accept_quest(char, quest_id, quests)
+        quest_handler.complete_quest(char, quest_id, quests)
+
+    run('a')
+    run('e')
+    assert 'f' not in available_ids(char, quests)
+    with pytest.raises(QuestRequirementsNotMetError):
+        quest_handler.accept_quest(char, 'f', quests)
+
+    # Two of three done, but still level 1
+    run('c')
+    assert 'f' not in available_ids(char, quests)
+    assert not quest_handler.can_accept_quest(char, 'f', quests)
+
+    character_manager.gain_experience(char, 100)
+    assert available_ids(char, quests) == ['b', 'f']
+    assert quest_handler.can_accept_quest(char, 'f', quests)
+
+    # A fresh character with the same history gets the same answer from a rebuild
+    clone = character_manager.create_character("RequiresClone", "Mage")
+    clone['level'] = char['level']
+    clone['completed_quests'].extend(['a', 'e', 'c'])
+    assert available_ids(clone, quests) == ['b', 'f']
+
+    quests['g'] = dict(quests['e'], quest_id='g', requires=('quest', 'missing'))
+    with pytest.raises(QuestNotFoundError):
+        quest_handler.validate_quest_prerequisites(quests)
+
+# ============================================================================
+# LEVEL INDEX TESTS
+# ============================================================================
+
+def test_quests_by_level_matches_scan():
+    """Test that level-range queries match a scan, in single and batch form"""
+    quests = make_quests()
+
+    def scan(low, high):
+        return sorted(q_id for q_id, q in quests.items() if low <= q['required_level'] <= high)
+
+    for low, high in [(1, 1), (2, 3), (0, 10), (4, 9), (3, 1)]:
+        found = quest_handler.get_quests_by_level(quests, low, high)
+        assert sorted(q['quest_id'] for q in found) == scan(low, high)
+
+    batch = quest_handler.get_quests_by_level_ranges(quests, [(1, 1), (2, 2), (3, 3)])
+    assert [[q['quest_id'] for q in found] for found in batch] == [['a', 'c', 'e'], ['b'], ['d']]
+
+def test_quest_level_index_updates_incrementally():
+    """Test that reloaded quest data only moves the quests that changed"""
+    level_index = quest_handler.QuestLevelIndex(make_quests())
+
+    reloaded = make_quests()
+    reloaded['b']['required_level'] = 5
+    del reloaded['e']
+    reloaded['f'] = dict(reloaded['a'], quest_id='f', required_level=4)
+
+    assert level_index.update(reloaded) == 3
+    assert level_index.update(reloaded) == 0
+    assert level_index.between(4, 5) == ['f', 'b']
+    assert level_index.between_many([(1, 1), (3, 3)]) == [['a', 'c'], ['d']]
+
+# ============================================================================
+# QUEST OBJECTIVE TESTS
+# ============================================================================
+
+def test_objectives_parse_from_quest_data():
+    """Test OBJECTIVE lines and the "Defeat N enemies" description fallback"""
+    lines = [
+        "QUEST_ID: supplies", "TITLE: Supplies", "DESCRIPTION: Stock up. Defeat 2 goblins too.",
+        "REWARD_XP: 10", "REWARD_GOLD: 5", "REQUIRED_LEVEL: 1", "PREREQUISITE: NONE",
+        "OBJECTIVE: item_acquired:health_potion 2", "OBJECTIVE: enemy_defeated:orc",
+    ]
+    quest = game_data.parse_quest_block(lines)
+    assert quest['objectives'] == [('item_acquired:health_potion', 2), ('enemy_defeated:orc', 1)]
+    assert game_data.validate_quest_data(quest) == True
+
+    quest = game_data.parse_quest_block(lines[:-2])
+    assert quest['objectives'] == [('enemy_defeated:goblin', 2)]
+
+    with pytest.raises(InvalidDataFormatError):
+        game_data.parse_objective("slay:goblin 3")
+
+def test_events_only_reach_subscribed_quests(tmp_path):
+    """Test that dispatched events update subscribed quests and survive saving"""
+    quests = make_quests()
+    quests['a']['objectives'] = [('enemy_defeated:goblin', 2), ('item_acquired:health_potion', 1)]
+    quests['e']['objectives'] = [('enemy_defeated:orc', 1)]
+    char = character_manager.create_character("Objectives", "Warrior")
+    bystander = character_manager.create_character("Bystander", "Warrior")
+
+    quest_handler.accept_quest(char, 'a', quests)
+    quest_handler.accept_quest(char, 'e', quests)
+    assert quest_handler.dispatch_quest_event(bystander, 'enemy_defeated:goblin') == []
+    assert 'quest_progress' not in bystander
+
+    assert quest_handler.dispatch_quest_event(char, 'enemy_defeated:goblin') == []
+    assert quest_handler.dispatch_quest_event(char, 'enemy_defeated:goblin', 5) == []
+    assert quest_handler.get_quest_objectives(char, 'a') == {
+        'enemy_defeated:goblin': (2, 2), 'item_acquired:health_potion': (0, 1)
+    }
+    assert quest_handler.get_quest_objectives(char, 'e') == {'enemy_defeated:orc': (0, 1)}
+
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("Objectives", str(tmp_path))
+
+    # Buying the item is an item_acquired event
+    potion = {'item_id': 'health_potion', 'name': 'Health Potion', 'type': 'consumable',
+              'effect': 'health:20', 'cost': 25, 'description': 'Heals'}
+    inventory_system.purchase_item(loaded, 'health_potion', potion)
+    assert quest_handler.are_quest_objectives_complete(loaded, 'a')
+    assert not quest_handler.are_quest_objectives_complete(loaded, 'e')
+
+    quest_handler.complete_quest(loaded, 'a', quests)
+    quest_handler.abandon_quest(loaded, 'e')
+    assert quest_handler.get_quest_objectives(loaded, 'a') == {}
+    assert quest_handler.get_quest_progress(loaded).subscribed('enemy_defeated:orc') == []
+
+def test_every_acquisition_counts_once():
+    """Test that loot, purchases and baskets count once and returned items do not"""
+    quests = make_quests()
+    quests['a']['objectives'] = [('item_acquired:iron_sword', 10)]
+    char = character_manager.create_character("Collector", "Warrior")
+    char['gold'] = 1000
+    sword = {'name': 'Iron Sword', 'type': 'weapon', 'effect': 'strength:5', 'cost': 10}
+    quest_handler.accept_quest(char, 'a', quests)
+
+    inventory_system.add_item_to_inventory(char, 'iron_sword', 1, sword)    # loot
+    inventory_system.purchase_item(char, 'iron_sword', sword, 2)
+    inventory_system.purchase_items(char, [('iron_sword', 3)], {'iron_sword': sword})
+    assert quest_handler.get_quest_objectives(char, 'a') == {'item_acquired:iron_sword': (6, 10)}
+
+    inventory_system.equip_weapon(char, 'iron_sword', sword)
+    inventory_system.unequip_weapon(char, {'iron_sword': sword})
+    assert quest_handler.get_quest_objectives(char, 'a') == {'item_acquired:iron_sword': (6, 10)}
+
+# ============================================================================
+# BATCH ELIGIBILITY TESTS
+# ============================================================================
+
+def test_eligibility_masks_match_can_accept_quest():
+    """Test that batch eligibility agrees with can_accept_quest per character"""
+    quests = make_quests()
+    quests['f'] = dict(quests['e'], quest_id='f', requires=game_data.parse_requirement(
+        "ANY 2 OF (b, c, e) AND (d OR LEVEL 3)"
+    ))
+    histories = [[], ['a'], ['a', 'c'], ['a', 'b', 'e'], ['a', 'c', 'e'], ['a', 'c', 'd', 'e']]
+    party = []
+    for level in (1, 2, 3):
+        for history in histories:
+            char = character_manager.create_character(f"Batch{len(party)}", "Warrior")
+            char['level'] = level
+            char['completed_quests'].extend(history)
+            party.append(char)
+    party[1]['active_quests'].append('c')
+
+    masks = quest_handler.get_eligibility_masks(party, list(quests), quests)
+    for quest_id in quests:
+        expected = [quest_handler.can_accept_quest(char, quest_id, quests) for char in party]
+        assert [bool(flag) for flag in masks[quest_id]] == expected
+
+    store = character_manager.CharacterStore.from_characters(party)
+    store_masks = quest_handler.get_eligibility_masks(store, 'f', quests)
+    assert [bool(flag) for flag in store_masks['f']] == [bool(flag) for flag in masks['f']]
+
+    with pytest.raises(QuestNotFoundError):
+        quest_handler.get_eligibility_masks(party, 'missing', quests)
+
+# ============================================================================
+# QUEST STATISTICS TESTS
+# ============================================================================
+
+def test_running_quest_stats_are_saved(tmp_path):
+    """Test that completing quests keeps counters that survive a save and load"""
+    quests = make_quests()
+    char = character_manager.create_character("StatsSave", "Warrior")
+    assert 'quest_xp_earned' not in char
+
+    for quest_id in ['a', 'e']:
+        quest_handler.accept_quest(char, quest_id, quests)
+        quest_handler.complete_quest(char, quest_id, quests)
+
+    assert quest_handler.get_total_quest_rewards_earned(char, quests) == {'total_xp': 200, 'total_gold': 20}
+    assert quest_handler.get_quest_completion_percentage(char, quests) == 40.0
+
+    character_manager.save_character(char, str(tmp_path))
+    loaded = character_manager.load_character("StatsSave", str(tmp_path))
+    assert quest_handler.get_quest_stats(loaded, quests) == {
+        'quests_completed': 2, 'quest_xp_earned': 200, 'quest_gold_earned': 20
+    }
+
+def test_quest_stats_rebuild_when_stale():
+    """Test that counters missing or out of step with the quest list are rebuilt"""
+    quests = make_quests()
+    veteran = character_manager.create_character("Veteran", "Mage")
+    veteran['completed_quests'].extend(['a', 'c', 'e'])
+    rookie = character_manager.create_character("Rookie", "Rogue")
+    rookie['completed_quests'].append('a')
+    rookie['quest_xp_earned'] = 999
+    rookie['quests_completed'] = 7
+
+    assert quest_handler.get_quest_stats(rookie, quests)['quest_xp_earned'] == 100
+    assert quest_handler.get_quest_leaderboard([rookie, veteran], quests, count=1) == [("Veteran", 300)]
+    assert quest_handler.get_quest_leaderboard([rookie, veteran], quests, 'quests_completed') == \
+        [("Veteran", 3), ("Rookie", 1)]
+
+def test_quest_stats_skip_unknown_quests_and_notice_swaps():
+    """Test that removed quests earn nothing and same-length swaps are rebuilt"""
+    quests = make_quests()
+    quests['b']['reward_xp'] = 300
+    char = character_manager.create_character("StatsEdge", "Cleric")
+    char['completed_quests'].append('retired_quest')
+
+    quest_handler.accept_quest(char, 'a', quests)
+    quest_handler.complete_quest(char, 'a', quests)
+    assert quest_handler.get_quest_completion_percentage(char, quests) == 40.0
+    assert quest_handler.get_quest_stats(char, quests) == {
+        'quests_completed': 2, 'quest_xp_earned': 100, 'quest_gold_earned': 10
+    }
+
+    char['completed_quests'].remove('a')
+    char['completed_quests'].append('b')
+    assert quest_handler.get_total_quest_rewards_earned(char, quests) == {'total_xp': 300, 'total_gold': 10}
+
+# ============================================================================
+# QUEST GRAPH TESTS
+# ============================================================================
+
+def test_quest_graph_chains_and_descendants():
+    """Test memoized prerequisite chains, depths and unlocked-by queries"""
+    quests = make_quests()
+    graph = quest_handler.get_quest_graph(quests)
+
+    assert quest_handler.get_quest_prerequisite_chain('d', quests) == ['a', 'c', 'd']
+    assert quest_handler.get_quest_prerequisite_chain('e', quests) == ['e']
+    assert graph.depth == {'a': 0, 'b': 1, 'c': 1, 'd': 2, 'e': 0}
+    assert sorted(quest_handler.get_quests_unlocked_by('a', quests)) == ['b', 'c', 'd']
+    assert quest_handler.get_quests_unlocked_by('d', quests) == []
+    assert quest_handler.get_quest_graph(quests) is graph
+
+    with pytest.raises(QuestNotFoundError):
+        quest_handler.get_quest_prerequisite_chain('missing', quests)
+
+def test_quest_graph_detects_cycles():
+    """Test that a prerequisite cycle is reported instead of looping forever"""
+    quests = make_quests()
+    quests['a']['prerequisite'] = 'd'
+
+    with pytest.raises(InvalidDataFormatError):
+        quest_handler.validate_quest_prerequisites(quests)
+    with pytest.raises(InvalidDataFormatError):
+        quest_handler.get_quest_prerequisite_chain('b', quests)
+
+    quests['a']['prerequisite'] = 'nowhere'
+    quests['zz'] = dict(quests['e'], quest_id='zz')
+    with pytest.raises(QuestNotFoundError):
+        quest_handler.validate_quest_prerequisites(quests)
+
+def test_quest_graph_follows_requires_expressions():
+    """Test that REQUIRES references are graph edges for cycles, chains and unlocks"""
+    quests = make_quests()
+    quests['e']['requires'] = game_data.parse_requirement("b AND d")
+    quests['f'] = dict(quests['e'], quest_id='f', requires=game_data.parse_requirement("e"))
+
+    assert quest_handler.get_quest_prerequisite_chain('f', quests) == ['a', 'b', 'c', 'd', 'e', 'f']
+    assert quest_handler.get_quests_unlocked_by('b', quests) == ['e', 'f']
+    assert quest_handler.get_quests_unlocked_by('a', quests) == ['b', 'c', 'd', 'e', 'f']
+    assert quest_handler.get_quest_graph(quests).depth['f'] == 4
+
+    quests['b']['requires'] = game_data.parse_requirement("f")
+    with pytest.raises(InvalidDataFormatError):
+        quest_handler.validate_quest_prerequisites(quests)
+
+# ============================================================================
+# QUEST PLANNER TESTS
+# ============================================================================
+
+def test_plan_quest_route_follows_prerequisites_and_levels():
+    """Test the planned sequence and the XP/level estimate along it"""
+    quests = make_quests()
+    char = character_manager.create_character("Planner", "Warrior")
+
+    plan = quest_handler.plan_quest_route(char, 'd', quests)
+    assert plan == {'quests': ['a', 'c', 'd'], 'quest_xp': 300, 'extra_xp': 0, 'final_level': 4}
+
+    # Without quest XP the level 3 requirement has to be met some other way
+    for quest in quests.values():
+        quest['reward_xp'] = 0
+    assert quest_handler.plan_quest_route(char, 'd', quests)['extra_xp'] == 200
+
+    quest_handler.accept_quest(char, 'a', quests)
+    quest_handler.complete_quest(char, 'a', quests)
+    assert quest_handler.plan_quest_route(char, 'd', quests)['quests'] == ['c', 'd']
+    with pytest.raises(QuestAlreadyCompletedError):
+        quest_handler.plan_quest_route(char, 'a', quests)
+
+def test_plan_quest_route_picks_cheapest_options_and_caches():
+    """Test ANY choices, route caching and unreachable targets"""
+    quests = make_quests()
+    quests['f'] = dict(quests['e'], quest_id='f', requires=game_data.parse_requirement(
+        "ANY 2 OF (b, c, e)"
+    ))
+    char = character_manager.create_character("Chooser", "Rogue")
+
+    # e costs one quest; b and c both need 'a', and c has the lower level
+    assert quest_handler.plan_quest_route(char, 'f', quests)['quests'] == ['a', 'c', 'e', 'f']
+    planner = quest_handler.get_quest_planner(quests)
+    cached = dict(planner._plans)
+    quest_handler.plan_quest_route(char, 'f', quests)
+    assert planner._plans == cached
+
+    quests['a']['requires'] = ('quest', 'f')
+    quests['g'] = dict(quests['e'], quest_id='g')
+    with pytest.raises(QuestRequirementsNotMetError):
+        quest_handler.plan_quest_route(char, 'd', quests)
+
+def test_recommend_quests_prefers_xp():
+    """Test that recommendations are the available quests with the most XP"""
+    quests = make_quests()
+    quests['e']['reward_xp'] = 500
+    char = character_manager.create_character("Advice", "Cleric")
+    assert [q['quest_id'] for q in quest_handler.recommend_quests(char, quests, 1)] == ['e']
+    assert [q['quest_id'] for q in quest_handler.recommend_quests(char, quests)] == ['e', 'a']
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])